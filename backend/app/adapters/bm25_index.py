@@ -0,0 +1,57 @@
+"""Adapter over the embedded BM25 index (``app.bm25``).
+
+Serves the same stored pages as ``local_index`` without an OpenSearch node,
+from segment files under ``COMPASS_BM25_DIR``. Segments written by another
+process (``python -m app.bm25 add ...``) are picked up on the next search.
+"""
+import asyncio
+import os
+from typing import List
+
+from ..bm25 import BM25Index
+from ..config import settings
+from ..schemas import SearchResult
+
+
+class BM25IndexAdapter:
+    name = "bm25_index"
+
+    def __init__(self, api_key: str | None = None):  # api_key kept for signature compatibility
+        if not settings.bm25_dir or not os.path.isdir(settings.bm25_dir):
+            raise RuntimeError("COMPASS_BM25_DIR not set or missing; bm25_index adapter disabled")
+        self._index = BM25Index(
+            settings.bm25_dir,
+            flush_docs=settings.bm25_flush_docs,
+            merge_factor=settings.bm25_merge_factor,
+        )
+
+    def _search(self, query: str, limit: int, start: int):
+        self._index.reopen()
+        return self._index.search(query, k=limit, offset=max(start - 1, 0))
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 10,
+        search_type: str = "web",
+        start: int = 1,
+        **kwargs,
+    ) -> List[SearchResult]:
+        if not query:
+            return []
+        # scoring is CPU-bound; keep it off the event loop
+        hits = await asyncio.to_thread(self._search, query, limit, start)
+        results: List[SearchResult] = []
+        for _, doc in hits:
+            try:
+                results.append(
+                    SearchResult(
+                        title=doc.get("title") or query,
+                        url=doc["url"],
+                        snippet=doc.get("snippet", ""),
+                        source=self.name,
+                    )
+                )
+            except ValueError:  # stored URL that is not a valid HttpUrl
+                continue
+        return results
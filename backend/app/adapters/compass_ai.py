@@ -5,6 +5,7 @@ from __future__ import annotations
 
 import httpx
 from typing import List, Dict, Any
+from ..http_client import get_client
 from ..schemas import SearchResult
 from .base import SearchAdapter
 
@@ -14,10 +15,7 @@ class CompassAIAdapter(SearchAdapter):
     
     name = "compass_ai"
     base_url = "https://compassb.vercel.app"
-    
-    def __init__(self, api_key: str | None = None):
-        super().__init__(api_key)
-        self.client = httpx.AsyncClient(timeout=30.0)
+    timeout = 30.0
     
     async def search(self, query: str, limit: int = 10, search_type: str = "web", start: int = 1) -> List[SearchResult]:
         """Search using Compass AI API."""
@@ -29,7 +27,7 @@ class CompassAIAdapter(SearchAdapter):
             if search_type != "web":
                 params["type"] = search_type
             
-            response = await self.client.get(search_url, params=params)
+            response = await get_client().get(search_url, params=params, timeout=self.timeout)
             response.raise_for_status()
             stored_results = response.json()
             if isinstance(stored_results, dict):
@@ -37,7 +35,7 @@ class CompassAIAdapter(SearchAdapter):
 
             # fallback: retry without type filter if nothing returned (index may not label vertical)
             if not stored_results and search_type != "web":
-                response2 = await self.client.get(search_url, params={"q": query})
+                response2 = await get_client().get(search_url, params={"q": query}, timeout=self.timeout)
                 if response2.status_code == 200:
                     stored_results = response2.json()
                     if isinstance(stored_results, dict):
@@ -80,10 +78,11 @@ class CompassAIAdapter(SearchAdapter):
             payload["apiKey"] = self.api_key
         
         try:
-            response = await self.client.post(
+            response = await get_client().post(
                 fetch_url,
                 json=payload,
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
             )
             response.raise_for_status()
             data = response.json()
@@ -178,4 +177,4 @@ class CompassAIAdapter(SearchAdapter):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        pass  # the shared HTTP client is closed by the application lifespan
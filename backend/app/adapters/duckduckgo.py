@@ -2,13 +2,17 @@
 
 - Web results come from DuckDuckGo’s public Instant-Answer API.  
 - Media results come from the `duckduckgo_search` package (pip install duckduckgo_search).
+  That package is synchronous, so media searches run in a small dedicated thread
+  pool with their own timeout and a short-lived per-vertical cache.
 """
 
 from __future__ import annotations
 
-from typing import List
-
-import httpx
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
 
 # duckduckgo_search was renamed to ddgs; try new name first for compatibility
 try:
@@ -17,14 +21,22 @@ except ImportError:
     from duckduckgo_search import DDGS  # type: ignore
 
 from .base import SearchAdapter
+from ..config import settings
+from ..http_client import get_client
 from ..schemas import SearchResult
 
+# media searches block on network I/O; keep them off the event loop and bounded
+_media_pool = ThreadPoolExecutor(max_workers=settings.ddg_media_workers, thread_name_prefix="ddg-media")
+
 
 class DuckDuckGoAdapter(SearchAdapter):
     """Unified DuckDuckGo adapter."""
 
     name = "duckduckgo"
 
+    # (vertical, normalized query, limit) -> (expires_at, results)
+    _media_cache: "OrderedDict[tuple, tuple[float, List[SearchResult]]]" = OrderedDict()
+
     # --------------------------------------------------------------------- #
     # Web search via Instant-Answer API
     # --------------------------------------------------------------------- #
@@ -35,8 +47,7 @@ class DuckDuckGoAdapter(SearchAdapter):
             "no_redirect": "1",
             "no_html": "1",
         }
-        async with httpx.AsyncClient(timeout=10) as client:
-            data = (await client.get("https://api.duckduckgo.com/", params=params)).json()
+        data = (await get_client().get("https://api.duckduckgo.com/", params=params, timeout=10)).json()
 
         results: List[SearchResult] = []
 
@@ -108,7 +119,7 @@ class DuckDuckGoAdapter(SearchAdapter):
     # Media helpers (images / videos / news) via duckduckgo_search
     # --------------------------------------------------------------------- #
     @staticmethod
-    def _media_to_results(items: list[dict], kind: str, query: str, limit: int) -> List[SearchResult]:
+    def _media_to_results(items: Iterable[dict], kind: str, query: str, limit: int) -> List[SearchResult]:
         out: List[SearchResult] = []
         for item in items:
             url_candidate = (
@@ -151,6 +162,45 @@ class DuckDuckGoAdapter(SearchAdapter):
                 break
         return out
 
+    @classmethod
+    def _media_blocking(cls, query: str, limit: int, kind: str) -> List[SearchResult]:
+        """Runs in the media pool; converts results as they arrive and stops at ``limit``."""
+        with DDGS() as ddgs:
+            if kind == "images":
+                items = ddgs.images(query, max_results=limit)
+            elif kind == "videos":
+                items = ddgs.videos(query, max_results=limit)
+            elif kind == "news":
+                items = ddgs.news(query, max_results=limit)
+            else:
+                items = []
+            return cls._media_to_results(items, kind, query, limit)
+
+    async def _media(self, query: str, limit: int, kind: str) -> List[SearchResult]:
+        key = (kind, " ".join(query.lower().split()), limit)
+        cached = self._media_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._media_cache.move_to_end(key)
+            return list(cached[1])
+
+        loop = asyncio.get_running_loop()
+        try:
+            results = await asyncio.wait_for(
+                loop.run_in_executor(_media_pool, self._media_blocking, query, limit, kind),
+                timeout=settings.ddg_media_timeout,
+            )
+        except asyncio.TimeoutError:
+            print(f"[Compass] DuckDuckGo {kind} search timed out")
+            return []
+        if not results:
+            return results
+
+        self._media_cache[key] = (time.monotonic() + settings.ddg_media_cache_ttl, results)
+        self._media_cache.move_to_end(key)
+        while len(self._media_cache) > settings.ddg_media_cache_size:
+            self._media_cache.popitem(last=False)
+        return list(results)
+
     # --------------------------------------------------------------------- #
     # Public entry-point
     # --------------------------------------------------------------------- #
@@ -166,17 +216,7 @@ class DuckDuckGoAdapter(SearchAdapter):
             return await self._web(query, limit)
 
         # Media search
-        with DDGS() as ddgs:
-            if search_type == "images":
-                items = list(ddgs.images(query, max_results=limit))
-            elif search_type == "videos":
-                items = list(ddgs.videos(query, max_results=limit))
-            elif search_type == "news":
-                items = list(ddgs.news(query, max_results=limit))
-            else:
-                items = []
-
-        results = self._media_to_results(items, search_type, query, limit)
+        results = await self._media(query, limit, search_type)
         if not results:
             results.append(
                 SearchResult(
@@ -1,81 +1,221 @@
-from typing import List, Tuple
+from typing import Any, Dict, List
 import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import httplib2
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from .base import SearchAdapter
+from ..config import settings
+from ..fanout import fetch_pages
 from ..schemas import SearchResult
 
+# googleapiclient is synchronous; its calls run here instead of on the event loop
+_google_pool = ThreadPoolExecutor(max_workers=settings.google_workers, thread_name_prefix="google-cse")
+# httplib2.Http is not thread-safe, so each worker thread keeps its own connection
+_thread_http = threading.local()
+
+
+def _http() -> httplib2.Http:
+    http = getattr(_thread_http, "http", None)
+    if http is None:
+        http = _thread_http.http = httplib2.Http(timeout=10)
+    return http
+
+
+# per-key back-off after a rate-limit (queries per minute) 429, doubling up to the cap
+RATE_BACKOFF_S = 1.0
+RATE_BACKOFF_MAX_S = 32.0
+
+
+def _daily_limit(error: HttpError) -> bool:
+    """True if ``error`` reports the daily quota spent, not a per-minute rate limit.
+
+    Older responses carry the reason ``dailyLimitExceeded``; newer ones report
+    ``rateLimitExceeded`` for both and name the limit ("Queries per day") in
+    the message or the quota metadata.
+    """
+    text = error.content.decode("utf-8", "replace")
+    lowered = text.lower()
+    return "dailyLimitExceeded" in text or "per day" in lowered or "perday" in lowered
+
+
+class QuotaScheduler:
+    """Tracks daily query usage per API key and hands out the key with most headroom.
+
+    Usage resets at the Google quota boundary (midnight Pacific time). A key
+    whose daily quota is spent is parked until the next boundary; a key that
+    hits the per-minute rate limit only cools down for a few seconds.
+    """
+
+    try:
+        _quota_tz = ZoneInfo("America/Los_Angeles")
+    except ZoneInfoNotFoundError:  # no tz database (e.g. Windows without tzdata)
+        _quota_tz = timezone(timedelta(hours=-8))
+
+    def __init__(self, n_keys: int, daily_quota: int):
+        self._quota = daily_quota
+        self._used = [0] * n_keys
+        self._last_used = [0.0] * n_keys
+        self._cool_until = [0.0] * n_keys
+        self._strikes = [0] * n_keys
+        self._day = self._quota_day()
+
+    @classmethod
+    def _quota_day(cls) -> date:
+        return datetime.now(cls._quota_tz).date()
+
+    def _roll(self) -> None:
+        today = self._quota_day()
+        if today != self._day:
+            self._day = today
+            self._used = [0] * len(self._used)
+
+    def acquire(self) -> int | None:
+        """Reserve one query on the key with the most remaining quota, or None if all are spent
+        or cooling down (see ``wait``)."""
+        self._roll()
+        now = time.monotonic()
+        best = None
+        for idx, used in enumerate(self._used):
+            if used >= self._quota or self._cool_until[idx] > now:
+                continue
+            # most headroom first, least recently used on ties
+            if best is None or (used, self._last_used[idx]) < (self._used[best], self._last_used[best]):
+                best = idx
+        if best is not None:
+            self._used[best] += 1
+            self._last_used[best] = time.monotonic()
+        return best
+
+    def exhaust(self, idx: int) -> None:
+        self._used[idx] = self._quota
+
+    def backoff(self, idx: int) -> None:
+        """Cool key ``idx`` down after a rate-limit 429; the rejected query is not counted."""
+        self._used[idx] = max(0, self._used[idx] - 1)
+        delay = min(RATE_BACKOFF_S * 2 ** self._strikes[idx], RATE_BACKOFF_MAX_S)
+        self._strikes[idx] += 1
+        self._cool_until[idx] = time.monotonic() + delay
+
+    def succeeded(self, idx: int) -> None:
+        self._strikes[idx] = 0
+
+    def wait(self) -> float | None:
+        """Seconds until a cooling key with quota left is usable again, or None if none is."""
+        now = time.monotonic()
+        waits = [
+            until - now
+            for until, used in zip(self._cool_until, self._used)
+            if used < self._quota and until > now
+        ]
+        return min(waits) if waits else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._roll()
+        return {"day": self._day.isoformat(), "quota": self._quota, "used": list(self._used)}
+
 
 class GoogleCSEAdapter(SearchAdapter):
-    """Google Custom Search adapter with round-robin key rotation.
+    """Google Custom Search adapter with quota-aware key scheduling.
 
-    • Reads comma-separated API keys from GOOGLE_API_KEYS
+    • Reads comma-separated API keys from GOOGLE_API_KEYS (once, at start-up)
     • Reads CXs from GOOGLE_CSE_CXS (same index as keys) or GOOGLE_CSE_CX
-    • Marks a key exhausted when API responds 429, then keeps rotating.
+    • Picks the key with the most daily quota left; a 429 for the daily limit
+      spends the key until the quota resets (it is never dropped for good), a
+      429 for the per-minute rate limit backs that key off briefly
+    • Builds one discovery service per key and reuses it
+    • Fetches the 10-result pages of a larger limit concurrently
     """
 
     name = "google_cse"
+    max_results = 100  # CSE never returns results past the 100th
 
-    _idx: int = 0
-    _exhausted: set[int] = set()
-    _lock: asyncio.Lock = asyncio.Lock()
+    def __init__(self, api_key: str | None = None):
+        super().__init__(api_key)
+        self._keys = [k.strip() for k in os.getenv("GOOGLE_API_KEYS", "").split(",") if k.strip()]
+        if not self._keys:
+            raise RuntimeError("GOOGLE_API_KEYS not set or empty")
+        cxs = [c.strip() for c in os.getenv("GOOGLE_CSE_CXS", "").split(",") if c.strip()]
+        fallback_cx = os.getenv("GOOGLE_CSE_CX")
+        self._cxs = [cxs[i % len(cxs)] if cxs else fallback_cx for i in range(len(self._keys))]
+        if not any(self._cxs):
+            raise RuntimeError("GOOGLE_CSE_CXS / GOOGLE_CSE_CX not set")
+        self.quota = QuotaScheduler(len(self._keys), settings.google_daily_quota)
+        self._services: Dict[int, Any] = {}
+        self._service_locks: Dict[int, asyncio.Lock] = {}
 
     # ------------------------------------------------------------------
     # helpers
     # ------------------------------------------------------------------
-    @classmethod
-    async def _next_credentials(cls) -> tuple[int, str, str]:  # returns idx,key,cx
-        """Return (api_key, cx) pair in round-robin across the lists."""
-        async with cls._lock:
-            keys = [k.strip() for k in os.getenv("GOOGLE_API_KEYS", "").split(",") if k.strip()]
-            cxs = [c.strip() for c in os.getenv("GOOGLE_CSE_CXS", "").split(",") if c.strip()]
-            if not keys:
-                raise RuntimeError("GOOGLE_API_KEYS not set or empty")
-            total = len(keys)
-            for _ in range(total):
-                idx = cls._idx % total
-                cls._idx += 1
-                if idx in cls._exhausted:
-                    continue  # skip exhausted key
-                key = keys[idx]
-                cx = cxs[idx % len(cxs)] if cxs else os.getenv("GOOGLE_CSE_CX")
-                if not cx:
-                    continue
-                return idx, key, cx
-            raise RuntimeError("All Google CSE keys exhausted or missing")
+    async def _service(self, idx: int):
+        """Return the cached discovery service for key ``idx``, building it off-loop once."""
+        service = self._services.get(idx)
+        if service is not None:
+            return service
+        lock = self._service_locks.setdefault(idx, asyncio.Lock())
+        async with lock:
+            if idx not in self._services:
+                loop = asyncio.get_running_loop()
+                self._services[idx] = await loop.run_in_executor(
+                    _google_pool,
+                    lambda: build("customsearch", "v1", developerKey=self._keys[idx], cache_discovery=False),
+                )
+        return self._services[idx]
 
-    async def search(self, query: str, limit: int = 10, search_type: str = "web", start: int = 1) -> List[SearchResult]:
-        attempts = 0
-        last_err: Exception | None = None
-        total_keys = len([k for k in os.getenv("GOOGLE_API_KEYS", "").split(",") if k.strip()])
-        while attempts < total_keys:
-            try:
-                idx, api_key, cx = await self._next_credentials()
-            except RuntimeError as e:
-                raise e
+    async def _query(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one CSE request, moving to the next key when one is out of quota or rate-limited."""
+        while True:
+            idx = self.quota.acquire()
+            if idx is None:
+                wait = self.quota.wait()
+                if wait is None:
+                    raise RuntimeError("All Google CSE keys exhausted for today")
+                # every key left is rate-limited: wait for the first to cool down
+                await asyncio.sleep(wait)
+                continue
+            if not self._cxs[idx]:
+                self.quota.exhaust(idx)
+                continue
+            service = await self._service(idx)
+            request = service.cse().list(cx=self._cxs[idx], **params)
+            loop = asyncio.get_running_loop()
             try:
-                service = build("customsearch", "v1", developerKey=api_key, cache_discovery=False)
-                params = dict(q=query, cx=cx, num=min(limit, 10), start=start)
-                if search_type == "images":
-                    params["searchType"] = "image"
-                elif search_type == "videos":
-                    params["q"] = f"{query} site:youtube.com"
-                resp = service.cse().list(**params).execute()
-                items = resp.get("items", [])
-                break  # success
-            except Exception as e:
-                from googleapiclient.errors import HttpError
-                if isinstance(e, HttpError) and e.resp.status == 429:
-                    # mark exhausted and retry next key
-                    self._exhausted.add(idx)
-                    attempts += 1
-                    last_err = e
+                resp = await loop.run_in_executor(_google_pool, lambda: request.execute(http=_http()))
+            except HttpError as e:
+                if e.resp.status in (403, 429) and _daily_limit(e):
+                    # out of quota: park this key until the daily reset and retry with another
+                    self.quota.exhaust(idx)
+                    continue
+                if e.resp.status == 429:
+                    # too many queries per minute: cool this key down and retry
+                    self.quota.backoff(idx)
                     continue
                 raise
-        else:
-            raise last_err or RuntimeError("No usable Google keys left")
+            self.quota.succeeded(idx)
+            return resp
+
+    async def _page(self, query: str, search_type: str, start: int, num: int) -> List[Dict[str, Any]]:
+        params = dict(q=query, num=num, start=start)
+        if search_type == "images":
+            params["searchType"] = "image"
+        elif search_type == "videos":
+            params["q"] = f"{query} site:youtube.com"
+        resp = await self._query(params)
+        return resp.get("items", [])
+
+    async def search(self, query: str, limit: int = 10, search_type: str = "web", start: int = 1) -> List[SearchResult]:
+        # CSE serves at most 10 results per call and 100 per query; fetch the pages concurrently
+        limit = min(limit, self.max_results - start + 1)
+        if limit <= 0:
+            return []
+        items = await fetch_pages(lambda offset, num: self._page(query, search_type, offset, num), start, limit)
         results: List[SearchResult] = []
         for item in items:
             if search_type == "images":
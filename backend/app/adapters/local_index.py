@@ -2,9 +2,9 @@
 Returns results previously written by the crawler, /gapi, /fetch source=serpapi, etc.
 """
 from typing import List
-import os
-from opensearchpy import OpenSearch
 
+from .. import index_client
+from ..config import settings
 from ..schemas import SearchResult
 
 
@@ -12,10 +12,8 @@ class LocalIndexAdapter:
     name = "local_index"
 
     def __init__(self, api_key: str | None = None):  # api_key kept for signature compatibility
-        url = os.getenv("OPENSEARCH_URL")
-        if not url:
+        if not index_client.enabled:
             raise RuntimeError("OPENSEARCH_URL not set; local_index adapter disabled")
-        self._client = OpenSearch(url, verify_certs=False)
         self._index = "pages"
 
     async def search(
@@ -30,16 +28,32 @@ class LocalIndexAdapter:
             return []
         body = {
             "query": {
-                "multi_match": {
-                    "query": query,
-                    "fields": ["title^2", "snippet", "body"],
+                "function_score": {
+                    "query": {
+                        "multi_match": {
+                            "query": query,
+                            "fields": ["title^2", "headings", "snippet", "body"],
+                        }
+                    },
+                    # link authority (app.pagerank); unranked pages count as average
+                    "field_value_factor": {
+                        "field": "pagerank",
+                        "factor": settings.pagerank_factor,
+                        "modifier": "log2p",
+                        "missing": 1,
+                    },
+                    "boost_mode": "multiply",
                 }
             },
+            # bodies hold the full page text; results only need these
+            "_source": ["title", "url", "snippet"],
             "from": max(start - 1, 0),
             "size": limit,
         }
         try:
-            res = self._client.search(index=self._index, body=body)
+            res = await index_client.get_index_client().search(
+                index=self._index, body=body, request_timeout=settings.opensearch_timeout
+            )
         except Exception:
             return []
         hits = res.get("hits", {}).get("hits", [])
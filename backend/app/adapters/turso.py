@@ -1,13 +1,22 @@
 """Turso database adapter
 Returns results from a Turso (libSQL) database table called `search_index`.
 The table must contain at least `title`, `url`, and `snippet` columns.
+
+Queries run against the FTS5 index ``search_index_fts`` (see ``app.turso_fts``)
+ranked by bm25, and page with a keyset on ``(rank, rowid)`` instead of OFFSET.
+Until that index is set up, the adapter falls back to a title LIKE scan.
 """
 
-from typing import List
+from collections import OrderedDict
+from typing import List, Tuple
+
 from libsql_client import create_client
 
 from ..schemas import SearchResult
 from ..config import settings
+from ..turso_fts import FTS, TABLE, match_expression
+
+_KEYSET_CACHE = 4096
 
 
 class TursoAdapter:
@@ -22,6 +31,10 @@ class TursoAdapter:
             url=settings.turso_db_url,
             auth_token=settings.turso_auth_token,
         )
+        self._fts = True
+        # (match, start) -> (rank, rowid) of the row before ``start``, recorded when the
+        # previous page was served; the fan-out asks for pages by offset
+        self._keysets: "OrderedDict[Tuple[str, int], Tuple[float, int]]" = OrderedDict()
 
     async def search(
         self,
@@ -31,10 +44,44 @@ class TursoAdapter:
         start: int = 1,
         **kwargs,
     ) -> List[SearchResult]:
-        """Performs a simple LIKE match on the `title` column.
-        Adjust SQL as needed for your schema.
-        """
-        sql = "SELECT title, url, snippet FROM search_index WHERE title LIKE ? LIMIT ? OFFSET ?"
+        match = match_expression(query)
+        if not match:
+            return []
+        if self._fts:
+            try:
+                return await self._search_fts(match, limit, start)
+            except Exception as exc:
+                if "no such table" not in str(exc):
+                    raise
+                print(f"[Compass] Warning: {FTS} missing, falling back to LIKE (run `python -m app.turso_fts setup`)")
+                self._fts = False
+        return await self._search_like(query, limit, start)
+
+    async def _search_fts(self, match: str, limit: int, start: int) -> List[SearchResult]:
+        select = (
+            f"SELECT s.title, s.url, s.snippet, f.rank, f.rowid FROM {FTS} f "
+            f"JOIN {TABLE} s ON s.rowid = f.rowid WHERE {FTS} MATCH ?"
+        )
+        after = self._keysets.get((match, start)) if start > 1 else None
+        if after is not None:
+            sql = f"{select} AND (f.rank, f.rowid) > (?, ?) ORDER BY f.rank, f.rowid LIMIT ?"
+            args = [match, after[0], after[1], limit]
+        else:
+            sql = f"{select} ORDER BY f.rank, f.rowid LIMIT ? OFFSET ?"
+            args = [match, limit, max(start - 1, 0)]
+        rows = (await self._client.execute(sql, args)).rows
+        if len(rows) == limit:
+            self._keysets[(match, start + limit)] = (rows[-1][3], rows[-1][4])
+            self._keysets.move_to_end((match, start + limit))
+            while len(self._keysets) > _KEYSET_CACHE:
+                self._keysets.popitem(last=False)
+        return [
+            SearchResult(title=row[0], url=row[1], snippet=row[2] or "", source=self.name)
+            for row in rows
+        ]
+
+    async def _search_like(self, query: str, limit: int, start: int) -> List[SearchResult]:
+        sql = f"SELECT title, url, snippet FROM {TABLE} WHERE title LIKE ? LIMIT ? OFFSET ?"
         # naive pagination using start param (1-indexed)
         rows = await self._client.execute(sql, [f"%{query}%", limit, max(start - 1, 0)])
         return [
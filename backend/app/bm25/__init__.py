@@ -0,0 +1,5 @@
+"""Embedded BM25 search engine: an OpenSearch-free backend for stored pages."""
+from .index import BM25Index
+from .segment import tokenize
+
+__all__ = ["BM25Index", "tokenize"]
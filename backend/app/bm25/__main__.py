@@ -0,0 +1,87 @@
+"""Build and query an embedded BM25 index (run from ``backend/``)::
+
+    python -m app.bm25 add DIR --ndjson pages.ndjson      # documents, one JSON object per line
+    python -m app.bm25 add DIR --opensearch http://localhost:9200   # copy the pages alias
+    python -m app.bm25 merge DIR
+    python -m app.bm25 search DIR "query" [-k 10]
+    python -m app.bm25 stats DIR
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator
+
+from . import BM25Index
+from ..pages_index import PAGES_ALIAS
+
+
+def read_ndjson(path: str) -> Iterator[Dict[str, str]]:
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                doc = json.loads(line)
+                if doc.get("url"):
+                    yield doc
+
+
+def read_opensearch(url: str, index: str = PAGES_ALIAS) -> Iterator[Dict[str, str]]:
+    from opensearchpy import OpenSearch, helpers
+
+    client = OpenSearch(url, verify_certs=False)
+    for hit in helpers.scan(client, index=index, query={"_source": ["url", "title", "snippet", "body"]}, size=1000):
+        doc = hit.get("_source", {})
+        if doc.get("url"):
+            yield doc
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.bm25", description="Embedded BM25 index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="index documents (incrementally, as new segments)")
+    add.add_argument("dir")
+    src = add.add_mutually_exclusive_group(required=True)
+    src.add_argument("--ndjson", help="file with one document per line ('-' for stdin)")
+    src.add_argument("--opensearch", help="OpenSearch URL to copy the pages alias from")
+    add.add_argument("--flush-docs", type=int, default=int(os.getenv("COMPASS_BM25_FLUSH_DOCS", "10000")))
+    sub.add_parser("merge", help="merge all segments into one").add_argument("dir")
+    search = sub.add_parser("search")
+    search.add_argument("dir")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=10)
+    sub.add_parser("stats").add_argument("dir")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        index = BM25Index(args.dir, flush_docs=args.flush_docs)
+        docs = read_ndjson(args.ndjson) if args.ndjson else read_opensearch(args.opensearch)
+        t0, n = time.perf_counter(), 0
+        for doc in docs:
+            index.add(doc)
+            n += 1
+        index.flush()
+        index.wait_for_merges()
+        elapsed = time.perf_counter() - t0
+        print(f"[Compass] indexed {n} documents in {elapsed:.1f}s ({n / max(elapsed, 1e-9):.0f} docs/s)")
+        print(json.dumps(index.stats()))
+    elif args.command == "merge":
+        index = BM25Index(args.dir, background_merge=False)
+        index.force_merge()
+        print(json.dumps(index.stats()))
+    elif args.command == "search":
+        index = BM25Index(args.dir)
+        t0 = time.perf_counter()
+        hits = index.search(args.query, k=args.k)
+        print(f"[Compass] {len(hits)} hits in {(time.perf_counter() - t0) * 1000:.2f} ms")
+        for score, doc in hits:
+            print(f"{score:7.3f}  {doc['url']}  {doc.get('title', '')}")
+    else:
+        print(json.dumps(BM25Index(args.dir).stats()))
+
+
+if __name__ == "__main__":
+    main()
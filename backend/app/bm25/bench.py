@@ -0,0 +1,144 @@
+"""Latency and memory of the embedded BM25 index against the OpenSearch path.
+
+Run from ``backend/`` after building the embedded index from the same crawl
+(``python -m app.bm25 add DIR --opensearch URL``)::
+
+    python -m app.bm25.bench DIR [--opensearch URL] [--queries FILE] [-n 200] [-k 10]
+
+Without ``--queries``, queries are sampled from stored titles. The OpenSearch
+side sends the ``local_index`` adapter's query. It reports client-side latency,
+node heap, and the store size of the pages alias. Overlap@k compares the two
+top-k URL sets, as a sanity check that both rank the same corpus similarly.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from . import BM25Index, tokenize
+from ..pages_index import PAGES_ALIAS
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(int(p * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {"p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "mean_ms": round(statistics.mean(ordered) * 1000, 3)}
+
+
+def sample_queries(index: BM25Index, n: int, seed: int = 7) -> List[str]:
+    rnd = random.Random(seed)
+    queries: List[str] = []
+    segments = index._segments
+    attempts = 0
+    while segments and len(queries) < n and attempts < 20 * n:
+        attempts += 1
+        seg = rnd.choice(segments)
+        if not seg.n_docs:
+            continue
+        words = tokenize(seg.stored(rnd.randrange(seg.n_docs)).get("title"))
+        if words:
+            start = rnd.randrange(len(words))
+            queries.append(" ".join(words[start:start + rnd.randint(1, 3)]))
+    return queries
+
+
+def bench_embedded(path: str, queries: List[str], k: int) -> Dict[str, object]:
+    rss_before = _rss_bytes()
+    t0 = time.perf_counter()
+    index = BM25Index(path)
+    open_s = time.perf_counter() - t0
+    results, samples = {}, []
+    for q in queries:
+        t0 = time.perf_counter()
+        hits = index.search(q, k=k)
+        samples.append(time.perf_counter() - t0)
+        results[q] = [doc["url"] for _, doc in hits]
+    stats = index.stats()
+    return {
+        "open_ms": round(open_s * 1000, 2),
+        "latency": _summary(samples),
+        "rss_delta_bytes": _rss_bytes() - rss_before,
+        "segment_bytes": stats["bytes"],
+        "docs": stats["docs"],
+        "segments": stats["segments"],
+        "_results": results,
+    }
+
+
+def bench_opensearch(url: str, queries: List[str], k: int) -> Dict[str, object]:
+    from opensearchpy import OpenSearch
+
+    client = OpenSearch(url, verify_certs=False)
+    results, samples, took = {}, [], []
+    for q in queries:
+        body = {"query": {"multi_match": {"query": q, "fields": ["title^2", "snippet", "body"]}}, "size": k}
+        t0 = time.perf_counter()
+        res = client.search(index=PAGES_ALIAS, body=body)
+        samples.append(time.perf_counter() - t0)
+        took.append(res.get("took", 0))
+        results[q] = [h["_source"].get("url") for h in res["hits"]["hits"]]
+    store = client.indices.stats(index=PAGES_ALIAS, metric="store")["_all"]["primaries"]["store"]["size_in_bytes"]
+    nodes = client.nodes.stats(metric="jvm")["nodes"].values()
+    return {
+        "latency": _summary(samples),
+        "server_took_p50_ms": statistics.median(took) if took else None,
+        "heap_used_bytes": sum(n["jvm"]["mem"]["heap_used_in_bytes"] for n in nodes),
+        "store_bytes": store,
+        "_results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.bm25.bench")
+    parser.add_argument("dir", help="embedded index directory")
+    parser.add_argument("--opensearch", help="OpenSearch URL holding the same crawl")
+    parser.add_argument("--queries", help="file with one query per line")
+    parser.add_argument("-n", type=int, default=200, help="sampled queries when --queries is not given")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as fh:
+            queries = [line.strip() for line in fh if line.strip()]
+    else:
+        queries = sample_queries(BM25Index(args.dir), args.n)
+    report: Dict[str, object] = {"queries": len(queries), "k": args.k}
+    embedded = bench_embedded(args.dir, queries, args.k)
+    report["embedded"] = embedded
+    if args.opensearch:
+        remote = bench_opensearch(args.opensearch, queries, args.k)
+        report["opensearch"] = remote
+        overlaps = [
+            len(set(embedded["_results"][q]) & set(remote["_results"][q])) / args.k
+            for q in queries
+            if remote["_results"][q]
+        ]
+        report["overlap_at_k"] = round(statistics.mean(overlaps), 3) if overlaps else None
+    for side in ("embedded", "opensearch"):
+        if side in report:
+            report[side].pop("_results")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
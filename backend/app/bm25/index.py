@@ -0,0 +1,336 @@
+"""Embedded BM25 index: a directory of immutable segments plus a manifest.
+
+Added documents are buffered and written as a new segment every
+``flush_docs`` documents or on ``flush()``, the same "searchable after the
+next refresh" contract as OpenSearch. A document re-added under the same URL
+deletes its older copy. Tiers of ``merge_factor`` similarly sized segments are
+merged in a background thread, dropping deleted documents. Searches work on
+whichever list of segments was current when they started. Another process
+(the API, say) picks up new segments when the manifest changes; there is one
+writer per index directory.
+
+Scoring is BM25 over a weighted title/snippet/body term frequency. Top-k
+retrieval is document-at-a-time MaxScore: each term's posting list carries an
+upper bound on its contribution, so lists that cannot lift a document into
+the current top k are only probed, never scanned.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+from .segment import Segment, SegmentBuilder, tokenize
+
+MANIFEST = "segments.json"
+
+
+class BM25Index:
+    def __init__(
+        self,
+        path: str,
+        k1: float = 1.2,
+        b: float = 0.75,
+        flush_docs: int = 10000,
+        merge_factor: int = 10,
+        background_merge: bool = True,
+    ):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.flush_docs = flush_docs
+        self.merge_factor = merge_factor
+        self.background_merge = background_merge
+        self._segments: Tuple[Segment, ...] = ()
+        self._next_gen = 1
+        self._manifest_mtime = None
+        self._buffer: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.RLock()
+        self._merging = False
+        self._merge_thread: threading.Thread | None = None
+        self.reopen()
+
+    # ------------------------------------------------------------------
+    # manifest
+    # ------------------------------------------------------------------
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST)
+
+    def reopen(self) -> bool:
+        """Reload the segment list if the manifest changed on disk; True if it did."""
+        try:
+            mtime = os.stat(self._manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._manifest_mtime:
+            return False
+        with self._lock:
+            with open(self._manifest_path) as fh:
+                manifest = json.load(fh)
+            current = {s.name: s for s in self._segments}
+            segments = []
+            for name in manifest["segments"]:
+                seg = current.get(name)
+                if seg is None:
+                    seg = Segment(os.path.join(self.path, name))
+                else:  # the writer rewrites the manifest after changing deletions
+                    seg.load_deletions()
+                segments.append(seg)
+            self._segments = tuple(segments)
+            self._next_gen = manifest["next_gen"]
+            self._manifest_mtime = mtime
+        return True
+
+    def _write_manifest(self, segments: Iterable[Segment]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._manifest_path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"next_gen": self._next_gen, "segments": [s.name for s in segments]}, fh)
+        os.replace(tmp, self._manifest_path)
+        self._manifest_mtime = os.stat(self._manifest_path).st_mtime_ns
+
+    def _new_segment_path(self) -> str:
+        name = f"seg_{self._next_gen:08d}.bm25"
+        self._next_gen += 1
+        return os.path.join(self.path, name)
+
+    # ------------------------------------------------------------------
+    # writes
+    # ------------------------------------------------------------------
+    def add(self, doc: Dict[str, str]) -> None:
+        """Buffer ``doc`` (``url`` plus optional ``title``/``snippet``/``body``)."""
+        with self._lock:
+            self._buffer.pop(doc["url"], None)
+            self._buffer[doc["url"]] = doc
+            if len(self._buffer) >= self.flush_docs:
+                self.flush()
+
+    def flush(self) -> Segment | None:
+        """Write the buffered documents as a new segment and make them searchable."""
+        with self._lock:
+            if not self._buffer:
+                return None
+            builder = SegmentBuilder()
+            for doc in self._buffer.values():
+                builder.add_document(doc)
+            os.makedirs(self.path, exist_ok=True)
+            seg_path = self._new_segment_path()
+            builder.write(seg_path)
+            segment = Segment(seg_path)
+            self._delete_older(self._segments, builder.urls)
+            segments = self._segments + (segment,)
+            self._write_manifest(segments)
+            self._segments = segments
+            self._buffer = {}
+        self.maybe_merge()
+        return segment
+
+    @staticmethod
+    def _delete_older(segments: Iterable[Segment], urls: Iterable[str]) -> None:
+        urls = list(urls)
+        for seg in segments:
+            changed = False
+            for url in urls:
+                docid = seg.url_doc(url)
+                if docid is not None:
+                    changed |= seg.delete(docid)
+            if changed:
+                seg.save_deletions()
+
+    # ------------------------------------------------------------------
+    # merges
+    # ------------------------------------------------------------------
+    def _merge_candidates(self) -> List[Segment]:
+        tiers: Dict[int, List[Segment]] = {}
+        for seg in self._segments:
+            tier = int(math.log(max(seg.live_docs, 1), self.merge_factor))
+            tiers.setdefault(tier, []).append(seg)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                return tiers[tier][: self.merge_factor]
+        return []
+
+    def maybe_merge(self) -> None:
+        with self._lock:
+            if self._merging:
+                return
+            victims = self._merge_candidates()
+            if not victims:
+                return
+            self._merging = True
+        if self.background_merge:
+            self._merge_thread = threading.Thread(target=self._merge_and_continue, args=(victims,), daemon=True)
+            self._merge_thread.start()
+        else:
+            self._merge_and_continue(victims)
+
+    def _merge_and_continue(self, victims: List[Segment]) -> None:
+        try:
+            self.merge(victims)
+        finally:
+            with self._lock:
+                self._merging = False
+        self.maybe_merge()
+
+    def wait_for_merges(self) -> None:
+        # a finishing merge may start the next one before it exits
+        while self._merge_thread is not None and self._merge_thread.is_alive():
+            self._merge_thread.join()
+
+    def force_merge(self) -> None:
+        """Merge every segment into one (e.g. after a bulk build)."""
+        self.flush()
+        self.wait_for_merges()
+        if len(self._segments) > 1 or any(s.n_deleted for s in self._segments):
+            self.merge(list(self._segments))
+
+    def merge(self, victims: List[Segment]) -> Segment:
+        """Rewrite ``victims`` as one segment without their deleted documents."""
+        builder = SegmentBuilder()
+        remap: List[Dict[int, int]] = []
+        for seg in victims:
+            mapping = {}
+            for docid in range(seg.n_docs):
+                if not seg.is_deleted(docid):
+                    stored = seg.stored_raw(docid)
+                    url = json.loads(stored)["url"]
+                    mapping[docid] = builder.new_doc(url, stored, seg.doc_lens[docid])
+            remap.append(mapping)
+        # new ids grow with (segment, old id), so appending per segment keeps postings sorted
+        for seg, mapping in zip(victims, remap):
+            for term, tid in seg.terms():
+                docs, tfs = seg.postings(tid)
+                for docid, tf in zip(docs, tfs):
+                    new = mapping.get(docid)
+                    if new is not None:
+                        builder.add_posting(term, new, tf)
+
+        with self._lock:
+            seg_path = self._new_segment_path()
+        builder.write(seg_path)
+        merged = Segment(seg_path)
+        with self._lock:
+            # carry over deletions that happened while the merge was running
+            changed = False
+            for seg, mapping in zip(victims, remap):
+                for old, new in mapping.items():
+                    if seg.is_deleted(old):
+                        changed |= merged.delete(new)
+            if changed:
+                merged.save_deletions()
+            names = {s.name for s in victims}
+            segments, placed = [], False
+            for seg in self._segments:
+                if seg.name in names:
+                    if not placed:
+                        segments.append(merged)
+                        placed = True
+                else:
+                    segments.append(seg)
+            self._write_manifest(segments)
+            self._segments = tuple(segments)
+        for seg in victims:
+            for path in (seg.path, seg.del_path):
+                try:
+                    os.remove(path)
+                except OSError:  # still mapped on platforms that forbid it; gone on next merge
+                    pass
+        return merged
+
+    # ------------------------------------------------------------------
+    # search
+    # ------------------------------------------------------------------
+    def search(self, query: str, k: int = 10, offset: int = 0) -> List[Tuple[float, Dict[str, str]]]:
+        """Return ``(score, stored fields)`` for hits ``offset .. offset+k`` by BM25 score."""
+        segments = self._segments
+        terms = list(dict.fromkeys(tokenize(query)))
+        n_docs = sum(s.n_docs for s in segments)
+        if not terms or not n_docs:
+            return []
+        avgdl = max(sum(s.total_len for s in segments) / n_docs, 1.0)
+        scoring = []
+        for term in terms:
+            tids = [s.term_id(term) for s in segments]
+            df = sum(s.post_offs[t + 1] - s.post_offs[t] for s, t in zip(segments, tids) if t is not None)
+            if df:
+                scoring.append((tids, math.log(1 + (n_docs - df + 0.5) / (df + 0.5))))
+        top = offset + k
+        heap: List[Tuple[float, int, int]] = []
+        for si, seg in enumerate(segments):
+            lists = [(tids[si], idf) for tids, idf in scoring if tids[si] is not None]
+            if lists:
+                self._search_segment(si, seg, lists, avgdl, top, heap)
+        ranked = sorted(heap, reverse=True)[offset:]
+        return [(score, segments[si].stored(docid)) for score, si, docid in ranked]
+
+    def _search_segment(self, si, seg, lists, avgdl, top, heap) -> None:
+        k1, b = self.k1, self.b
+        cursors = []
+        for tid, idf in lists:
+            docs, tfs = seg.postings(tid)
+            # the best a term can add: highest tf in its shortest document
+            max_tf, min_len = seg.max_tf[tid], seg.min_len[tid]
+            bound = idf * max_tf * (k1 + 1) / (max_tf + k1 * (1 - b + b * min_len / avgdl))
+            cursors.append([bound, idf, docs, tfs, 0, len(docs)])
+        cursors.sort(key=lambda c: c[0])
+        cum, acc = [], 0.0
+        for c in cursors:
+            acc += c[0]
+            cum.append(acc)
+        lens = seg.doc_lens
+        threshold = heap[0][0] if len(heap) >= top else 0.0
+        first = 0  # cursors[first:] are essential: a new top-k document must appear in one of them
+        while True:
+            while first < len(cursors) and cum[first] <= threshold:
+                first += 1
+            if first == len(cursors):
+                return
+            essential = cursors[first:]
+            docid = min((c[2][c[4]] for c in essential if c[4] < c[5]), default=None)
+            if docid is None:
+                return
+            norm = k1 * (1 - b + b * lens[docid] / avgdl)
+            score = 0.0
+            for c in essential:
+                pos = c[4]
+                if pos < c[5] and c[2][pos] == docid:
+                    tf = c[3][pos]
+                    score += c[1] * tf * (k1 + 1) / (tf + norm)
+                    c[4] = pos + 1
+            if seg.is_deleted(docid):
+                continue
+            for i in range(first - 1, -1, -1):
+                if score + cum[i] <= threshold:
+                    break
+                c = cursors[i]
+                pos = bisect_left(c[2], docid, c[4], c[5])
+                c[4] = pos
+                if pos < c[5] and c[2][pos] == docid:
+                    tf = c[3][pos]
+                    score += c[1] * tf * (k1 + 1) / (tf + norm)
+                    c[4] = pos + 1
+            if len(heap) < top:
+                heapq.heappush(heap, (score, si, docid))
+            elif score > threshold:
+                heapq.heapreplace(heap, (score, si, docid))
+            else:
+                continue
+            if len(heap) >= top:
+                threshold = heap[0][0]
+
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, object]:
+        segments = self._segments
+        return {
+            "segments": len(segments),
+            "docs": sum(s.live_docs for s in segments),
+            "deleted": sum(s.n_deleted for s in segments),
+            "bytes": sum(s.size_bytes for s in segments),
+            "buffered": len(self._buffer),
+            "merging": self._merging,
+        }
@@ -0,0 +1,269 @@
+"""Immutable on-disk segments of the embedded BM25 index.
+
+A segment is one file: a fixed header followed by flat, 8-byte aligned arrays
+(term dictionary, postings, document lengths, stored fields, URL lookup). It
+is opened with ``mmap`` and every array is a zero-copy ``memoryview`` cast, so
+an open segment costs page cache, not Python objects. Deletions live in a
+small ``.del`` bitmap next to the segment and are the only mutable part.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+MAGIC = b"CBM25\x00\x00\x01"
+# magic, n_docs, n_terms, total weighted length
+_HEADER = struct.Struct("<8sIIQ")
+# (name, typecode); typecode None means raw bytes
+_SECTIONS: List[Tuple[str, str | None]] = [
+    ("term_blob", None),
+    ("term_offs", "Q"),
+    ("post_offs", "Q"),
+    ("max_tf", "H"),
+    ("min_len", "I"),
+    ("post_docs", "I"),
+    ("post_tfs", "H"),
+    ("doc_lens", "I"),
+    ("store_blob", None),
+    ("store_offs", "Q"),
+    ("url_blob", None),
+    ("url_offs", "Q"),
+    ("url_docs", "I"),
+]
+_TABLE = struct.Struct("<" + "QQ" * len(_SECTIONS))
+
+# field weights fold title/snippet/body into one term frequency (a simple BM25F)
+FIELDS = (("title", 2), ("snippet", 1), ("body", 1))
+_MAX_TF = 0xFFFF
+_token = re.compile(r"\w+")
+
+if sys.byteorder != "little":  # arrays are written in native order
+    raise ImportError("the embedded BM25 index requires a little-endian platform")
+
+
+def tokenize(text: str | None) -> List[str]:
+    return [t for t in _token.findall(text.lower()) if len(t) <= 40] if text else []
+
+
+def analyze(doc: Dict[str, str]) -> Tuple[Counter, int]:
+    """Weighted term frequencies and weighted length of ``doc``."""
+    tf: Counter = Counter()
+    length = 0
+    for field, weight in FIELDS:
+        tokens = tokenize(doc.get(field))
+        length += weight * len(tokens)
+        for tok in tokens:
+            tf[tok] += weight
+    return tf, length
+
+
+class _Blob:
+    """Byte strings packed into one buffer; indexable so ``bisect`` works on it."""
+
+    __slots__ = ("blob", "offs")
+
+    def __init__(self, blob, offs):
+        self.blob = blob
+        self.offs = offs
+
+    def __len__(self) -> int:
+        return len(self.offs) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self.blob[self.offs[i]:self.offs[i + 1]])
+
+
+# ----------------------------------------------------------------------
+# writing
+# ----------------------------------------------------------------------
+class SegmentBuilder:
+    """Collects documents (or postings from merged segments) and writes one segment."""
+
+    def __init__(self):
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_lens = array("I")
+        self.stored: List[bytes] = []
+        self.urls: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def add_document(self, doc: Dict[str, str]) -> int:
+        tf, length = analyze(doc)
+        stored = {"url": doc["url"], "title": doc.get("title") or "", "snippet": doc.get("snippet") or ""}
+        if not stored["snippet"] and doc.get("body"):
+            stored["snippet"] = doc["body"][:300]
+        docid = self.new_doc(doc["url"], json.dumps(stored, ensure_ascii=False).encode(), length)
+        for term, n in tf.items():
+            self.add_posting(term, docid, n)
+        return docid
+
+    def new_doc(self, url: str, stored: bytes, length: int) -> int:
+        self.urls.append(url)
+        self.stored.append(stored)
+        self.doc_lens.append(min(length, 0xFFFFFFFF))
+        return len(self.urls) - 1
+
+    def add_posting(self, term: str, docid: int, tf: int) -> None:
+        """Postings of a term must be added in increasing ``docid`` order."""
+        lists = self.postings.get(term)
+        if lists is None:
+            lists = self.postings[term] = (array("I"), array("H"))
+        lists[0].append(docid)
+        lists[1].append(min(tf, _MAX_TF))
+
+    def write(self, path: str) -> None:
+        terms = sorted(self.postings)
+        term_enc = [t.encode() for t in terms]
+        sections: Dict[str, bytes | array] = {
+            "term_blob": b"".join(term_enc),
+            "term_offs": _offsets(term_enc),
+            "post_offs": array("Q", [0]),
+            "max_tf": array("H"),
+            "min_len": array("I"),
+            "post_docs": array("I"),
+            "post_tfs": array("H"),
+            "doc_lens": self.doc_lens,
+            "store_blob": b"".join(self.stored),
+            "store_offs": _offsets(self.stored),
+        }
+        for term in terms:
+            docs, tfs = self.postings[term]
+            sections["post_docs"].extend(docs)
+            sections["post_tfs"].extend(tfs)
+            sections["post_offs"].append(len(sections["post_docs"]))
+            sections["max_tf"].append(max(tfs))
+            sections["min_len"].append(min(self.doc_lens[d] for d in docs))
+        by_url = sorted(range(len(self.urls)), key=self.urls.__getitem__)
+        url_enc = [self.urls[i].encode() for i in by_url]
+        sections["url_blob"] = b"".join(url_enc)
+        sections["url_offs"] = _offsets(url_enc)
+        sections["url_docs"] = array("I", by_url)
+
+        header = _HEADER.pack(MAGIC, len(self.urls), len(terms), sum(self.doc_lens))
+        pos = _align(len(header) + _TABLE.size)
+        table, chunks = [], []
+        for name, _ in _SECTIONS:
+            data = sections[name]
+            raw = data.tobytes() if isinstance(data, array) else data
+            table += [pos, len(raw)]
+            chunks.append((pos, raw))
+            pos = _align(pos + len(raw))
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(header + _TABLE.pack(*table))
+            for offset, raw in chunks:
+                fh.seek(offset)
+                fh.write(raw)
+            fh.truncate(pos)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+
+def _offsets(parts: Iterable[bytes]) -> array:
+    offs = array("Q", [0])
+    pos = 0
+    for p in parts:
+        pos += len(p)
+        offs.append(pos)
+    return offs
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+# ----------------------------------------------------------------------
+# reading
+# ----------------------------------------------------------------------
+class Segment:
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        magic, self.n_docs, self.n_terms, self.total_len = _HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a BM25 segment")
+        table = _TABLE.unpack_from(buf, _HEADER.size)
+        for i, (name, code) in enumerate(_SECTIONS):
+            offset, length = table[2 * i], table[2 * i + 1]
+            view = buf[offset:offset + length]
+            setattr(self, name, view.cast(code) if code else view)
+        self._terms = _Blob(self.term_blob, self.term_offs)
+        self._urls = _Blob(self.url_blob, self.url_offs)
+        self.load_deletions()
+
+    @property
+    def del_path(self) -> str:
+        return self.path + ".del"
+
+    @property
+    def live_docs(self) -> int:
+        return self.n_docs - self.n_deleted
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._mm)
+
+    # lookups ------------------------------------------------------------
+    def term_id(self, term: str) -> int | None:
+        key = term.encode()
+        i = bisect_left(self._terms, key)
+        return i if i < self.n_terms and self._terms[i] == key else None
+
+    def postings(self, tid: int) -> Tuple[memoryview, memoryview]:
+        lo, hi = self.post_offs[tid], self.post_offs[tid + 1]
+        return self.post_docs[lo:hi], self.post_tfs[lo:hi]
+
+    def terms(self) -> Iterable[Tuple[str, int]]:
+        for tid in range(self.n_terms):
+            yield self._terms[tid].decode(), tid
+
+    def stored(self, docid: int) -> Dict[str, str]:
+        return json.loads(bytes(self.store_blob[self.store_offs[docid]:self.store_offs[docid + 1]]))
+
+    def stored_raw(self, docid: int) -> bytes:
+        return bytes(self.store_blob[self.store_offs[docid]:self.store_offs[docid + 1]])
+
+    def url_doc(self, url: str) -> int | None:
+        key = url.encode()
+        i = bisect_left(self._urls, key)
+        if i < self.n_docs and self._urls[i] == key:
+            return self.url_docs[i]
+        return None
+
+    # deletions ----------------------------------------------------------
+    def load_deletions(self) -> None:
+        self.deleted = bytearray((self.n_docs + 7) // 8)
+        if os.path.exists(self.del_path):
+            with open(self.del_path, "rb") as fh:
+                data = fh.read()
+            self.deleted[: len(data)] = data
+        self.n_deleted = sum(bin(b).count("1") for b in self.deleted)
+
+    def is_deleted(self, docid: int) -> bool:
+        return bool(self.deleted[docid >> 3] & (1 << (docid & 7)))
+
+    def delete(self, docid: int) -> bool:
+        if self.is_deleted(docid):
+            return False
+        self.deleted[docid >> 3] |= 1 << (docid & 7)
+        self.n_deleted += 1
+        return True
+
+    def save_deletions(self) -> None:
+        tmp = self.del_path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(self.deleted)
+        os.replace(tmp, self.del_path)
@@ -0,0 +1,228 @@
+"""Write-behind bulk indexer for OpenSearch.
+
+Writes are queued and sent by one background task in bulk requests, flushed
+when ``COMPASS_BULK_MAX_DOCS`` actions are waiting or ``COMPASS_BULK_FLUSH_MS``
+has passed. Nothing forces a refresh; documents become searchable on the
+index's own refresh cycle. Items rejected with a retryable status are retried
+with backoff. Bulk results are matched to actions by position, so two writes to
+the same document in one batch keep their own outcomes. The queue is bounded: ``submit`` waits for room (backpressure),
+``submit_nowait`` drops and counts the write instead, for request paths that
+must never wait on indexing.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from .config import settings
+from . import index_client
+from .index_client import async_streaming_bulk, get_index_client
+
+_RETRYABLE = {429, 502, 503, 504}
+# queued by ``stop``: the consumer flushes what it holds, drains the queue and exits
+_STOP = object()
+
+
+class BulkIndexer:
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.stats = {
+            "queued": 0,
+            "indexed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "retries": 0,
+            "flushes": 0,
+            "last_visible_at": None,
+        }
+
+    # ------------------------------------------------------------------
+    # lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=settings.bulk_max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush what is queued and stop the background task.
+
+        The task is never cancelled: a batch it is collecting, sending or
+        retrying still completes, so every awaited ``submit`` future resolves.
+        """
+        if self._task is None:
+            return
+        if not self._task.done():
+            await self._queue.put((_STOP, None))
+            await self._task
+        # anything submitted after the consumer drained the queue
+        batch = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item[0] is not _STOP:
+                batch.append(item)
+        if batch:
+            await self._send(batch)
+        self._task = None
+
+    def on_indexed(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call ``listener(action)`` for every action the index accepted."""
+        self._listeners.append(listener)
+
+    # ------------------------------------------------------------------
+    # producers
+    # ------------------------------------------------------------------
+    async def submit(self, action: Dict[str, Any]) -> asyncio.Future:
+        """Queue ``action``, waiting while the queue is full.
+
+        Returns a future resolved with the time (epoch seconds) by which the
+        document is visible to searches, or with the error if it was dropped.
+        """
+        done = asyncio.get_running_loop().create_future()
+        # callers may ignore the outcome; mark errors as retrieved either way
+        done.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if not index_client.enabled:
+            done.set_result(None)
+            return done
+        self.start()
+        await self._queue.put((action, done))
+        self.stats["queued"] += 1
+        return done
+
+    def submit_nowait(self, action: Dict[str, Any]) -> bool:
+        """Queue ``action`` without waiting; returns False (and counts a drop) when full."""
+        if not index_client.enabled:
+            return False
+        self.start()
+        try:
+            self._queue.put_nowait((action, None))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    # ------------------------------------------------------------------
+    # consumer
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            stopping = first[0] is _STOP
+            batch = [] if stopping else [first]
+            deadline = loop.time() + settings.bulk_flush_ms / 1000
+            while not stopping and len(batch) < settings.bulk_max_docs:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item[0] is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            if batch:
+                await self._send(batch)
+        # stopping: send everything still queued, in batches
+        while not self._queue.empty():
+            batch = []
+            while len(batch) < settings.bulk_max_docs and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item[0] is not _STOP:
+                    batch.append(item)
+            if batch:
+                await self._send(batch)
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future | None]]) -> None:
+        try:
+            await self._flush(batch)
+        except Exception as exc:
+            print(f"[Compass] Bulk flush failed: {exc}")
+            for _, done in batch:
+                self._resolve(done, exc)
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future | None]]) -> None:
+        client = get_index_client()
+        pending = batch
+        error: Exception | None = None
+        for attempt in range(settings.bulk_max_retries + 1):
+            if attempt:
+                self.stats["retries"] += len(pending)
+                await asyncio.sleep(min(0.5 * 2 ** (attempt - 1), 10))
+            # results come back in action order; matched by position, since two writes
+            # to the same URL in one batch share an _id
+            results = []
+            error = RuntimeError("bulk items rejected after retries")
+            try:
+                async for ok, item in async_streaming_bulk(
+                    client,
+                    [action for action, _ in pending],
+                    chunk_size=settings.bulk_max_docs,
+                    raise_on_error=False,
+                    request_timeout=settings.opensearch_timeout,
+                ):
+                    results.append((ok, next(iter(item.values()))))
+            except Exception as exc:  # a request failed: retry the actions it carried and after
+                error = exc
+            # position of the last write per _id that landed; an earlier write to the same
+            # _id is superseded by it and must not be retried over it
+            landed = {}
+            for pos, ((action, _), (ok, _)) in enumerate(zip(pending, results)):
+                if ok:
+                    landed[action.get("_id")] = pos
+            retry = []
+            for pos, ((action, done), (ok, info)) in enumerate(zip(pending, results)):
+                if ok:
+                    self._resolve(done, None)
+                    self._notify(action)
+                elif info.get("status") in _RETRYABLE and landed.get(action.get("_id"), -1) > pos:
+                    self._resolve(done, None)
+                elif info.get("status") in _RETRYABLE:
+                    retry.append((action, done))
+                else:
+                    self._resolve(done, RuntimeError(str(info.get("error"))))
+            # in submission order, so the later of two writes to one URL still lands last
+            pending = retry + pending[len(results):]
+            if not pending:
+                break
+        for _, done in pending:
+            self._resolve(done, error)
+        self.stats["flushes"] += 1
+
+    def _resolve(self, done: asyncio.Future | None, error: Exception | None) -> None:
+        if error is None:
+            self.stats["indexed"] += 1
+            visible_at = time.time() + settings.bulk_refresh_interval_s
+            self.stats["last_visible_at"] = visible_at
+        else:
+            self.stats["failed"] += 1
+        if done is None or done.done():
+            return
+        if error is None:
+            done.set_result(visible_at)
+        else:
+            done.set_exception(error)
+
+    def _notify(self, action: Dict[str, Any]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(action)
+            except Exception as exc:
+                print(f"[Compass] Bulk listener failed: {exc}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "backlog": self._queue.qsize() if self._queue else 0}
+
+
+indexer = BulkIndexer()
@@ -0,0 +1,202 @@
+"""Tiered query-result cache with per-vertical TTL and stale-while-revalidate.
+
+Tier 1 is an in-process LRU. Tier 2 is shared and optional: the OpenSearch
+``google_cache`` index when a client is configured, otherwise a directory of
+JSON files (``COMPASS_CACHE_DIR``). Entries past their TTL but inside the
+stale window are served immediately while one background task refreshes them.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .config import settings
+from .index_client import get_index_client
+
+
+def cache_key(query: str, search_type: str, start: int, limit: int) -> str:
+    """Normalized key: case and whitespace differences map to the same entry."""
+    q = " ".join(query.lower().split())
+    return hashlib.sha1(f"{search_type}|{start}|{limit}|{q}".encode()).hexdigest()
+
+
+# entries are only ever fetched by id: the payload is stored, never analyzed
+CACHE_INDEX_BODY: Dict[str, Any] = {
+    "settings": {"index": {"number_of_shards": 1, "refresh_interval": "30s"}},
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            "payload": {"type": "text", "index": False},
+            "stored_at": {"type": "date", "format": "epoch_second"},
+            "expires_at": {"type": "date", "format": "epoch_second"},
+            "stale_until": {"type": "date", "format": "epoch_second"},
+        },
+    },
+}
+
+
+class OpenSearchTier:
+    """Second tier stored as documents in an OpenSearch index."""
+
+    def __init__(self, index: str):
+        self._index = index
+
+    async def ensure(self) -> None:
+        """Create the index; one created by dynamic mapping (payload analyzed) is replaced,
+        since it only holds cache entries."""
+        client = get_index_client()
+        if await client.indices.exists(index=self._index):
+            mapping = await client.indices.get_mapping(index=self._index)
+            props = next(iter(mapping.values()), {}).get("mappings", {}).get("properties", {})
+            if props.get("payload", {}).get("index") is False:
+                return
+            await client.indices.delete(index=self._index, ignore=[404])
+        await client.indices.create(index=self._index, body=CACHE_INDEX_BODY, ignore=[400])
+
+    async def get(self, key: str) -> Dict[str, Any] | None:
+        doc = await get_index_client().get(index=self._index, id=key, ignore=[404])
+        if not doc or not doc.get("found"):
+            return None
+        src = doc["_source"]
+        if "payload" not in src:
+            return None  # legacy entry written before TTLs existed
+        return {**src, "payload": json.loads(src["payload"])}
+
+    async def put(self, key: str, entry: Dict[str, Any]) -> None:
+        body = {**entry, "payload": json.dumps(entry["payload"])}
+        await get_index_client().index(index=self._index, id=key, body=body)
+
+
+class FileTier:
+    """Second tier stored as one JSON file per key under a directory."""
+
+    def __init__(self, directory: str):
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    def _read(self, key: str) -> Dict[str, Any] | None:
+        try:
+            return json.loads((self._dir / f"{key}.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, entry: Dict[str, Any]) -> None:
+        tmp = self._dir / f"{key}.tmp"
+        tmp.write_text(json.dumps(entry))
+        os.replace(tmp, self._dir / f"{key}.json")
+
+    async def get(self, key: str) -> Dict[str, Any] | None:
+        return await asyncio.to_thread(self._read, key)
+
+    async def put(self, key: str, entry: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._write, key, entry)
+
+
+class QueryCache:
+    """Two-tier cache; values must be JSON-serializable payloads."""
+
+    def __init__(self, max_entries: int, tier2: OpenSearchTier | FileTier | None = None):
+        self._max = max_entries
+        self._lru: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._tier2 = tier2
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._writes: set[asyncio.Task] = set()
+        self.stats = {"hits": 0, "stale_hits": 0, "tier2_hits": 0, "misses": 0, "refreshes": 0}
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._max:
+            self._lru.popitem(last=False)
+
+    async def _lookup(self, key: str) -> Dict[str, Any] | None:
+        entry = self._lru.get(key)
+        if entry is not None:
+            self._lru.move_to_end(key)
+            return entry
+        if self._tier2 is None:
+            return None
+        try:
+            entry = await self._tier2.get(key)
+        except Exception as exc:
+            print(f"[Compass] Cache tier-2 read failed: {exc}")
+            return None
+        if entry is not None:
+            self.stats["tier2_hits"] += 1
+            self._remember(key, entry)
+        return entry
+
+    async def _store(self, key: str, payload: Any, ttl: float) -> None:
+        now = time.time()
+        entry = {
+            "payload": payload,
+            "stored_at": now,
+            "expires_at": now + ttl,
+            "stale_until": now + ttl + settings.cache_stale_s,
+        }
+        self._remember(key, entry)
+        if self._tier2 is not None:
+            # the shared tier is written behind; callers never wait on it
+            task = asyncio.create_task(self._write_tier2(key, entry))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _write_tier2(self, key: str, entry: Dict[str, Any]) -> None:
+        try:
+            await self._tier2.put(key, entry)
+        except Exception as exc:
+            print(f"[Compass] Cache tier-2 write failed: {exc}")
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[Tuple[Any, float]]]) -> None:
+        try:
+            payload, ttl = await fetch()
+            await self._store(key, payload, ttl)
+            self.stats["refreshes"] += 1
+        except Exception as exc:
+            print(f"[Compass] Cache refresh failed: {exc}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def _revalidate(self, key: str, fetch: Callable[[], Awaitable[Tuple[Any, float]]]) -> None:
+        self.stats["stale_hits"] += 1
+        if key not in self._refreshing:
+            self._refreshing[key] = asyncio.create_task(self._refresh(key, fetch))
+
+    async def peek(self, key: str, fetch: Callable[[], Awaitable[Tuple[Any, float]]] | None = None) -> Any | None:
+        """Return the cached payload for ``key`` or None, never waiting on ``fetch``.
+
+        A stale entry is still returned and, when ``fetch`` is given, refreshed
+        in the background.
+        """
+        entry = await self._lookup(key)
+        now = time.time()
+        if entry is None or now >= entry["stale_until"]:
+            return None
+        if now < entry["expires_at"]:
+            self.stats["hits"] += 1
+        elif fetch is not None:
+            self._revalidate(key, fetch)
+        return entry["payload"]
+
+    async def put(self, key: str, payload: Any, ttl: float) -> None:
+        await self._store(key, payload, ttl)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Tuple[Any, float]]]) -> Any:
+        """Return the cached payload for ``key``, calling ``fetch`` on a miss.
+
+        ``fetch`` returns ``(payload, ttl_seconds)``. A stale entry is returned
+        as-is and refreshed in the background, at most once per key at a time.
+        """
+        payload = await self.peek(key, fetch)
+        if payload is not None:
+            return payload
+        self.stats["misses"] += 1
+        payload, ttl = await fetch()
+        await self._store(key, payload, ttl)
+        return payload
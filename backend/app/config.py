@@ -34,4 +34,101 @@ class Settings:
         # Compass AI API key (Serper API key)
         self.compass_api_key: str = os.getenv("SERPER_API_KEY", "")
 
+        # Latency budget (ms) for one search fan-out across all adapters
+        self.search_budget_ms: int = int(os.getenv("COMPASS_SEARCH_BUDGET_MS", "3000"))
+        # Per-adapter soft deadlines in ms, format: name:ms;name2:ms (capped by the budget)
+        self.adapter_deadlines_ms: Dict[str, int] = {}
+        for pair in os.getenv("COMPASS_ADAPTER_DEADLINES", "").split(';'):
+            if ':' in pair:
+                name, ms = pair.split(':', 1)
+                self.adapter_deadlines_ms[name.strip()] = int(ms)
+        # Hedged retries for adapters with tail latency; paid adapters excluded by default
+        self.hedge_enabled: bool = os.getenv("COMPASS_HEDGE", "1") not in ("0", "false", "")
+        self.hedge_min_samples: int = int(os.getenv("COMPASS_HEDGE_MIN_SAMPLES", "20"))
+        self.hedge_exclude: list[str] = [
+            a.strip() for a in os.getenv("COMPASS_HEDGE_EXCLUDE", "google_cse").split(',') if a.strip()
+        ]
+
+        # Query-result cache: LRU size, TTL per vertical (seconds), stale-while-revalidate window
+        self.cache_max_entries: int = int(os.getenv("COMPASS_CACHE_SIZE", "2048"))
+        self.cache_ttls: Dict[str, int] = {"web": 900, "images": 3600, "videos": 3600, "news": 120}
+        for pair in os.getenv("COMPASS_CACHE_TTLS", "").split(';'):
+            if ':' in pair:
+                name, ttl = pair.split(':', 1)
+                self.cache_ttls[name.strip()] = int(ttl)
+        self.cache_stale_s: int = int(os.getenv("COMPASS_CACHE_STALE", "3600"))
+        # Local second-tier cache directory, used when OpenSearch is not configured
+        self.cache_dir: str = os.getenv("COMPASS_CACHE_DIR", "")
+
+        # Result fusion: strategy (rrf or concat), RRF constant and per-adapter weights (name:w;name2:w)
+        self.fusion: str = os.getenv("COMPASS_FUSION", "rrf")
+        self.fusion_rrf_k: int = int(os.getenv("COMPASS_FUSION_RRF_K", "60"))
+        self.fusion_weights: Dict[str, float] = {}
+        for pair in os.getenv("COMPASS_FUSION_WEIGHTS", "").split(';'):
+            if ':' in pair:
+                name, weight = pair.split(':', 1)
+                self.fusion_weights[name.strip()] = float(weight)
+        # Near-duplicate collapsing of merged results: on/off and max SimHash bit distance
+        self.near_dup: bool = os.getenv("COMPASS_NEAR_DUP", "1") not in ("0", "false", "")
+        self.near_dup_distance: int = int(os.getenv("COMPASS_NEAR_DUP_DISTANCE", "3"))
+
+        # POST /search/batch: queries in flight at once and maximum queries per request
+        self.batch_concurrency: int = int(os.getenv("COMPASS_BATCH_CONCURRENCY", "8"))
+        self.batch_max_queries: int = int(os.getenv("COMPASS_BATCH_MAX_QUERIES", "10000"))
+
+        # Shared outbound HTTP pool (HTTP/2 when available, keep-alive, per-host concurrency cap)
+        self.http2: bool = os.getenv("COMPASS_HTTP2", "1") not in ("0", "false", "")
+        self.http_max_connections: int = int(os.getenv("COMPASS_HTTP_MAX_CONNECTIONS", "200"))
+        self.http_max_keepalive: int = int(os.getenv("COMPASS_HTTP_MAX_KEEPALIVE", "50"))
+        self.http_keepalive_expiry: float = float(os.getenv("COMPASS_HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.http_max_per_host: int = int(os.getenv("COMPASS_HTTP_MAX_PER_HOST", "32"))
+
+        # OpenSearch: connections kept per node and per-call timeout (seconds)
+        self.opensearch_pool_size: int = int(os.getenv("COMPASS_OPENSEARCH_POOL", "25"))
+        self.opensearch_timeout: float = float(os.getenv("COMPASS_OPENSEARCH_TIMEOUT", "5"))
+
+        # DuckDuckGo media verticals: worker threads, per-call timeout (s), small result cache
+        self.ddg_media_workers: int = int(os.getenv("COMPASS_DDG_MEDIA_WORKERS", "4"))
+        self.ddg_media_timeout: float = float(os.getenv("COMPASS_DDG_MEDIA_TIMEOUT", "8"))
+        self.ddg_media_cache_size: int = int(os.getenv("COMPASS_DDG_MEDIA_CACHE_SIZE", "256"))
+        self.ddg_media_cache_ttl: int = int(os.getenv("COMPASS_DDG_MEDIA_CACHE_TTL", "300"))
+
+        # Google CSE: daily queries allowed per API key and worker threads for the blocking client
+        self.google_daily_quota: int = int(os.getenv("COMPASS_GOOGLE_DAILY_QUOTA", "100"))
+        self.google_workers: int = int(os.getenv("COMPASS_GOOGLE_WORKERS", "8"))
+
+        # Budget (ms) for fetching several 10-result pages in parallel when limit > 10
+        self.multipage_budget_ms: int = int(os.getenv("COMPASS_MULTIPAGE_BUDGET_MS", "2500"))
+
+        # Write-behind bulk indexer: batch size, flush interval, queue bound, retries,
+        # and the pages index refresh interval used to report when writes become visible
+        self.bulk_max_docs: int = int(os.getenv("COMPASS_BULK_MAX_DOCS", "500"))
+        self.bulk_flush_ms: int = int(os.getenv("COMPASS_BULK_FLUSH_MS", "1000"))
+        self.bulk_max_queue: int = int(os.getenv("COMPASS_BULK_MAX_QUEUE", "10000"))
+        self.bulk_max_retries: int = int(os.getenv("COMPASS_BULK_MAX_RETRIES", "3"))
+        self.bulk_refresh_interval_s: float = float(os.getenv("COMPASS_BULK_REFRESH_INTERVAL", "1"))
+
+        # POST /ingest: documents validated and reported per batch; longer lines are rejected
+        self.ingest_batch: int = int(os.getenv("COMPASS_INGEST_BATCH", "1000"))
+        self.ingest_max_line_bytes: int = int(os.getenv("COMPASS_INGEST_MAX_LINE_BYTES", str(1 << 20)))
+
+        # /suggest: prefix index over page titles and past queries
+        self.suggest_max_entries: int = int(os.getenv("COMPASS_SUGGEST_MAX_ENTRIES", "2000000"))
+        self.suggest_max_pending: int = int(os.getenv("COMPASS_SUGGEST_MAX_PENDING", "5000"))
+        self.suggest_rebuild_s: float = float(os.getenv("COMPASS_SUGGEST_REBUILD_S", "60"))
+        self.suggest_title_weight: float = float(os.getenv("COMPASS_SUGGEST_TITLE_WEIGHT", "0.5"))
+        # a typed query is only suggested to others once it was searched this many times
+        self.suggest_min_query_hits: int = int(os.getenv("COMPASS_SUGGEST_MIN_QUERY_HITS", "3"))
+
+        # Embedded BM25 index (bm25_index adapter); built with `python -m app.bm25`
+        self.bm25_dir: str = os.getenv("COMPASS_BM25_DIR", "")
+        self.bm25_flush_docs: int = int(os.getenv("COMPASS_BM25_FLUSH_DOCS", "10000"))
+        self.bm25_merge_factor: int = int(os.getenv("COMPASS_BM25_MERGE_FACTOR", "10"))
+
+        # local_index ranking: text score times log10(2 + factor * pagerank); 0 turns the boost off
+        self.pagerank_factor: float = float(os.getenv("COMPASS_PAGERANK_FACTOR", "1"))
+
+    def cache_ttl(self, search_type: str) -> int:
+        return self.cache_ttls.get(search_type, self.cache_ttls["web"])
+
 settings = Settings()
@@ -0,0 +1,230 @@
+"""Deadline-bounded fan-out across search adapters.
+
+Every adapter gets a soft deadline capped by the request's overall latency
+budget. Adapters that miss it are cancelled and reported as timed out, so one
+slow upstream no longer decides the latency of the whole search. Adapters with
+a history of tail latency get a hedged second call once the first one is
+slower than their usual p95.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from .config import settings
+from .schemas import SearchResult
+from .singleflight import SingleFlight
+
+
+class LatencyTracker:
+    """Keeps a sliding window of recent call latencies (ms) per adapter."""
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._samples: Dict[str, deque[float]] = {}
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self._window)
+        samples.append(elapsed_ms)
+
+    def quantile(self, name: str, q: float) -> float | None:
+        samples = self._samples.get(name)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def hedge_delay(self, name: str) -> float | None:
+        """Return the delay (ms) after which a hedged call should fire, or None.
+
+        Only adapters with enough samples and a heavy tail (p95 at least twice
+        the median) are hedged; the hedge fires at their observed p95.
+        """
+        samples = self._samples.get(name)
+        if not samples or len(samples) < settings.hedge_min_samples:
+            return None
+        p50 = self.quantile(name, 0.5)
+        p95 = self.quantile(name, 0.95)
+        if not p50 or p95 is None or p95 < 2 * p50:
+            return None
+        return p95
+
+    def snapshot(self) -> Dict[str, Dict[str, float | None]]:
+        return {
+            name: {
+                "samples": len(samples),
+                "p50": self.quantile(name, 0.5),
+                "p95": self.quantile(name, 0.95),
+            }
+            for name, samples in self._samples.items()
+        }
+
+
+latency = LatencyTracker()
+# identical adapter calls in flight at the same time share one upstream request
+flights = SingleFlight()
+
+
+@dataclass
+class FanoutResult:
+    """Outcome of one fan-out; per-adapter lists keep adapter order."""
+
+    results: Dict[str, List[SearchResult]] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)  # ms, per adapter
+    timed_out: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+def soft_deadline(name: str) -> float:
+    """Soft deadline (seconds) for one adapter, never beyond the request budget."""
+    budget = settings.search_budget_ms
+    return min(settings.adapter_deadlines_ms.get(name, budget), budget) / 1000
+
+
+async def _hedged(name: str, call: Callable[[], Awaitable[List[SearchResult]]]) -> List[SearchResult]:
+    """Run ``call``; if it is slower than the adapter's p95, race a second copy."""
+    delay = None
+    if settings.hedge_enabled and name not in settings.hedge_exclude:
+        delay = latency.hedge_delay(name)
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        if delay is None:
+            return await tasks[0]
+        done, _ = await asyncio.wait(tasks, timeout=delay / 1000)
+        if not done:
+            tasks.append(asyncio.ensure_future(call()))
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                # an error from one copy only counts once the other has failed too
+                if task.exception() is None or not pending:
+                    return task.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def _run(
+    name: str,
+    adapter: object,
+    call: Callable[[object], Awaitable[List[SearchResult]]],
+    outcome: FanoutResult,
+    flight_key: str | None = None,
+) -> str:
+    """Run one adapter under its soft deadline and record the outcome."""
+    began = time.perf_counter()
+
+    def _work() -> Awaitable[List[SearchResult]]:
+        if flight_key is None:
+            return _hedged(name, lambda: call(adapter))
+        return flights.do((name, flight_key), lambda: _hedged(name, lambda: call(adapter)))
+
+    try:
+        res = await asyncio.wait_for(_work(), timeout=soft_deadline(name))
+    except asyncio.TimeoutError:
+        outcome.timed_out.append(name)
+        # a timeout is a lower bound on the real latency; keep it in the history
+        latency.record(name, (time.perf_counter() - began) * 1000)
+        return name
+    except Exception as exc:
+        print(f"[Compass] Adapter error ({name}): {exc}")
+        outcome.errors[name] = str(exc)
+        return name
+    finally:
+        outcome.timings[name] = round((time.perf_counter() - began) * 1000, 1)
+    latency.record(name, outcome.timings[name])
+    outcome.results[name] = res
+    return name
+
+
+async def iter_fan_out(
+    adapters: Dict[str, object],
+    call: Callable[[object], Awaitable[List[SearchResult]]],
+    outcome: FanoutResult,
+    flight_key: str | None = None,
+) -> AsyncIterator[Tuple[str, List[SearchResult]]]:
+    """Yield ``(adapter name, results)`` as each adapter finishes in time.
+
+    Timeouts and errors are recorded on ``outcome`` and not yielded. Closing the
+    iterator early (e.g. the client went away) cancels the adapters still running.
+    Calls sharing a ``flight_key`` with one already in flight join it instead of
+    hitting the upstream again.
+    """
+    tasks = [
+        asyncio.ensure_future(_run(name, adapter, call, outcome, flight_key))
+        for name, adapter in adapters.items()
+    ]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            name = await fut
+            if name in outcome.results:
+                yield name, outcome.results[name]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def fan_out(
+    adapters: Dict[str, object],
+    call: Callable[[object], Awaitable[List[SearchResult]]],
+    flight_key: str | None = None,
+) -> FanoutResult:
+    """Call every adapter concurrently under its soft deadline.
+
+    ``call`` receives an adapter instance and returns its coroutine. Adapters
+    that finish in time contribute their results; the rest are cancelled and
+    listed in ``timed_out``.
+    """
+    outcome = FanoutResult()
+    async for _ in iter_fan_out(adapters, call, outcome, flight_key):
+        pass
+    # keep adapter order regardless of completion order
+    outcome.results = {name: outcome.results[name] for name in adapters if name in outcome.results}
+    return outcome
+
+
+async def fetch_pages(
+    fetch_page: Callable[[int, int], Awaitable[List[Any]]],
+    start: int,
+    limit: int,
+    page_size: int = 10,
+) -> List[Any]:
+    """Fetch ``limit`` results from a source capped at ``page_size`` per request.
+
+    ``fetch_page(offset, num)`` is issued for every page at once and the pages
+    are merged in order under ``COMPASS_MULTIPAGE_BUDGET_MS``. Only the
+    contiguous run of pages that arrived is kept, so offsets derived from the
+    result count stay correct. An error on the first page is raised.
+    """
+    offsets = range(start, start + limit, page_size)
+    tasks = [asyncio.ensure_future(fetch_page(o, min(page_size, start + limit - o))) for o in offsets]
+    done, pending = await asyncio.wait(tasks, timeout=settings.multipage_budget_ms / 1000)
+    for task in pending:
+        task.cancel()
+
+    merged: List[Any] = []
+    for i, task in enumerate(tasks):
+        if task not in done:
+            break
+        if task.exception() is not None:
+            if i == 0:
+                raise task.exception()
+            print(f"[Compass] Page fetch error: {task.exception()}")
+            break
+        page = task.result()
+        merged.extend(page)
+        if len(page) < min(page_size, start + limit - offsets[i]):
+            break  # the source ran out of results
+    # retrieve exceptions of later pages so they are not reported as unhandled
+    for task in done:
+        if not task.cancelled():
+            task.exception()
+    return merged[:limit]
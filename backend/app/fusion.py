@@ -0,0 +1,124 @@
+"""Result fusion across adapters.
+
+URLs are canonicalized before deduplication so scheme, userinfo, ``www.``,
+trailing-slash, fragment and tracking-parameter variants collapse into one result. The default
+fuser is weighted reciprocal rank fusion; ``concat`` keeps the old first-come
+behaviour. Add a fuser by registering it in ``FUSERS``. ``Deduper`` also
+collapses near-duplicates (same content under unrelated URLs) by SimHash.
+"""
+from __future__ import annotations
+
+import heapq
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List
+from urllib.parse import urlsplit
+
+from .config import settings
+from .near_dup import LSHIndex, fingerprint
+from .schemas import SearchResult
+
+_TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "dclid", "yclid", "mc_cid", "mc_eid", "ref_src", "igshid"}
+_DEFAULT_PORTS = {":80", ":443"}
+
+
+@lru_cache(maxsize=65536)
+def canonical_url(url: str) -> str:
+    """Return a scheme-less canonical form of ``url`` used as the dedup key."""
+    parts = urlsplit(url.strip())
+    # ``user:password@`` never names a different page, and must not end up in a key
+    host = parts.netloc.rpartition("@")[2].lower()
+    for port in _DEFAULT_PORTS:
+        if host.endswith(port):
+            host = host[: -len(port)]
+            break
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/")
+    query = ""
+    if parts.query:
+        params = [
+            p for p in parts.query.split("&")
+            if p and not p.startswith("utm_") and p.split("=", 1)[0] not in _TRACKING_PARAMS
+        ]
+        query = "&".join(sorted(params))
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+class Deduper:
+    """Keeps the first of each group of results sharing a canonical URL or, with
+    ``COMPASS_NEAR_DUP``, a near-identical title and snippet."""
+
+    def __init__(self, kept: Iterable[SearchResult | Dict[str, Any]] = ()):
+        self.urls: set = set()
+        self._lsh = LSHIndex(settings.near_dup_distance) if settings.near_dup else None
+        self.near_dups = 0
+        for item in kept:
+            self.add(item)
+
+    def add(self, item: SearchResult | Dict[str, Any]) -> bool:
+        """Record ``item`` and return True, or return False if it duplicates a kept result."""
+        if isinstance(item, dict):
+            url, title, snippet = item["url"], item.get("title"), item.get("snippet")
+        else:
+            url, title, snippet = str(item.url), item.title, item.snippet
+        key = canonical_url(url)
+        if key in self.urls:
+            return False
+        fp = fingerprint(f"{title or ''} {snippet or ''}") if self._lsh is not None else None
+        if fp is not None:
+            if self._lsh.query(fp) is not None:
+                self.near_dups += 1
+                return False
+            self._lsh.add(key, fp)
+        self.urls.add(key)
+        return True
+
+
+def concat_fuse(results: Dict[str, List[SearchResult]], limit: int) -> List[SearchResult]:
+    """Adapter lists in adapter order, first appearance of each canonical URL wins."""
+    seen = set()
+    out: List[SearchResult] = []
+    for items in results.values():
+        for item in items:
+            key = canonical_url(str(item.url))
+            if key not in seen:
+                seen.add(key)
+                out.append(item)
+                if len(out) >= limit:
+                    return out
+    return out
+
+
+def rrf_fuse(results: Dict[str, List[SearchResult]], limit: int) -> List[SearchResult]:
+    """Weighted reciprocal rank fusion: score = sum(weight / (k + rank)) per URL.
+
+    Ranks count from 1 within each adapter's list, and ties break on adapter
+    order and then rank, so the same inputs always give the same order. The
+    scoring pass is linear, and only the top ``limit`` entries are selected.
+    """
+    k = settings.fusion_rrf_k
+    weights = settings.fusion_weights
+    scores: Dict[str, float] = {}
+    first: Dict[str, tuple[int, SearchResult]] = {}
+    order = 0
+    for name, items in results.items():
+        weight = weights.get(name, 1.0)
+        for rank, item in enumerate(items, 1):
+            key = canonical_url(str(item.url))
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+            if key not in first:
+                first[key] = (order, item)
+                order += 1
+    top = heapq.nsmallest(limit, scores, key=lambda key: (-scores[key], first[key][0]))
+    return [first[key][1] for key in top]
+
+
+FUSERS: Dict[str, Callable[[Dict[str, List[SearchResult]], int], List[SearchResult]]] = {
+    "rrf": rrf_fuse,
+    "concat": concat_fuse,
+}
+
+
+def fuse(results: Dict[str, List[SearchResult]], limit: int) -> List[SearchResult]:
+    """Merge per-adapter result lists with the fuser selected by ``COMPASS_FUSION``."""
+    return FUSERS.get(settings.fusion, rrf_fuse)(results, limit)
@@ -0,0 +1,109 @@
+"""Application-wide pooled async HTTP client.
+
+One ``httpx.AsyncClient`` (HTTP/2 when ``h2`` is installed, keep-alive pool) is
+shared by every adapter and endpoint. It is opened and closed by the FastAPI
+lifespan, and created lazily for callers running outside it (serverless
+handlers, scripts). A thin transport wrapper caps concurrent requests per host
+and keeps counters for ``/debug``.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Dict
+
+import httpx
+
+from .config import settings
+
+try:
+    import h2  # noqa: F401  # type: ignore
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+
+class _PerHostLimitTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport with a per-host concurrency cap and counters."""
+
+    def __init__(self, inner: httpx.AsyncHTTPTransport, per_host: int):
+        self._inner = inner
+        self._per_host = per_host
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self.requests: Dict[str, int] = {}
+        self.in_flight: Dict[str, int] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        slot = self._slots.get(host)
+        if slot is None:
+            slot = self._slots[host] = asyncio.Semaphore(self._per_host)
+        async with slot:
+            self.requests[host] = self.requests.get(host, 0) + 1
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            try:
+                response = await self._inner.handle_async_request(request)
+                # read the body while holding the slot so the cap covers the whole exchange
+                await response.aread()
+                return response
+            finally:
+                self.in_flight[host] -= 1
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+    def connections(self) -> Dict[str, int]:
+        pool = getattr(self._inner, "_pool", None)
+        conns = list(getattr(pool, "connections", []))
+        return {
+            "open": len(conns),
+            "idle": sum(1 for c in conns if c.is_idle()),
+            "http2": sum(1 for c in conns if "HTTP/2" in repr(c)),
+        }
+
+
+_client: httpx.AsyncClient | None = None
+_transport: _PerHostLimitTransport | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def open_client() -> httpx.AsyncClient:
+    """Create the shared client for the running event loop."""
+    global _client, _transport, _loop
+    inner = httpx.AsyncHTTPTransport(
+        http2=_HTTP2 and settings.http2,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+    )
+    _transport = _PerHostLimitTransport(inner, settings.http_max_per_host)
+    _client = httpx.AsyncClient(transport=_transport, timeout=httpx.Timeout(10.0), follow_redirects=True)
+    _loop = asyncio.get_running_loop()
+    return _client
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it if missing or bound to another loop."""
+    if _client is None or _client.is_closed or _loop is not asyncio.get_running_loop():
+        return open_client()
+    return _client
+
+
+async def close_client() -> None:
+    global _client, _transport
+    if _client is not None:
+        await _client.aclose()
+    _client = _transport = None
+
+
+def pool_stats() -> Dict[str, object]:
+    if _transport is None:
+        return {"open": False}
+    return {
+        "open": True,
+        "http2": _HTTP2 and settings.http2,
+        "connections": _transport.connections(),
+        "requests": dict(_transport.requests),
+        "in_flight": {h: n for h, n in _transport.in_flight.items() if n},
+    }
@@ -0,0 +1,64 @@
+"""Shared async OpenSearch client.
+
+Every OpenSearch call in the API goes through one ``AsyncOpenSearch`` instance
+with a bounded connection pool and a per-call timeout, so a slow index call
+only delays its own request instead of freezing the worker. Index creation is
+done from the FastAPI lifespan rather than at import time.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Dict
+
+from .config import settings
+
+try:
+    from opensearchpy import AsyncOpenSearch  # type: ignore
+    from opensearchpy.helpers import async_bulk, async_scan, async_streaming_bulk  # type: ignore
+except ImportError:  # opensearch-py (with its async extra) is optional
+    AsyncOpenSearch = None  # type: ignore
+    async_bulk = async_scan = async_streaming_bulk = None  # type: ignore
+
+OPENSEARCH_URL = os.getenv("OPENSEARCH_URL")
+# True when the index is configured; the client itself is created on first use
+enabled = bool(AsyncOpenSearch and OPENSEARCH_URL)
+
+_client = None
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_index_client():
+    """Return the shared AsyncOpenSearch client, or None when no index is configured."""
+    global _client, _loop
+    if not enabled:
+        return None
+    loop = asyncio.get_running_loop()
+    if _client is None or _loop is not loop:
+        _client = AsyncOpenSearch(
+            OPENSEARCH_URL,
+            verify_certs=False,
+            maxsize=settings.opensearch_pool_size,
+            timeout=settings.opensearch_timeout,
+        )
+        _loop = loop
+    return _client
+
+
+async def close_index_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+    _client = None
+
+
+async def ensure_index(name: str, body: Dict[str, Any] | None = None, concrete: str | None = None) -> None:
+    """Create ``name`` if no index or alias by that name exists yet (idempotent,
+    tolerant of races). With ``concrete``, that index is created instead and
+    ``body`` is expected to declare ``name`` as its alias."""
+    client = get_index_client()
+    if client is None:
+        return
+    if not await client.indices.exists(index=name):
+        await client.indices.create(index=concrete or name, body=body or {}, ignore=[400])
+
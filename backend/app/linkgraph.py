@@ -0,0 +1,85 @@
+"""Compact on-disk link graph written by the crawler and read by ``app.pagerank``.
+
+Nodes are URLs identified by a 64-bit hash (``url_key``), so the store never
+keeps URL strings. The ``pages`` document ids are the URLs themselves, so a
+score can be joined back to its page by hashing the id again. Edges are
+appended as little-endian ``uint64`` pairs ``(source, target)`` to segment
+files ``edges-<start time>-<pid>.bin``. Each crawl process writes its own
+segment.
+
+A page's edges are written once per visit, and its links may change between
+visits. Readers therefore use, for every source, only the edges in the newest
+segment that contains that source. A page visited without any links is
+written as a self-edge, which readers drop after noting the visit.
+
+This module has no dependencies so the crawler can use it.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from array import array
+from hashlib import blake2b
+from pathlib import Path
+from typing import Iterable, List
+
+EDGE_BYTES = 16
+
+
+def url_key(url: str) -> int:
+    """64-bit node id of ``url``, ignoring its fragment."""
+    return int.from_bytes(blake2b(url.split("#", 1)[0].encode(), digest_size=8).digest(), "little")
+
+
+def segments(directory: str) -> List[Path]:
+    """Edge segments of ``directory``, oldest first."""
+    return sorted(Path(directory).glob("edges-*.bin"))
+
+
+class EdgeWriter:
+    """Buffers edges in memory and appends them to this process's segment."""
+
+    def __init__(self, directory: str, buffer_edges: int = 1 << 16):
+        os.makedirs(directory, exist_ok=True)
+        self.path = Path(directory) / f"edges-{time.time_ns():020d}-{os.getpid()}.bin"
+        self.buffer_edges = buffer_edges
+        self._buf = array("Q")
+        self._fh = open(self.path, "ab")
+        self.edges = 0
+        self.pages = 0
+
+    def add(self, source: str, targets: Iterable[str]) -> int:
+        """Record the outgoing links of ``source`` (duplicates and self-links dropped)."""
+        src = url_key(source)
+        self.pages += 1
+        seen = {src}
+        for target in targets:
+            dst = url_key(target)
+            if dst not in seen:
+                seen.add(dst)
+                self._buf.append(src)
+                self._buf.append(dst)
+        added = len(seen) - 1
+        if not added:
+            # a self-edge marks a visit without links, which supersedes older edges
+            self._buf.append(src)
+            self._buf.append(src)
+        self.edges += added
+        if len(self._buf) >= 2 * self.buffer_edges:
+            self.flush()
+        return added
+
+    def flush(self) -> None:
+        if self._buf:
+            if sys.byteorder != "little":
+                self._buf.byteswap()
+            self._fh.write(self._buf.tobytes())
+            self._fh.flush()
+            self._buf = array("Q")
+
+    def close(self) -> None:
+        self.flush()
+        self._fh.close()
+        if not self.pages:
+            self.path.unlink(missing_ok=True)
@@ -1,25 +1,60 @@
-from fastapi import FastAPI, HTTPException, Query, Response
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-try:
-    from opensearchpy import OpenSearch, helpers  # type: ignore
-except ImportError:
-    OpenSearch = None  # type: ignore
-    helpers = None  # type: ignore
-import os, httpx
+from typing import Dict, List
+import os
 import importlib
 import asyncio
+import secrets
+from collections import deque
+from contextlib import asynccontextmanager
 
-from .schemas import SearchResponse, SearchResult
+from .schemas import BatchQuery, BatchRequest, IngestDoc, SearchResponse, SearchResult, SuggestResponse
 from .config import settings
+from .fanout import FanoutResult, fan_out, fetch_pages, flights, iter_fan_out, latency
+from .cache import FileTier, OpenSearchTier, QueryCache, cache_key
+from .fusion import Deduper, canonical_url, fuse
+from .http_client import close_client, get_client, open_client, pool_stats
+from . import index_client
+from .index_client import OPENSEARCH_URL, close_index_client, ensure_index
+from .bulk_indexer import indexer
+from . import near_dup, pages_index
+from .suggest import suggester
 
-OPENSEARCH_URL = os.getenv("OPENSEARCH_URL")
-client = None
-if OpenSearch and OPENSEARCH_URL:
-    client = OpenSearch(OPENSEARCH_URL, verify_certs=False)
+CACHE_INDEX = "google_cache"
+# alias managed by pages_index; never a concrete index
+PAGES_INDEX = pages_index.PAGES_ALIAS
+
+# query-result cache; second tier shared through OpenSearch or a local directory
+_cache_tier2 = None
+if index_client.enabled:
+    _cache_tier2 = OpenSearchTier(CACHE_INDEX)
+elif settings.cache_dir:
+    _cache_tier2 = FileTier(settings.cache_dir)
+query_cache = QueryCache(settings.cache_max_entries, _cache_tier2)
+# titles of pages written through the bulk indexer feed /suggest
+indexer.on_indexed(suggester.on_page_indexed)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_client()
+    if index_client.enabled:
+        try:
+            await ensure_index(PAGES_INDEX, pages_index.create_body(), concrete=pages_index.versioned_name())
+            await _cache_tier2.ensure()
+        except Exception as exc:
+            print(f"[Compass] Warning: could not prepare OpenSearch indices: {exc}")
+        indexer.start()
+    suggester.start()
+    yield
+    await suggester.stop()
+    await close_client()
+    await indexer.stop()
+    await close_index_client()
 
-app = FastAPI(title="Compass Search API", version="0.1.0")
+
+app = FastAPI(title="Compass Search API", version="0.1.0", lifespan=lifespan)
 
 @app.get("/health")
 def health():
@@ -37,7 +72,7 @@ app.add_middleware(
 
 # dynamically load adapter classes based on settings
 # add local_index adapter if OpenSearch available
-if client and "local_index" not in settings.enabled_adapters:
+if index_client.enabled and "local_index" not in settings.enabled_adapters:
     settings.enabled_adapters.insert(0, "local_index")
 
 _adapter_instances = {}
@@ -63,44 +98,161 @@ for adapter_name in settings.enabled_adapters:
         print(f"[Compass] Warning: could not load adapter '{adapter_name}': {exc}")
 
 
-async def _aggregate_results(query: str, limit: int, search_type: str = "web", start: int = 1) -> List[SearchResult]:
-    """Run searches concurrently across adapters and merge results."""
-    tasks = [adapter.search(query, limit, search_type=search_type, start=start) for adapter in _adapter_instances.values()]
-    results_lists = await asyncio.gather(*tasks, return_exceptions=True)
+def _page_action(doc: dict) -> dict:
+    """Bulk action storing ``doc`` in pages, keyed by URL, with its SimHash fields."""
+    return {
+        "_op_type": "index",
+        "_index": PAGES_INDEX,
+        "_id": doc["url"],
+        **doc,
+        **near_dup.index_fields(near_dup.page_text(doc)),
+        "indexed_at": pages_index.now_ms(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Result-set snapshots
+#
+# Page 1 of a query fans out once and keeps the whole fused pool (every adapter
+# asked for ``limit`` results) in the query cache, together with the next
+# offset of each adapter. Deeper pages are sliced from that pool, and only when
+# it runs short are adapters asked for their next page from where they left off.
+#
+# Extending a snapshot only appends to its pool, but a refresh of page 1 builds
+# a new pool. Each pool therefore has a version, and cursors carry it: a cursor
+# whose version no longer matches the cached snapshot continues from its own
+# per-adapter offsets instead of slicing a pool it was not cut from.
+# ---------------------------------------------------------------------------
+def _new_snapshot() -> dict:
+    return {"results": [], "offsets": {}, "exhausted": [], "timed_out": [], "version": secrets.token_hex(6)}
+
+
+def _fold_outcome(snap: dict, outcome: FanoutResult, limit: int, head: List[SearchResult] = ()) -> dict:
+    """Append fused, not-yet-seen results of ``outcome`` to the snapshot pool.
+
+    ``head`` is placed first (the streaming endpoint already sent it). An adapter
+    is exhausted once it returns fewer than ``limit`` results or nothing new.
+    """
+    dedup = Deduper(snap["results"])
+    seen_before = set(dedup.urls)
+    results = list(snap["results"])
+    # the whole batch joins the pool, so every candidate is ranked, not just a page
+    for item in [*head, *fuse(outcome.results, sum(map(len, outcome.results.values())))]:
+        if dedup.add(item):
+            results.append(item.model_dump(mode="json"))
+
+    offsets = dict(snap["offsets"])
+    exhausted = list(snap["exhausted"])
+    for name, items in outcome.results.items():
+        offsets[name] = offsets.get(name, 1) + len(items)
+        if len(items) < limit or all(canonical_url(str(i.url)) in seen_before for i in items):
+            exhausted.append(name)
+    return {
+        "results": results,
+        "offsets": offsets,
+        "exhausted": exhausted,
+        "timed_out": outcome.timed_out,
+        "version": snap.get("version"),
+    }
 
-    merged: List[SearchResult] = []
-    for res in results_lists:
-        if isinstance(res, Exception):
-            print(f"[Compass] Adapter error: {res}")
-            continue
-        merged.extend(res)
 
-    # Simple dedup by url keeping first appearance, limit output
-    seen = set()
-    deduped: List[SearchResult] = []
-    for item in merged:
-        if item.url not in seen:
-            deduped.append(item)
-            seen.add(item.url)
-        if len(deduped) >= limit:
-            break
-    return deduped
+def _flight_key(query: str, search_type: str, limit: int, offsets: Dict[str, int]) -> str:
+    return f"{cache_key(query, search_type, 1, limit)}:{sorted(offsets.items())}"
+
+
+async def _extend_snapshot(snap: dict, query: str, limit: int, search_type: str) -> dict:
+    """Ask every adapter that is not exhausted for its next ``limit`` results."""
+    offsets = snap["offsets"]
+    adapters = {n: a for n, a in _adapter_instances.items() if n not in snap["exhausted"]}
+    if not adapters:
+        return snap
+    outcome = await fan_out(
+        adapters,
+        lambda adapter: adapter.search(query, limit, search_type=search_type, start=offsets.get(adapter.name, 1)),
+        flight_key=_flight_key(query, search_type, limit, offsets),
+    )
+    return _fold_outcome(snap, outcome, limit)
+
+
+def _payload_ttl(search_type: str, timed_out: List[str]) -> int:
+    # partial results (some adapter missed its deadline) are only kept briefly
+    ttl = settings.cache_ttl(search_type)
+    return min(ttl, 30) if timed_out else ttl
+
+
+async def _search_page(
+    query: str,
+    limit: int,
+    search_type: str = "web",
+    start: int = 1,
+    offsets: Dict[str, int] | None = None,
+    version: str | None = None,
+) -> tuple[List[SearchResult], List[str], Dict[str, int], str | None]:
+    """Return one page as (results, timed_out adapters, next per-adapter offsets, snapshot version).
+
+    ``version`` is the snapshot version carried by the cursor of a deeper page.
+    A request fans out at most once, so it stays within one search budget: a
+    snapshot this request just built is served as-is even when it is short.
+    """
+    key = cache_key(query, search_type, 1, limit)
+    pos = start - 1
+    built: List[dict] = []
+
+    async def _first_page():
+        snap = await _extend_snapshot(_new_snapshot(), query, limit, search_type)
+        built.append(snap)
+        return snap, _payload_ttl(search_type, snap["timed_out"])
+
+    if pos == 0:
+        snap = await query_cache.get_or_fetch(key, _first_page)
+    else:
+        snap = await query_cache.peek(key, _first_page)
+    if snap is not None and pos and snap.get("version") != version:
+        # the snapshot was refreshed since this cursor was issued
+        snap = None
+    shared = snap is not None
+    if snap is None:
+        # snapshot expired or replaced: continue from the per-adapter offsets carried by the cursor
+        snap = {**_new_snapshot(), "offsets": dict(offsets or {name: start for name in _adapter_instances})}
+        pos = 0
+
+    fanned_out = any(b is snap for b in built)
+    if not fanned_out and len(snap["results"]) - pos < limit and len(snap["exhausted"]) < len(_adapter_instances):
+        snap = await _extend_snapshot(snap, query, limit, search_type)
+        if shared:
+            await query_cache.put(key, snap, _payload_ttl(search_type, snap["timed_out"]))
+
+    page = [SearchResult.model_validate(r) for r in snap["results"][pos:pos + limit]]
+    return page, snap["timed_out"], snap["offsets"], snap.get("version")
+
+
+async def _aggregate_results(query: str, limit: int, search_type: str = "web", start: int = 1) -> List[SearchResult]:
+    """Run searches concurrently across adapters and merge results."""
+    results, _, _, _ = await _search_page(query, limit, search_type=search_type, start=start)
+    return results
 
 
 import base64, json
 
 
-def _encode_cursor(start: int) -> str:
-    return base64.urlsafe_b64encode(json.dumps({"s": start}).encode()).decode()
+def _encode_cursor(start: int, offsets: Dict[str, int] | None = None, version: str | None = None) -> str:
+    data = {"s": start}
+    if offsets:
+        data["o"] = offsets
+    if version:
+        data["v"] = version
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
 
-def _decode_cursor(token: str | None) -> int:
+def _decode_cursor(token: str | None) -> tuple[int, Dict[str, int] | None, str | None]:
     if not token:
-        return 1
+        return 1, None, None
     try:
         data = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
-        return int(data.get("s", 1))
+        offsets = {str(k): int(v) for k, v in data.get("o", {}).items()} or None
+        version = data.get("v")
+        return int(data.get("s", 1)), offsets, str(version) if version else None
     except Exception:
-        return 1
+        return 1, None, None
 
 
 @app.get("/search", response_model=SearchResponse)
@@ -112,10 +264,139 @@ async def search(
 ):
     if not q:
         raise HTTPException(status_code=400, detail="Query 'q' is required")
-    start = _decode_cursor(cursor)
-    results = await _aggregate_results(q, limit, search_type=type, start=start)
-    next_cursor = _encode_cursor(start + limit)
-    return SearchResponse(query=q, results=results, next_cursor=next_cursor)
+    start, offsets, version = _decode_cursor(cursor)
+    if start == 1:
+        suggester.record_query(q)
+    results, timed_out, offsets, version = await _search_page(
+        q, limit, search_type=type, start=start, offsets=offsets, version=version
+    )
+    next_cursor = _encode_cursor(start + limit, offsets, version)
+    return SearchResponse(query=q, results=results, next_cursor=next_cursor, timed_out=timed_out)
+
+
+@app.get("/suggest", response_model=SuggestResponse)
+async def suggest(q: str = Query("", description="Query prefix"), limit: int = Query(8, ge=1, le=20)):
+    """Autocomplete ``q`` from page titles and past queries (in-memory, no I/O)."""
+    return SuggestResponse(query=q, suggestions=suggester.suggest(q, limit))
+
+
+@app.get("/search/stream")
+async def search_stream(
+    q: str = Query(..., description="Search query"),
+    limit: int = 10,
+    type: str = Query("web", alias="type"),
+    cursor: str | None = None,
+):
+    """NDJSON variant of /search that emits each adapter's results as soon as it finishes.
+
+    Lines are ``{"event": "results", "source": ..., "results": [...]}`` (deduplicated
+    against everything already sent) followed by one ``{"event": "done", ...}`` line
+    carrying ``next_cursor``, per-adapter timings and the adapters that timed out.
+    Pages already held in a result-set snapshot are sent as a single event.
+    """
+    if not q:
+        raise HTTPException(status_code=400, detail="Query 'q' is required")
+    start, offsets, version = _decode_cursor(cursor)
+    key = cache_key(q, type, 1, limit)
+    if start == 1:
+        suggester.record_query(q)
+
+    async def _events():
+        snap = await query_cache.peek(key) if start == 1 else None
+        if start > 1 or snap is not None:
+            results, timed_out, next_offsets, next_version = await _search_page(
+                q, limit, search_type=type, start=start, offsets=offsets, version=version
+            )
+            payload = [r.model_dump(mode="json") for r in results]
+            yield json.dumps({"event": "results", "source": "snapshot", "results": payload}) + "\n"
+            yield json.dumps({
+                "event": "done",
+                "query": q,
+                "next_cursor": _encode_cursor(start + limit, next_offsets, next_version),
+                "timings": {},
+                "timed_out": timed_out,
+            }) + "\n"
+            return
+
+        outcome = FanoutResult()
+        dedup = Deduper()
+        merged: List[SearchResult] = []
+        async for name, res in iter_fan_out(
+            _adapter_instances,
+            lambda adapter: adapter.search(q, limit, search_type=type, start=1),
+            outcome,
+            flight_key=_flight_key(q, type, limit, {}),
+        ):
+            fresh = []
+            for item in res:
+                if len(merged) + len(fresh) >= limit:
+                    break
+                if dedup.add(item):
+                    fresh.append(item)
+            if fresh:
+                merged.extend(fresh)
+                payload = [r.model_dump(mode="json") for r in fresh]
+                yield json.dumps({"event": "results", "source": name, "results": payload}) + "\n"
+        # keep what was sent as the head of the snapshot so page 2 continues after it
+        snap = _fold_outcome(_new_snapshot(), outcome, limit, head=merged)
+        await query_cache.put(key, snap, _payload_ttl(type, outcome.timed_out))
+        yield json.dumps({
+            "event": "done",
+            "query": q,
+            "next_cursor": _encode_cursor(1 + limit, snap["offsets"], snap["version"]),
+            "timings": outcome.timings,
+            "timed_out": outcome.timed_out,
+        }) + "\n"
+
+    return StreamingResponse(_events(), media_type="application/x-ndjson")
+
+
+@app.post("/search/batch")
+async def search_batch(body: BatchRequest):
+    """Run many searches in one request and stream NDJSON responses back in input order.
+
+    At most ``concurrency`` queries run at once; they share the adapters, the
+    query cache and in-flight coalescing. Each line is a SearchResponse plus its
+    ``index``, or ``{"index", "query", "error"}`` when that query failed.
+    """
+    if len(body.queries) > settings.batch_max_queries:
+        raise HTTPException(status_code=413, detail=f"At most {settings.batch_max_queries} queries per batch")
+    window = max(1, min(body.concurrency or settings.batch_concurrency, settings.batch_concurrency))
+
+    async def _one(bq: BatchQuery) -> SearchResponse:
+        start, offsets, version = _decode_cursor(bq.cursor)
+        results, timed_out, offsets, version = await _search_page(
+            bq.q, bq.limit, search_type=bq.type, start=start, offsets=offsets, version=version
+        )
+        return SearchResponse(
+            query=bq.q,
+            results=results,
+            next_cursor=_encode_cursor(start + bq.limit, offsets, version),
+            timed_out=timed_out,
+        )
+
+    async def _line(index: int, bq: BatchQuery, task: asyncio.Future) -> str:
+        try:
+            resp = await task
+        except Exception as exc:
+            return json.dumps({"index": index, "query": bq.q, "error": str(exc)}) + "\n"
+        return json.dumps({"index": index, **resp.model_dump(mode="json")}) + "\n"
+
+    async def _events():
+        running: deque = deque()
+        try:
+            for index, bq in enumerate(body.queries):
+                running.append((index, bq, asyncio.ensure_future(_one(bq))))
+                if len(running) < window:
+                    continue
+                yield await _line(*running.popleft())
+            while running:
+                yield await _line(*running.popleft())
+        finally:
+            for _, _, task in running:
+                task.cancel()
+
+    return StreamingResponse(_events(), media_type="application/x-ndjson")
 
 
 SERP_KEY = os.getenv("SERP_API_KEY", "")
@@ -124,19 +405,24 @@ SERPER_KEY = os.getenv("SERPER_API_KEY", "")
 async def _serperapi(q: str, limit: int = 10):
     if not SERPER_KEY:
         raise HTTPException(status_code=500, detail="SERPER_API_KEY not configured")
-    params = {
-        "q": q,
-        "num": min(limit, 10),
-        "apiKey": SERPER_KEY,
-    }
-    data = httpx.get("https://google.serper.dev/search", params=params, timeout=10).json()
+
+    async def _page(offset: int, num: int) -> list:
+        params = {
+            "q": q,
+            "num": 10,
+            "page": (offset - 1) // 10 + 1,
+            "apiKey": SERPER_KEY,
+        }
+        data = (await get_client().get("https://google.serper.dev/search", params=params, timeout=10)).json()
+        return data.get("organic", [])[:num]
+
+    # Serper pages hold 10 results; larger limits fetch their pages concurrently
     items = []
-    for it in data.get("organic", [])[:limit]:
+    for it in await fetch_pages(_page, 1, limit):
         items.append({"title": it.get("title"), "url": it.get("link"), "snippet": it.get("snippet", "")})
-    # store to pages
-    if items and client:
-        actions = [{"_op_type": "index", "_index": PAGES_INDEX, "_id": it["url"], **it} for it in items]
-        helpers.bulk(client, actions, refresh=True)
+    # store to pages (write-behind; the response never waits on indexing)
+    for it in items:
+        indexer.submit_nowait(_page_action(it))
     return [SearchResult(**it, source="serperapi") for it in items]
 
 @app.get("/fetch", response_model=List[SearchResult])
@@ -153,8 +439,7 @@ async def fetch_api(
         stored: List[SearchResult] = []
         for u in urls:
             doc = {"title": u, "url": u, "snippet": ""}
-            if client:
-                client.index(index=PAGES_INDEX, id=u, body=doc, refresh=True)
+            await indexer.submit(_page_action(doc))
             stored.append(SearchResult(**doc, source="manual"))
         return stored
 
@@ -174,57 +459,141 @@ async def fetch_api(
     return await _aggregate_results(q, limit)
 
 
-# -------------------- Google Custom Search API -------------------- #
-import os, httpx
-if helpers is not None:
-    from opensearchpy import helpers  # already imported via try-above
+@app.post("/ingest")
+async def ingest(request: Request):
+    """Bulk-load URLs or documents into the pages index from an NDJSON body.
+
+    Each line is a JSON object (``url`` plus optional ``title``/``snippet``/``body``)
+    or a bare URL. The body is read as a stream and queued on the bulk indexer
+    in batches of ``COMPASS_INGEST_BATCH``; reading pauses while the indexer
+    queue is full, and a line longer than ``COMPASS_INGEST_MAX_LINE_BYTES`` is
+    rejected without being buffered, so memory stays bounded. The response
+    lists, per batch, how many lines were accepted, rejected, indexed and failed.
+    """
+    if not index_client.enabled:
+        raise HTTPException(status_code=503, detail="OpenSearch not configured")
+
+    async def _lines():
+        # only the new chunk is split; an over-long line is yielded once as None and
+        # the rest of it is discarded up to its newline
+        limit = settings.ingest_max_line_bytes
+        parts: List[bytes] = []
+        size, too_long = 0, False
+        async for chunk in request.stream():
+            *ends, rest = chunk.split(b"\n")
+            for end in ends:
+                if too_long or size + len(end) > limit:
+                    yield None
+                else:
+                    yield b"".join((*parts, end))
+                parts, size, too_long = [], 0, False
+            if too_long:
+                continue
+            if size + len(rest) > limit:
+                parts, size, too_long = [], 0, True
+            elif rest:
+                parts.append(rest)
+                size += len(rest)
+        if too_long:
+            yield None
+        elif parts:
+            yield b"".join(parts)
+
+    def _parse(line: bytes) -> IngestDoc:
+        text = line.decode("utf-8").strip()
+        if text.startswith("{"):
+            return IngestDoc.model_validate_json(text)
+        return IngestDoc(url=text)
+
+    totals = {"accepted": 0, "rejected": 0, "indexed": 0, "failed": 0}
+    reports: List[dict] = []
+
+    async def _settle(batch: dict) -> None:
+        outcomes = await asyncio.gather(*batch.pop("futures"), return_exceptions=True)
+        batch["failed"] = sum(1 for o in outcomes if isinstance(o, Exception))
+        batch["indexed"] = len(outcomes) - batch["failed"]
+        visible = [o for o in outcomes if isinstance(o, float)]
+        batch["visible_at"] = max(visible) if visible else None
+        for key in totals:
+            totals[key] += batch[key]
+        reports.append(batch)
+
+    def _new_batch(number: int) -> dict:
+        return {"batch": number, "accepted": 0, "rejected": 0, "errors": [], "futures": []}
+
+    settling: deque = deque()
+    batch = _new_batch(0)
+    lineno = 0
+    async for line in _lines():
+        lineno += 1
+        if line is not None and not line.strip():
+            continue
+        try:
+            if line is None:
+                raise ValueError(f"line longer than {settings.ingest_max_line_bytes} bytes")
+            doc = _parse(line)
+        except Exception as exc:
+            batch["rejected"] += 1
+            if len(batch["errors"]) < 5:
+                msg = exc.errors()[0]["msg"] if hasattr(exc, "errors") else str(exc)
+                batch["errors"].append(f"line {lineno}: {msg}")
+        else:
+            url = str(doc.url)
+            fields = {"url": url, "title": doc.title or url, "snippet": doc.snippet or ""}
+            if doc.body:
+                fields["body"] = doc.body
+            action = _page_action(fields)
+            batch["futures"].append(await indexer.submit(action))
+            batch["accepted"] += 1
+        if batch["accepted"] + batch["rejected"] >= settings.ingest_batch:
+            settling.append(batch)
+            batch = _new_batch(batch["batch"] + 1)
+            # settle a batch once the next one is being queued, keeping the indexer busy
+            if len(settling) > 1:
+                await _settle(settling.popleft())
+    if batch["accepted"] + batch["rejected"]:
+        settling.append(batch)
+    while settling:
+        await _settle(settling.popleft())
+    return {**totals, "batches": reports}
+
 
+# -------------------- Google Custom Search API -------------------- #
 GOOGLE_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CX  = os.getenv("GOOGLE_CSE_ID")
-CACHE_INDEX = "google_cache"
-PAGES_INDEX = "pages"
-# ensure pages index exists when OpenSearch available
-if client and not client.indices.exists(index=PAGES_INDEX):
-    client.indices.create(index=PAGES_INDEX)
-
 if GOOGLE_KEY and GOOGLE_CX:
-    # ensure cache index exists (simple mapping)
-    if client and not client.indices.exists(index=CACHE_INDEX):
-        client.indices.create(index=CACHE_INDEX)
-
     @app.get("/gapi", response_model=List[SearchResult])
     async def gapi(q: str = Query(...), size: int = 10):
-        # 1. check cache
-        cached = client.get(index=CACHE_INDEX, id=q, ignore=[404])
-        if cached and cached.get("found"):
-            return cached["_source"]["items"][:size]
+        payload = await query_cache.get_or_fetch(
+            cache_key(q, "gapi", 1, size), lambda: _gapi_fetch(q, size)
+        )
+        return payload["items"][:size]
 
+    async def _gapi_page(q: str, offset: int, num: int) -> list:
         params = {
             "key": GOOGLE_KEY,
             "cx": GOOGLE_CX,
             "q": q,
-            "num": min(size, 10),
+            "num": num,
+            "start": offset,
         }
-        data = httpx.get("https://www.googleapis.com/customsearch/v1", params=params, timeout=10).json()
+        data = (await get_client().get("https://www.googleapis.com/customsearch/v1", params=params, timeout=10)).json()
+        return data.get("items", [])
+
+    async def _gapi_fetch(q: str, size: int):
+        pages = await fetch_pages(lambda offset, num: _gapi_page(q, offset, num), 1, min(size, 100))
         items = [
             {
                 "title": it["title"],
                 "url": it["link"],
                 "snippet": it.get("snippet", ""),
             }
-            for it in data.get("items", [])
+            for it in pages
         ]
-        # store in cache
-        if client:
-            client.index(index=CACHE_INDEX, id=q, body={"items": items}, refresh=True)
-        # also upsert into main pages index for global search
-        if client:
-            actions = [
-                {"_op_type": "index", "_index": PAGES_INDEX, "_id": it["url"], **it}
-                for it in items
-            ]
-            helpers.bulk(client, actions, refresh=True)
-        return items[:size]
+        # also upsert into main pages index for global search (write-behind)
+        for it in items:
+            indexer.submit_nowait(_page_action(it))
+        return {"items": items}, settings.cache_ttl("web")
 
 
 HTML_PAGE = """
@@ -239,9 +608,16 @@ body{font-family:sans-serif;max-width:600px;margin:2rem auto}input{width:80%}but
 </head>
 <body>
 <h2>Compass Search</h2>
-<input id=\"q\" placeholder=\"search...\" /> <button onclick=\"go()\">Go</button>
+<input id=\"q\" placeholder=\"search...\" list=\"sugg\" autocomplete=\"off\" /> <button onclick=\"go()\">Go</button>
+<datalist id=\"sugg\"></datalist>
 <ul id=\"out\"></ul>
 <script>
+document.getElementById('q').addEventListener('input',async e=>{
+ const r=await fetch('/suggest?q='+encodeURIComponent(e.target.value));
+ const data=await r.json();
+ const dl=document.getElementById('sugg');dl.innerHTML='';
+ data.suggestions.forEach(s=>{const o=document.createElement('option');o.value=s;dl.appendChild(o);});
+});
 async function go(){
  const q=document.getElementById('q').value;
  const r=await fetch('/search?q='+encodeURIComponent(q));
@@ -302,9 +678,21 @@ async def debug():
     loaded = [name for name in _adapter_instances.keys()]
     return {
         "opensearch_url_set": bool(OPENSEARCH_URL),
-        "client_exists": client is not None,
+        "client_exists": index_client.enabled,
         "loaded_adapters": loaded,
         "enabled_adapters": settings.enabled_adapters,
+        "search_budget_ms": settings.search_budget_ms,
+        "adapter_latency_ms": latency.snapshot(),
+        "query_cache": query_cache.stats,
+        "coalesced_adapter_calls": flights.snapshot(),
+        "suggest": suggester.snapshot(),
+        "http_pool": pool_stats(),
+        "bulk_indexer": indexer.snapshot(),
+        "key_quota": {
+            name: adapter.quota.snapshot()
+            for name, adapter in _adapter_instances.items()
+            if hasattr(adapter, "quota")
+        },
     }
 
 
@@ -0,0 +1,168 @@
+"""Near-duplicate detection with 64-bit SimHash and band LSH.
+
+A document's fingerprint is the SimHash of its word 3-shingles. Two documents
+whose fingerprints differ in at most ``distance`` bits are near-duplicates
+(mirrors, syndicated copies, URL variants). With the fingerprint cut into
+``distance + 1`` bands, near-duplicates must share at least one band exactly.
+So a lookup only compares against documents in the same band buckets, never
+against the whole set.
+
+``index_fields`` gives the fingerprint and its band keys as stored in the
+``pages`` index. ``page_text`` is the text a page is fingerprinted on; the
+crawler and the backend's ingest both use it, so their fingerprints agree. This module has no dependencies so the crawler can use it.
+"""
+from __future__ import annotations
+
+import re
+from array import array
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Any, Dict, List, Mapping, Tuple
+
+MAX_DISTANCE = 3  # band layout stored in pages: 4 bands of 16 bits
+MIN_TOKENS = 8  # shorter texts carry too little signal to fingerprint
+_SHINGLE = 3
+_MASK = (1 << 64) - 1
+_token = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=65536)
+def fingerprint(text: str | None) -> int | None:
+    """SimHash of ``text``, or None when it is too short to compare reliably."""
+    tokens = _token.findall(text.lower()) if text else []
+    if len(tokens) < MIN_TOKENS:
+        return None
+    shingles = Counter(" ".join(tokens[i:i + _SHINGLE]) for i in range(len(tokens) - _SHINGLE + 1))
+    total = sum(shingles.values())
+    ones = [0] * 64
+    for shingle, weight in shingles.items():
+        h = int.from_bytes(blake2b(shingle.encode(), digest_size=8).digest(), "little")
+        while h:
+            low = h & -h
+            ones[low.bit_length() - 1] += weight
+            h ^= low
+    fp = 0
+    for bit, n in enumerate(ones):
+        if 2 * n > total:
+            fp |= 1 << bit
+    return fp
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _band_bounds(distance: int) -> List[Tuple[int, int]]:
+    n = distance + 1
+    edges = [64 * i // n for i in range(n + 1)]
+    return [(edges[i], edges[i + 1] - edges[i]) for i in range(n)]
+
+
+def bands(fp: int, distance: int = MAX_DISTANCE) -> List[int]:
+    """Band values of ``fp`` tagged with their band number."""
+    return [(i << 64) | ((fp >> shift) & ((1 << width) - 1)) for i, (shift, width) in enumerate(_band_bounds(distance))]
+
+
+def to_signed(fp: int) -> int:
+    """``fp`` as a signed 64-bit value for an OpenSearch ``long`` field."""
+    return fp - (1 << 64) if fp >= 1 << 63 else fp
+
+
+def from_signed(value: int) -> int:
+    return value & _MASK
+
+
+def page_text(doc: Mapping[str, Any]) -> str:
+    """Fingerprint input of a page: its title and body, or its snippet when it has no body."""
+    return " ".join(filter(None, (doc.get("title"), doc.get("body") or doc.get("snippet"))))
+
+
+def index_fields(text: str | None) -> Dict[str, object]:
+    """Fields stored with a page: the fingerprint and its band keys (empty if too short)."""
+    fp = fingerprint(text)
+    if fp is None:
+        return {}
+    keys = [f"{b >> 64}:{b & _MASK:x}" for b in bands(fp)]
+    return {"simhash": to_signed(fp), "simhash_bands": keys}
+
+
+class LSHIndex:
+    """Band buckets over fingerprints for sub-linear near-duplicate lookups."""
+
+    def __init__(self, distance: int = MAX_DISTANCE):
+        self.distance = distance
+        self._fps = array("Q")
+        self._keys: List[str] = []
+        self._buckets: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: str, fp: int) -> None:
+        idx = len(self._keys)
+        self._fps.append(fp)
+        self._keys.append(key)
+        for band in bands(fp, self.distance):
+            self._buckets.setdefault(band, []).append(idx)
+
+    def query(self, fp: int) -> str | None:
+        """Key of an indexed near-duplicate of ``fp``, if any."""
+        for band in bands(fp, self.distance):
+            for idx in self._buckets.get(band, ()):
+                if hamming(self._fps[idx], fp) <= self.distance:
+                    return self._keys[idx]
+        return None
+
+
+class NearDupFilter:
+    """Crawl-time check against recent pages: the first URL seen for a fingerprint wins.
+
+    Holds the fingerprints of at most ``max_pages`` pages and evicts the least
+    recently added, so memory stays bounded however long the crawl runs. Older
+    pages are looked up in ``pages`` by their band keys instead
+    (``crawler.pipelines``). A URL never duplicates itself, so recrawls still
+    update their page.
+    """
+
+    def __init__(self, distance: int = MAX_DISTANCE, max_pages: int = 100_000):
+        self.distance = distance
+        self.max_pages = max_pages
+        self._fps: OrderedDict[str, int] = OrderedDict()
+        self._buckets: Dict[int, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._fps)
+
+    def query(self, url: str, fp: int) -> str | None:
+        """Another URL whose fingerprint is within ``distance`` bits of ``fp``, if any."""
+        for band in bands(fp, self.distance):
+            for key in self._buckets.get(band, ()):
+                if key != url and hamming(self._fps[key], fp) <= self.distance:
+                    return key
+        return None
+
+    def add(self, url: str, fp: int) -> None:
+        if url in self._fps:
+            self._drop(url)
+        self._fps[url] = fp
+        for band in bands(fp, self.distance):
+            self._buckets.setdefault(band, []).append(url)
+        while len(self._fps) > self.max_pages:
+            self._drop(next(iter(self._fps)))
+
+    def _drop(self, url: str) -> None:
+        for band in bands(self._fps.pop(url), self.distance):
+            keys = self._buckets[band]
+            keys.remove(url)
+            if not keys:
+                del self._buckets[band]
+
+    def check(self, url: str, fp: int | None) -> str | None:
+        """The URL ``url`` duplicates, or None after recording it."""
+        if fp is None:
+            return None
+        dup = self.query(url, fp)
+        if dup is None:
+            self.add(url, fp)
+        return dup
@@ -0,0 +1,300 @@
+"""Offline PageRank over the crawler's link graph (``app.linkgraph``).
+
+The job has four steps, all within a fixed memory budget:
+
+1. Node table. The sorted unique URL keys of all segments are merged chunk by
+   chunk.
+2. Dense edges. Each chunk of hashed edges is mapped to ``int32`` node
+   indices. The result goes to an unnamed scratch file next to the segments.
+   A second pass keeps, for every source, only its newest segment's edges, and
+   drops the self-edges that mark pages without links.
+3. Power iteration. Each step streams the dense edges in chunks and
+   scatter-adds ``rank[src] / outdegree[src]`` into the targets. The mass of
+   dangling nodes (uncrawled targets, pages without links) is spread evenly.
+   Iteration stops when the L1 change falls below ``tol``.
+4. Write-back. Scores are scaled so the average node scores 1. They are saved
+   to ``pagerank.npz`` in the graph directory, where the crawler reads them so
+   re-indexed pages keep their score. The ``pagerank`` field of the stored
+   pages is updated in bulk, and pages whose score moved less than
+   ``min_change`` are skipped.
+
+Memory is about 40 bytes per node plus about 80 bytes per edge of the current
+chunk. The budget sets the chunk size, and edges are only ever read from disk
+one chunk at a time, so the edge count costs disk, not memory.
+CLI (run from ``backend/``)::
+
+    python -m app.pagerank ../search_crawler/linkgraph [--memory-mb 1024] [--no-write]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .linkgraph import EDGE_BYTES, segments, url_key
+from .pages_index import PAGES_ALIAS, now_ms
+
+SCORES_FILE = "pagerank.npz"
+# working memory per node (keys, ranks, out-degrees, merge copies) and per chunked edge
+NODE_BYTES = 40
+CHUNK_EDGE_BYTES = 80
+
+
+def _read(fh, dtype, rows: int) -> np.ndarray:
+    """Up to ``rows`` edges from ``fh`` as an ``(n, 2)`` array; a torn last edge is ignored."""
+    data = np.fromfile(fh, dtype=dtype, count=2 * rows)
+    return data[: len(data) & ~1].reshape(-1, 2)
+
+
+def _chunks(path, chunk_edges: int) -> Iterator[np.ndarray]:
+    """The ``uint64`` edges of a segment, ``chunk_edges`` at a time."""
+    with open(path, "rb") as fh:
+        while True:
+            part = _read(fh, "<u8", chunk_edges)
+            if not len(part):
+                return
+            yield part
+
+
+def _unique(values: np.ndarray) -> np.ndarray:
+    # sort + neighbour compare; much faster than np.unique on 64-bit hashes
+    values = np.sort(values, axis=None)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def _index_of(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Positions of ``values`` (all present) in the sorted ``keys``, as ``int32``."""
+    flat = values.ravel()
+    # searching in sorted order keeps the lookups into ``keys`` cache-friendly
+    order = np.argsort(flat)
+    ids = np.empty(len(flat), dtype=np.int32)
+    ids[order] = np.searchsorted(keys, flat[order])
+    return ids.reshape(values.shape)
+
+
+def _chunk_edges(memory_bytes: int, nodes: int) -> int:
+    free = memory_bytes - nodes * NODE_BYTES
+    if free < CHUNK_EDGE_BYTES * 65536:
+        raise MemoryError(
+            f"{nodes} nodes need more than {memory_bytes // 2**20} MB; raise --memory-mb"
+        )
+    return free // CHUNK_EDGE_BYTES
+
+
+class DenseEdges:
+    """``int32`` node-index edges in an unnamed scratch file, read back in chunks."""
+
+    def __init__(self, directory: str, chunk_edges: int):
+        self._fh = tempfile.TemporaryFile(dir=directory)
+        self.chunk_edges = chunk_edges
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def write(self, pos: int, edges: np.ndarray) -> None:
+        self._fh.seek(pos * 8)
+        edges.astype(np.int32, copy=False).tofile(self._fh)
+
+    def append(self, edges: np.ndarray) -> None:
+        self.write(self.count, edges)
+        self.count += len(edges)
+
+    def chunks(self, start: int = 0, end: Optional[int] = None) -> Iterator[np.ndarray]:
+        end = self.count if end is None else end
+        for lo in range(start, end, self.chunk_edges):
+            self._fh.seek(lo * 8)
+            yield _read(self._fh, np.int32, min(self.chunk_edges, end - lo))
+
+    def truncate(self, count: int) -> None:
+        self.count = count
+        self._fh.truncate(count * 8)
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def build(directory: str, memory_mb: int = 1024) -> Tuple[np.ndarray, DenseEdges]:
+    """Node keys (sorted ``uint64``) and the dense edges of the newest visit of each source."""
+    budget = memory_mb * 2**20
+    paths = segments(directory)
+    # a first guess at the chunk size: the node table is not known yet
+    chunk = _chunk_edges(budget, 0) // 2
+    keys = np.empty(0, dtype=np.uint64)
+    for path in paths:
+        for part in _chunks(path, chunk):
+            keys = _unique(np.concatenate((keys, _unique(part))))
+
+    dense = DenseEdges(directory, _chunk_edges(budget, len(keys)))
+    newest = np.full(len(keys), -1, dtype=np.int32)
+    bounds: List[Tuple[int, int]] = []
+    for seg, path in enumerate(paths):
+        start = len(dense)
+        for part in _chunks(path, dense.chunk_edges):
+            ids = _index_of(keys, part)
+            dense.append(ids)
+            newest[ids[:, 0]] = seg
+        bounds.append((start, len(dense)))
+
+    # a page crawled again only keeps the links of its latest visit; compacted in place,
+    # the write position never passes the read position
+    kept = 0
+    for seg, (start, end) in enumerate(bounds):
+        for part in dense.chunks(start, end):
+            part = part[(newest[part[:, 0]] == seg) & (part[:, 0] != part[:, 1])]
+            dense.write(kept, part)
+            kept += len(part)
+    dense.truncate(kept)
+    return keys, dense
+
+
+def pagerank(
+    nodes: int,
+    edges: DenseEdges,
+    damping: float = 0.85,
+    tol: float = 1e-6,
+    max_iter: int = 100,
+) -> Tuple[np.ndarray, int]:
+    """Stationary ranks (summing to 1) of ``nodes`` nodes, and the iterations used."""
+    if not nodes:
+        return np.empty(0), 0
+    out = np.zeros(nodes, dtype=np.float64)
+    for part in edges.chunks():
+        out += np.bincount(part[:, 0], minlength=nodes)
+    dangling = out == 0
+    inv_out = np.divide(1.0, out, out=out, where=~dangling)
+
+    rank = np.full(nodes, 1.0 / nodes)
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        share = rank * inv_out
+        nxt = np.zeros(nodes)
+        for part in edges.chunks():
+            np.add.at(nxt, part[:, 1], share[part[:, 0]])
+        # teleport plus the rank of dangling nodes, spread evenly
+        nxt *= damping
+        nxt += (1.0 - damping * (1.0 - rank[dangling].sum())) / nodes
+        delta = np.abs(nxt - rank).sum()
+        rank = nxt
+        if delta < tol:
+            break
+    return rank, iterations
+
+
+def save_scores(directory: str, keys: np.ndarray, scores: np.ndarray) -> None:
+    tmp = os.path.join(directory, SCORES_FILE + ".tmp.npz")
+    np.savez(tmp, keys=keys, scores=scores.astype(np.float32))
+    os.replace(tmp, os.path.join(directory, SCORES_FILE))
+
+
+class Scores:
+    """Scores of the last run, looked up by URL (about 12 bytes per node)."""
+
+    def __init__(self, keys: np.ndarray, scores: np.ndarray):
+        self.keys = keys
+        self.scores = scores
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["Scores"]:
+        path = os.path.join(directory, SCORES_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["keys"], data["scores"])
+
+    def lookup(self, urls: List[str]) -> np.ndarray:
+        """Scores of ``urls``; NaN for URLs that are not in the graph."""
+        if not urls or not len(self.keys):
+            return np.full(len(urls), np.nan, dtype=np.float32)
+        wanted = np.fromiter((url_key(u) for u in urls), dtype=np.uint64, count=len(urls))
+        pos = np.minimum(np.searchsorted(self.keys, wanted), len(self.keys) - 1)
+        return np.where(self.keys[pos] == wanted, self.scores[pos], np.float32(np.nan))
+
+    def get(self, url: str) -> Optional[float]:
+        score = self.lookup([url])[0]
+        return None if np.isnan(score) else float(score)
+
+
+def write_back(client, scores: Scores, min_change: float = 0.01, batch: int = 1000) -> Dict[str, int]:
+    """Update ``pagerank`` on stored pages; counts of updated, unchanged and unranked pages."""
+    from opensearchpy.helpers import bulk, scan
+
+    counts = {"updated": 0, "unchanged": 0, "unranked": 0, "failed": 0}
+
+    def actions():
+        hits = scan(client, index=PAGES_ALIAS, query={"_source": ["pagerank"]}, size=batch)
+        while True:
+            page = [h for _, h in zip(range(batch), hits)]
+            if not page:
+                return
+            for hit, score in zip(page, scores.lookup([h["_id"] for h in page]).tolist()):
+                if score != score:  # NaN: the page is not in the graph
+                    counts["unranked"] += 1
+                    continue
+                old = (hit.get("_source") or {}).get("pagerank")
+                if old is not None and abs(score - old) <= min_change * max(old, 1e-9):
+                    counts["unchanged"] += 1
+                    continue
+                yield {
+                    "_op_type": "update",
+                    "_index": hit["_index"],
+                    "_id": hit["_id"],
+                    "doc": {"pagerank": round(score, 6), "indexed_at": now_ms()},
+                    "retry_on_conflict": 3,
+                }
+
+    ok, failed = bulk(client, actions(), chunk_size=batch, raise_on_error=False, stats_only=True)
+    counts["updated"], counts["failed"] = ok, failed
+    return counts
+
+
+def run(directory: str, memory_mb: int = 1024, damping: float = 0.85, tol: float = 1e-6, max_iter: int = 100) -> Scores:
+    """Build the graph, rank it and save the scores; returns them."""
+    t0 = time.perf_counter()
+    keys, edges = build(directory, memory_mb)
+    t1 = time.perf_counter()
+    try:
+        rank, iterations = pagerank(len(keys), edges, damping, tol, max_iter)
+    finally:
+        edges.close()
+    t2 = time.perf_counter()
+    # mean 1: boosts stay comparable as the graph grows
+    scores = Scores(keys, (rank * len(keys)).astype(np.float32))
+    save_scores(directory, keys, scores.scores)
+    print(
+        f"[Compass] pagerank: {len(keys)} nodes, {len(edges)} edges, chunks of {edges.chunk_edges}; "
+        f"built in {t1 - t0:.1f}s, {iterations} iterations in {t2 - t1:.1f}s"
+    )
+    return scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compute PageRank over the crawler's link graph")
+    parser.add_argument("directory", help="link graph directory (LINKGRAPH_DIR of the crawler)")
+    parser.add_argument("--url", default=os.getenv("OPENSEARCH_URL", "http://localhost:9200"))
+    parser.add_argument("--memory-mb", type=int, default=int(os.getenv("COMPASS_PAGERANK_MEMORY_MB", "1024")))
+    parser.add_argument("--damping", type=float, default=0.85)
+    parser.add_argument("--tol", type=float, default=1e-6, help="L1 change at which iteration stops")
+    parser.add_argument("--max-iter", type=int, default=100)
+    parser.add_argument("--min-change", type=float, default=0.01, help="relative change worth a page update")
+    parser.add_argument("--no-write", action="store_true", help="only save pagerank.npz")
+    args = parser.parse_args()
+    if not os.path.isdir(args.directory):
+        parser.error(f"no link graph at {args.directory}")
+
+    scores = run(args.directory, args.memory_mb, args.damping, args.tol, args.max_iter)
+    if args.no_write:
+        return
+    from opensearchpy import OpenSearch
+
+    client = OpenSearch(args.url, verify_certs=False, timeout=60)
+    counts = write_back(client, scores, args.min_change)
+    print(f"[Compass] pagerank written to {PAGES_ALIAS}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
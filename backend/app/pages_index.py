@@ -0,0 +1,227 @@
+"""Lifecycle of the ``pages`` index: versioned mapping, alias, zero-downtime reindex.
+
+Readers and writers only ever use the ``pages`` alias. It points at a concrete
+``pages_v<N>`` index built from ``index_body()``. Changing the mapping means
+bumping ``PAGES_VERSION`` and running ``reindex``. That command builds the new
+version next to the old one and copies the documents in parallel slices. It
+then re-copies the documents written meanwhile (by ``indexed_at``) and moves
+the alias in one atomic ``update_aliases`` call.
+
+This module only depends on ``opensearchpy`` so the crawler and
+``search_backend`` can import it too. CLI (run from ``backend/``)::
+
+    python -m app.pages_index ensure
+    python -m app.pages_index reindex [--slices auto|N]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Any, Dict
+
+PAGES_ALIAS = "pages"
+PAGES_VERSION = 5
+# reindex catch-up: passes at most, a pass copying fewer docs than this ends it, and
+# how far back each pass looks beyond the previous one (clock skew between writers)
+CATCH_UP_PASSES = 5
+CATCH_UP_DONE = 1000
+CATCH_UP_SLACK_MS = 60_000
+
+
+def now_ms() -> int:
+    """Value for ``indexed_at``."""
+    return int(time.time() * 1000)
+
+
+def versioned_name(version: int = PAGES_VERSION) -> str:
+    return f"{PAGES_ALIAS}_v{version}"
+
+
+def index_body(building: bool = False) -> Dict[str, Any]:
+    """Settings and mapping for the current version.
+
+    ``building`` disables refresh and replicas while a reindex fills the index;
+    ``finish_build`` restores them afterwards.
+    """
+    return {
+        "settings": {
+            "index": {
+                "number_of_shards": int(os.getenv("COMPASS_PAGES_SHARDS", "1")),
+                "number_of_replicas": 0 if building else int(os.getenv("COMPASS_PAGES_REPLICAS", "1")),
+                "refresh_interval": "-1" if building else os.getenv("COMPASS_PAGES_REFRESH", "1s"),
+                "codec": os.getenv("COMPASS_PAGES_CODEC", "best_compression"),
+            },
+            "analysis": {
+                "filter": {
+                    "english_stemmer": {"type": "stemmer", "language": "english"},
+                    "english_possessive": {"type": "stemmer", "language": "possessive_english"},
+                },
+                "analyzer": {
+                    "compass_text": {
+                        "type": "custom",
+                        "tokenizer": "standard",
+                        "filter": ["english_possessive", "lowercase", "asciifolding", "english_stemmer"],
+                    },
+                },
+            },
+        },
+        "mappings": {
+            # unknown fields are kept in _source but not indexed
+            "dynamic": False,
+            "properties": {
+                "url": {"type": "keyword", "doc_values": False},
+                "title": {"type": "text", "analyzer": "compass_text"},
+                "snippet": {"type": "text", "analyzer": "compass_text"},
+                "body": {"type": "text", "analyzer": "compass_text"},
+                "headings": {"type": "text", "analyzer": "compass_text"},
+                "source": {"type": "keyword"},
+                "fetched_at": {"type": "date"},
+                # epoch ms of the last write, set by every writer; reindex catches up on it
+                "indexed_at": {"type": "date"},
+                # near-duplicate fingerprint (app.near_dup) and its LSH band keys
+                "simhash": {"type": "long", "index": False},
+                "simhash_bands": {"type": "keyword"},
+                # recrawl state as of the last content change (crawler.recrawl): validators for
+                # conditional GETs, body hash, revisit interval in seconds and when to check again
+                "etag": {"type": "keyword", "index": False, "doc_values": False},
+                "last_modified": {"type": "keyword", "index": False, "doc_values": False},
+                "content_hash": {"type": "keyword", "index": False, "doc_values": False},
+                "revisit_s": {"type": "float", "index": False},
+                "next_crawl_at": {"type": "date"},
+                "checked_at": {"type": "date", "index": False},
+                # link-graph PageRank, 1 for an average page (app.pagerank); read by function_score
+                "pagerank": {"type": "float", "index": False},
+            },
+        },
+    }
+
+
+def create_body() -> Dict[str, Any]:
+    """``index_body`` plus the alias, for creating the first version in one call."""
+    return {**index_body(), "aliases": {PAGES_ALIAS: {"is_write_index": True}}}
+
+
+def ensure(client) -> None:
+    """Create ``pages_v<N>`` behind the ``pages`` alias unless the alias (or a legacy
+    concrete ``pages`` index, which ``reindex`` migrates) already exists."""
+    if client.indices.exists(index=PAGES_ALIAS):
+        return
+    client.indices.create(index=versioned_name(), body=create_body(), ignore=[400])
+
+
+async def ensure_async(client) -> None:
+    """``ensure`` for an ``AsyncOpenSearch`` client."""
+    if await client.indices.exists(index=PAGES_ALIAS):
+        return
+    await client.indices.create(index=versioned_name(), body=create_body(), ignore=[400])
+
+
+def finish_build(client, index: str) -> None:
+    live = index_body()["settings"]["index"]
+    client.indices.put_settings(
+        index=index,
+        body={"index": {"refresh_interval": live["refresh_interval"], "number_of_replicas": live["number_of_replicas"]}},
+    )
+    client.indices.refresh(index=index)
+
+
+def _copy(client, target: str, since: int | None, slices) -> int:
+    """Copy ``pages`` into ``target`` (only docs written at or after ``since``, if given)."""
+    body: Dict[str, Any] = {"source": {"index": PAGES_ALIAS}, "dest": {"index": target}, "conflicts": "proceed"}
+    if since is not None:
+        client.indices.refresh(index=PAGES_ALIAS)
+        body["source"]["query"] = {"range": {"indexed_at": {"gte": since}}}
+    res = client.reindex(body=body, slices=slices, wait_for_completion=True, request_timeout=24 * 3600)
+    return res.get("total", 0)
+
+
+def _map_indexed_at(client, sources) -> None:
+    """Make ``indexed_at`` searchable on the live ``sources`` so writes made during the
+    copy can be found again afterwards.
+
+    Sources that already map it keep their mapping: dynamic mapping made it a
+    ``long`` on a legacy index, and a range on epoch milliseconds works the
+    same on ``long`` and ``date``. Sources without it (never written since the
+    writers started stamping it, or ``dynamic: false``) get it added.
+    """
+    missing = []
+    for name, body in client.indices.get_mapping(index=",".join(sources)).items():
+        field = body.get("mappings", {}).get("properties", {}).get("indexed_at")
+        if field is None:
+            missing.append(name)
+        elif field.get("type") not in ("date", "long"):
+            raise RuntimeError(f"{name} maps indexed_at as {field.get('type')}; cannot catch up on writes")
+    if missing:
+        client.indices.put_mapping(index=",".join(missing), body={"properties": {"indexed_at": {"type": "date"}}})
+
+
+def reindex(client, slices: str | int = "auto") -> str:
+    """Build the current version from whatever ``pages`` points at, then flip the alias.
+
+    Returns the name of the new index. A legacy concrete ``pages`` index is
+    replaced by the alias in the same atomic step.
+
+    Writers are not paused. Documents they write during the copy carry a newer
+    ``indexed_at``, and catch-up passes re-copy them just before the flip. Each
+    pass only covers what was written since the previous one. Only writes in
+    the last moments between the final pass and ``update_aliases`` can be
+    missed. Deletes are not carried over.
+    """
+    target = versioned_name()
+    if client.indices.exists_alias(name=PAGES_ALIAS):
+        sources = list(client.indices.get_alias(name=PAGES_ALIAS).keys())
+        legacy = False
+    elif client.indices.exists(index=PAGES_ALIAS):
+        sources = [PAGES_ALIAS]
+        legacy = True
+    else:
+        ensure(client)
+        return target
+    if target in sources:
+        raise RuntimeError(f"{target} is already live; bump PAGES_VERSION before reindexing")
+
+    _map_indexed_at(client, sources)
+    since = now_ms() - CATCH_UP_SLACK_MS
+    client.indices.create(index=target, body=index_body(building=True))
+    _copy(client, target, None, slices)
+    finish_build(client, target)
+
+    # catch up on documents written since the previous pass, until a pass finds few
+    for _ in range(CATCH_UP_PASSES):
+        started = now_ms() - CATCH_UP_SLACK_MS
+        copied = _copy(client, target, since, slices)
+        since = started
+        if copied < CATCH_UP_DONE:
+            break
+    client.indices.refresh(index=target)
+
+    if legacy:
+        actions = [{"remove_index": {"index": PAGES_ALIAS}}]
+    else:
+        actions = [{"remove": {"index": src, "alias": PAGES_ALIAS}} for src in sources]
+    actions.append({"add": {"index": target, "alias": PAGES_ALIAS, "is_write_index": True}})
+    client.indices.update_aliases(body={"actions": actions})
+    return target
+
+
+def main() -> None:
+    from opensearchpy import OpenSearch
+
+    parser = argparse.ArgumentParser(description="Manage the pages index")
+    parser.add_argument("command", choices=["ensure", "reindex"])
+    parser.add_argument("--url", default=os.getenv("OPENSEARCH_URL", "http://localhost:9200"))
+    parser.add_argument("--slices", default="auto", help="parallel reindex slices (auto or a number)")
+    args = parser.parse_args()
+
+    client = OpenSearch(args.url, verify_certs=False)
+    if args.command == "ensure":
+        ensure(client)
+        print(f"[Compass] {PAGES_ALIAS} -> {list(client.indices.get_alias(name=PAGES_ALIAS).keys())}")
+    else:
+        slices = args.slices if args.slices == "auto" else int(args.slices)
+        print(f"[Compass] {PAGES_ALIAS} now points at {reindex(client, slices)}")
+
+
+if __name__ == "__main__":
+    main()
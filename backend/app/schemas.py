@@ -13,3 +13,29 @@ class SearchResponse(BaseModel):
     query: str
     results: List[SearchResult]
     next_cursor: str | None = None
+    timed_out: List[str] = []  # adapters that missed their deadline
+
+
+class SuggestResponse(BaseModel):
+    query: str
+    suggestions: List[str]
+
+
+class BatchQuery(BaseModel):
+    q: str
+    type: str = "web"
+    limit: int = 10
+    cursor: str | None = None
+
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery]
+    concurrency: int | None = None  # capped by COMPASS_BATCH_CONCURRENCY
+
+
+class IngestDoc(BaseModel):
+    """One line of a POST /ingest body; a bare URL line becomes ``{"url": ...}``."""
+    url: HttpUrl
+    title: str | None = None
+    snippet: str | None = None
+    body: str | None = None
@@ -0,0 +1,51 @@
+"""Single-flight coalescing of identical in-flight calls.
+
+Concurrent callers asking for the same key share one underlying task and all
+receive its result. The task is only cancelled once every caller waiting on it
+has gone away (e.g. all of them hit their deadline).
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()``, or join the identical call already in flight for ``key``."""
+        self.stats["calls"] += 1
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.stats["coalesced"] += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # nobody is left to use the result; new callers start a fresh flight
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "in_flight": len(self._inflight)}
@@ -0,0 +1,367 @@
+"""Query autocomplete over page titles and past queries.
+
+Entries are normalized (lowercase, single spaces) and held in an immutable
+snapshot: the sorted keys as one UTF-8 blob plus an offsets array and a
+scores array. That costs a few bytes per entry on top of the text itself,
+not a Python object per entry. A prefix lookup binary-searches its key range
+and ranks the whole range through the maximum score of every block of 64 and
+4096 entries, so only the blocks that can still hold a top completion are
+opened, and even a one-letter prefix is ranked exactly.
+
+New titles and popular queries go into a small pending set, kept in sorted
+order so every lookup can scan only its prefix range. A typed query is only
+admitted once it has been searched ``COMPASS_SUGGEST_MIN_QUERY_HITS`` times,
+so one user's query never shows up for others. The pending set is merged into
+a fresh snapshot in a worker thread, every ``COMPASS_SUGGEST_REBUILD_S``
+seconds or once it holds ``COMPASS_SUGGEST_MAX_PENDING`` keys. The merge is
+one streaming pass over the old snapshot's arrays. Lookups keep using the old
+snapshot until the new one is swapped in.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import re
+import time
+from array import array
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .config import settings
+from . import index_client
+from .pages_index import PAGES_ALIAS
+
+_MAX_KEY = 80
+_BLOCK = 64  # entries per block; a superblock is _BLOCK blocks
+_SUPER = _BLOCK * _BLOCK
+
+_space = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _space.sub(" ", text).strip().lower()[:_MAX_KEY]
+
+
+class _Keys:
+    """Sorted keys packed into one bytes blob; indexable so ``bisect`` works on it."""
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: bytes, offsets: array):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+
+def _block_max(scores: np.ndarray, size: int) -> array:
+    if not len(scores):
+        return array("f")
+    pad = -len(scores) % size
+    padded = np.concatenate((scores, np.full(pad, -np.inf, dtype=np.float32)))
+    return array("f", padded.reshape(-1, size).max(axis=1).tobytes())
+
+
+class _Snapshot:
+    __slots__ = ("keys", "scores", "blocks", "supers")
+
+    def __init__(self, blob: bytes = b"", offsets: array | None = None, scores: array | None = None):
+        """Keys in code point order (== UTF-8 byte order) as ``blob``/``offsets``, and their scores."""
+        self.keys = _Keys(blob, offsets if offsets is not None else array("I", [0]))
+        self.scores = scores if scores is not None else array("f")
+        values = np.frombuffer(self.scores, dtype=np.float32) if len(self.scores) else np.empty(0, np.float32)
+        self.blocks = _block_max(values, _BLOCK)
+        self.supers = _block_max(values, _SUPER)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def complete(self, prefix: str, k: int) -> List[Tuple[str, float]]:
+        p = prefix.encode()
+        lo = bisect_left(self.keys, p)
+        hi = bisect_left(self.keys, p + b"\xff", lo)  # 0xff never occurs in UTF-8
+        idx = self._top(lo, hi, k)
+        return [(self.keys[i].decode(), self.scores[i]) for i in idx]
+
+    def _top(self, lo: int, hi: int, k: int) -> List[int]:
+        """Indexes of the ``k`` best entries in ``[lo, hi)``, best first.
+
+        Best-first search over entries, blocks and superblocks (kind 0, 1, 2),
+        each keyed by its (maximum) score: a block is only opened once its
+        maximum beats every entry already seen.
+        """
+        heap: List[Tuple[float, int, int]] = []
+        i = lo
+        while i < hi:
+            if i % _SUPER == 0 and i + _SUPER <= hi:
+                heap.append((-self.supers[i // _SUPER], 2, i // _SUPER))
+                i += _SUPER
+            elif i % _BLOCK == 0 and i + _BLOCK <= hi:
+                heap.append((-self.blocks[i // _BLOCK], 1, i // _BLOCK))
+                i += _BLOCK
+            else:
+                heap.append((-self.scores[i], 0, i))
+                i += 1
+        heapq.heapify(heap)
+        out: List[int] = []
+        while heap and len(out) < k:
+            _, kind, j = heapq.heappop(heap)
+            if kind == 0:
+                out.append(j)
+            elif kind == 1:
+                for e in range(j * _BLOCK, (j + 1) * _BLOCK):
+                    heapq.heappush(heap, (-self.scores[e], 0, e))
+            else:
+                for b in range(j * _BLOCK, (j + 1) * _BLOCK):
+                    heapq.heappush(heap, (-self.blocks[b], 1, b))
+        return out
+
+
+def _merge(old: _Snapshot, extra: Dict[str, float], max_entries: int) -> _Snapshot:
+    """``old`` plus ``extra`` (scores add up), in one pass over the sorted arrays.
+
+    Only ``extra`` becomes Python objects; runs of old entries are copied as
+    slices of the blob and arrays.
+    """
+    old_offsets = np.frombuffer(old.keys.offsets, dtype=np.uint32)
+    blob = bytearray()
+    offsets = [np.zeros(1, dtype=np.int64)]
+    scores = array("f")
+    n, i = len(old), 0
+
+    def copy_old(j: int) -> None:
+        if j > i:
+            base = len(blob) - int(old_offsets[i])
+            blob.extend(old.keys.blob[old_offsets[i]:old_offsets[j]])
+            offsets.append(old_offsets[i + 1:j + 1].astype(np.int64) + base)
+            scores.extend(old.scores[i:j])
+
+    for key in sorted(extra):
+        kb = key.encode()
+        j = bisect_left(old.keys, kb, i)
+        copy_old(j)
+        score = extra[key]
+        if j < n and old.keys[j] == kb:
+            score += old.scores[j]
+            j += 1
+        blob.extend(kb)
+        offsets.append(np.array([len(blob)], dtype=np.int64))
+        scores.append(score)
+        i = j
+    copy_old(n)
+    ends = np.concatenate(offsets)
+
+    if len(scores) > max_entries:
+        # keep the best max_entries, still in key order
+        values = np.frombuffer(scores, dtype=np.float32)
+        keep = np.sort(np.argpartition(-values, max_entries)[:max_entries])
+        kept_blob = bytearray()
+        kept_ends = np.zeros(len(keep) + 1, dtype=np.int64)
+        for n_kept, e in enumerate(keep.tolist(), 1):
+            kept_blob.extend(blob[ends[e]:ends[e + 1]])
+            kept_ends[n_kept] = len(kept_blob)
+        blob, ends = kept_blob, kept_ends
+        scores = array("f", values[keep].tobytes())
+    return _Snapshot(bytes(blob), array("I", ends.astype(np.uint32).tobytes()), scores)
+
+
+class _Pending:
+    """Recent additions: scores by key, plus the keys in sorted order for prefix scans."""
+
+    __slots__ = ("scores", "keys")
+
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self.keys: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.scores
+
+    def add(self, key: str, score: float) -> None:
+        if key in self.scores:
+            self.scores[key] += score
+        else:
+            insort(self.keys, key)
+            self.scores[key] = score
+
+    def with_prefix(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        for i in range(bisect_left(self.keys, prefix), len(self.keys)):
+            key = self.keys[i]
+            if not key.startswith(prefix):
+                return
+            yield key, self.scores[key]
+
+
+class Suggester:
+    def __init__(self):
+        self._snap = _Snapshot()
+        self._pending = _Pending()
+        self._folding = _Pending()
+        # typed queries not yet searched often enough to be suggested, with their hit counts
+        self._candidates: Dict[str, int] = {}
+        self._lock: asyncio.Lock | None = None
+        self._rebuild: asyncio.Task | None = None
+        self._task: asyncio.Task | None = None
+        self.stats: Dict[str, Any] = {"rebuilds": 0, "last_rebuild_ms": None, "dropped": 0, "admitted": 0}
+
+    # ------------------------------------------------------------------
+    # lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        """Load titles from the pages index and start the periodic rebuild."""
+        self._lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._rebuild):
+            if task is not None:
+                task.cancel()
+        self._task = self._rebuild = None
+
+    async def _run(self) -> None:
+        try:
+            await self._load_titles()
+        except Exception as exc:
+            print(f"[Compass] Warning: could not load suggestions from {PAGES_ALIAS}: {exc}")
+        while True:
+            await asyncio.sleep(settings.suggest_rebuild_s)
+            await self._fold()
+
+    async def _load_titles(self) -> None:
+        client = index_client.get_index_client()
+        if client is None:
+            return
+        titles: Dict[str, float] = {}
+        weight = settings.suggest_title_weight
+        async for hit in index_client.async_scan(
+            client, index=PAGES_ALIAS, query={"_source": ["title", "url"]}, size=1000
+        ):
+            src = hit.get("_source", {})
+            key = self._title_key(src.get("title"), src.get("url"))
+            if key:
+                titles[key] = titles.get(key, 0.0) + weight
+            if len(titles) >= settings.suggest_max_entries:
+                break
+        await self._merge_in(titles)
+
+    # ------------------------------------------------------------------
+    # updates
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _title_key(title: str | None, url: str | None) -> str | None:
+        # documents stored from bare links use the URL as title
+        if not title or title == url:
+            return None
+        return normalize(title)
+
+    def add(self, text: str, weight: float = 1.0) -> None:
+        key = normalize(text)
+        if len(key) < 2:
+            return
+        if key not in self._pending and len(self._pending) >= 4 * settings.suggest_max_pending:
+            # a rebuild is already behind; keep the pending map bounded
+            self.stats["dropped"] += 1
+            return
+        self._pending.add(key, weight)
+        if len(self._pending) >= settings.suggest_max_pending:
+            self._schedule_rebuild()
+
+    def record_query(self, query: str) -> None:
+        """Count a searched query; it becomes a suggestion after ``suggest_min_query_hits`` searches."""
+        key = normalize(query)
+        if len(key) < 2:
+            return
+        if key in self._pending or key in self._folding or self._known(key):
+            self.add(key)
+            return
+        hits = self._candidates.get(key, 0) + 1
+        if hits >= settings.suggest_min_query_hits:
+            self._candidates.pop(key, None)
+            self.stats["admitted"] += 1
+            self.add(key, float(hits))
+            return
+        if key not in self._candidates and len(self._candidates) >= 10 * settings.suggest_max_pending:
+            # the long tail of one-off queries; forget those seen once
+            self._candidates = {k: n for k, n in self._candidates.items() if n > 1}
+            if len(self._candidates) >= 10 * settings.suggest_max_pending:
+                self.stats["dropped"] += 1
+                return
+        self._candidates[key] = hits
+
+    def _known(self, key: str) -> bool:
+        kb = key.encode()
+        i = bisect_left(self._snap.keys, kb)
+        return i < len(self._snap) and self._snap.keys[i] == kb
+
+    def on_page_indexed(self, action: Dict[str, Any]) -> None:
+        """Bulk indexer listener: add titles of documents written to pages."""
+        if action.get("_index") != PAGES_ALIAS:
+            return
+        key = self._title_key(action.get("title"), action.get("url"))
+        if key:
+            self.add(key, settings.suggest_title_weight)
+
+    def _schedule_rebuild(self) -> None:
+        if self._lock is None:  # not started (no lifespan); folded by lookups only
+            return
+        if self._rebuild is None or self._rebuild.done():
+            self._rebuild = asyncio.create_task(self._fold())
+
+    async def _fold(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            self._folding, self._pending = self._pending, _Pending()
+            try:
+                await self._swap(self._folding.scores)
+            except Exception as exc:
+                print(f"[Compass] Suggest rebuild failed: {exc}")
+                for key, score in self._folding.scores.items():
+                    self._pending.add(key, score)
+            finally:
+                self._folding = _Pending()
+
+    async def _merge_in(self, extra: Dict[str, float]) -> None:
+        async with self._lock:
+            await self._swap(extra)
+
+    async def _swap(self, extra: Dict[str, float]) -> None:
+        t0 = time.perf_counter()
+        self._snap = await asyncio.to_thread(_merge, self._snap, extra, settings.suggest_max_entries)
+        self.stats["rebuilds"] += 1
+        self.stats["last_rebuild_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    # ------------------------------------------------------------------
+    # lookups
+    # ------------------------------------------------------------------
+    def suggest(self, prefix: str, limit: int = 8) -> List[str]:
+        # keep one trailing space so "new " completes words after "new"
+        prefix = _space.sub(" ", prefix).lstrip().lower()[:_MAX_KEY]
+        if not prefix.strip():
+            return []
+        scores: Dict[str, float] = dict(self._snap.complete(prefix, 2 * limit))
+        for recent in (self._folding, self._pending):
+            for key, score in recent.with_prefix(prefix):
+                scores[key] = scores.get(key, 0.0) + score
+        return heapq.nlargest(limit, scores, key=scores.__getitem__)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "entries": len(self._snap),
+            "pending": len(self._pending) + len(self._folding),
+            "bytes": len(self._snap.keys.blob) + self._snap.keys.offsets.itemsize * len(self._snap.keys.offsets)
+            + self._snap.scores.itemsize * len(self._snap.scores),
+        }
+
+
+suggester = Suggester()
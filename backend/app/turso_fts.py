@@ -0,0 +1,142 @@
+"""FTS5 full-text index over the Turso ``search_index`` table.
+
+``search_index_fts`` is an external-content FTS5 table over ``title`` and
+``snippet``. It stores only the inverted index and reads the column values
+back from ``search_index`` by rowid. Triggers keep it in step with inserts,
+updates and deletes. Rows that existed before setup are indexed by
+``backfill``, which walks ``search_index`` in rowid order in fixed-size
+batches. It records its position, so an interrupted backfill resumes where it
+stopped. Run from ``backend/``::
+
+    python -m app.turso_fts setup       # FTS table, triggers, ranking weights
+    python -m app.turso_fts backfill [--batch 5000]
+    python -m app.turso_fts status
+    python -m app.turso_fts optimize    # merge FTS b-tree segments after large loads
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from libsql_client import create_client
+
+from .config import settings
+
+TABLE = "search_index"
+FTS = "search_index_fts"
+STATE = "search_index_fts_state"
+# bm25 column weights, in FTS column order (title, snippet)
+RANK = "bm25(10.0, 1.0)"
+
+
+def _indexed(row: str) -> str:
+    # rows in (backfilled_to, backfill_until] are not indexed yet; the backfill reads their current values
+    return f"(SELECT {row}.rowid <= backfilled_to OR {row}.rowid > backfill_until FROM {STATE} WHERE id = 1)"
+
+
+SETUP = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS} USING fts5(
+        title, snippet,
+        content='{TABLE}', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"INSERT INTO {FTS}({FTS}, rank) VALUES('rank', '{RANK}')",
+    f"CREATE TABLE IF NOT EXISTS {STATE} (id INTEGER PRIMARY KEY CHECK (id = 1), backfilled_to INTEGER, backfill_until INTEGER)",
+    # rows up to the current max rowid are the backfill's job; later ones arrive through the triggers
+    f"INSERT OR IGNORE INTO {STATE} (id, backfilled_to, backfill_until) SELECT 1, 0, COALESCE(MAX(rowid), 0) FROM {TABLE}",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_fts_ai AFTER INSERT ON {TABLE}
+    WHEN {_indexed("new")} BEGIN
+        INSERT INTO {FTS}(rowid, title, snippet) VALUES (new.rowid, new.title, new.snippet);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_fts_ad AFTER DELETE ON {TABLE}
+    WHEN {_indexed("old")} BEGIN
+        INSERT INTO {FTS}({FTS}, rowid, title, snippet) VALUES ('delete', old.rowid, old.title, old.snippet);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_fts_au AFTER UPDATE OF title, snippet ON {TABLE}
+    WHEN {_indexed("old")} BEGIN
+        INSERT INTO {FTS}({FTS}, rowid, title, snippet) VALUES ('delete', old.rowid, old.title, old.snippet);
+        INSERT INTO {FTS}(rowid, title, snippet) VALUES (new.rowid, new.title, new.snippet);
+    END""",
+]
+
+
+def match_expression(query: str) -> str:
+    """Quote every term so user input is never parsed as FTS5 syntax (terms are ANDed)."""
+    terms = [t for t in query.split() if t.strip('"')]
+    return " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def _connect():
+    if not settings.turso_db_url:
+        raise SystemExit("TURSO_DB_URL not set")
+    return create_client(url=settings.turso_db_url, auth_token=settings.turso_auth_token or None)
+
+
+async def setup(client) -> None:
+    await client.batch(SETUP)
+
+
+async def status(client) -> dict:
+    rs = await client.execute(f"SELECT backfilled_to, backfill_until FROM {STATE} WHERE id = 1")
+    if not rs.rows:
+        return {"setup": False}
+    done, until = rs.rows[0][0], rs.rows[0][1]
+    return {"setup": True, "backfilled_to": done, "backfill_until": until, "complete": done >= until}
+
+
+async def backfill(client, batch: int = 5000) -> int:
+    """Index pre-existing rows in rowid batches; resumable. Returns rows indexed."""
+    state = await status(client)
+    if not state["setup"]:
+        raise SystemExit("run `python -m app.turso_fts setup` first")
+    done, until = state["backfilled_to"], state["backfill_until"]
+    total, t0 = 0, time.perf_counter()
+    while done < until:
+        rs = await client.execute(
+            f"SELECT MAX(rowid), COUNT(*) FROM (SELECT rowid FROM {TABLE} WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?)",
+            [done, until, batch],
+        )
+        upto, n = rs.rows[0][0], rs.rows[0][1]
+        if not n:
+            upto = until
+        # index the batch and advance the checkpoint in one transaction
+        await client.batch([
+            (
+                f"INSERT INTO {FTS}(rowid, title, snippet) SELECT rowid, title, snippet FROM {TABLE} WHERE rowid > ? AND rowid <= ?",
+                [done, upto],
+            ),
+            (f"UPDATE {STATE} SET backfilled_to = ? WHERE id = 1", [upto]),
+        ])
+        done, total = upto, total + n
+        rate = total / max(time.perf_counter() - t0, 1e-9)
+        print(f"[Compass] backfilled to rowid {done}/{until} ({total} rows, {rate:.0f} rows/s)")
+    return total
+
+
+async def optimize(client) -> None:
+    await client.execute(f"INSERT INTO {FTS}({FTS}) VALUES('optimize')")
+
+
+async def _main(args) -> None:
+    async with _connect() as client:
+        if args.command == "setup":
+            await setup(client)
+            print(f"[Compass] {FTS} ready: {await status(client)}")
+        elif args.command == "backfill":
+            await backfill(client, args.batch)
+        elif args.command == "optimize":
+            await optimize(client)
+        else:
+            print(await status(client))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.turso_fts", description="Manage the Turso FTS5 index")
+    parser.add_argument("command", choices=["setup", "backfill", "status", "optimize"])
+    parser.add_argument("--batch", type=int, default=5000, help="rows per backfill transaction")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from opensearchpy import OpenSearch
 from pathlib import Path
+import os
+import sys
+
+# the pages mapping and alias live in the backend package
+sys.path.append((Path(__file__).resolve().parent.parent / "backend").as_posix())
+from app.pages_index import PAGES_ALIAS  # noqa: E402
 
 client = OpenSearch(hosts=[{"host": "localhost", "port": 9200}])
-INDEX = "pages"
+# read through the alias so a reindex can swap the index underneath
+INDEX = PAGES_ALIAS
+# weight of the link-graph PageRank (app.pagerank) in ranking; 0 turns it off
+PAGERANK_FACTOR = float(os.getenv("COMPASS_PAGERANK_FACTOR", "1"))
 
 app = FastAPI()
 app.add_middleware(
@@ -28,8 +37,26 @@ def search(q: str = Query(...), size: int = 10):
     resp = client.search(
         index=INDEX,
         body={
-            "query": {"multi_match": {"query": q, "fields": ["title^2", "body"]}},
-            "_source": ["title", "url", "body"],
+            "query": {
+                "function_score": {
+                    "query": {"multi_match": {"query": q, "fields": ["title^2", "headings", "snippet", "body"]}},
+                    # text score times log10(2 + pagerank); unranked pages count as average
+                    "field_value_factor": {
+                        "field": "pagerank",
+                        "factor": PAGERANK_FACTOR,
+                        "modifier": "log2p",
+                        "missing": 1,
+                    },
+                    "boost_mode": "multiply",
+                }
+            },
+            # bodies hold the full page text; pages without a snippet get a plain body fragment instead
+            "_source": ["title", "url", "snippet"],
+            "highlight": {
+                "fields": {"body": {"fragment_size": 180, "number_of_fragments": 1, "no_match_size": 180}},
+                "pre_tags": [""],
+                "post_tags": [""],
+            },
             "size": size,
         },
     )
@@ -37,7 +64,7 @@ def search(q: str = Query(...), size: int = 10):
         {
             "title": h["_source"]["title"],
             "url": h["_source"]["url"],
-            "snippet": h["_source"]["body"][:180] + "…",
+            "snippet": h["_source"].get("snippet") or (h.get("highlight", {}).get("body") or [""])[0] + "…",
         }
         for h in resp["hits"]["hits"]
     ]
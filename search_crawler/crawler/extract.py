@@ -0,0 +1,255 @@
+"""Main-content extraction from HTML with lxml.
+
+``MainContentExtractor.extract`` parses a page once and returns its title,
+description, headings, main text, a short snippet and its outgoing links.
+The main text is found in three steps:
+
+1. Boilerplate is removed: scripts, styles, forms, ``nav``/``header``/
+   ``footer``/``aside``, and elements with a class name or id such as
+   ``menu``, ``sidebar``, ``comments``, ``cookie``, ``share`` or ``ads``.
+   Only whole names count, and an element that contains the
+   ``<article>``/``<main>`` or most of the page text is kept.
+2. The content root is chosen. It is the ``<article>``/``<main>`` element when
+   one holds enough text. Otherwise it is the element whose paragraphs score
+   best, readability-style: paragraph length and commas go to the parent, and
+   half of that to the grandparent.
+3. The text of the root is walked in document order, with a line break at
+   each block element. Link-heavy blocks inside it (related links, tag lists)
+   are skipped. Their text and link lengths come from one bottom-up pass.
+
+The spider loads the extractor named by the ``EXTRACTOR`` setting, so another
+implementation only needs the same ``extract`` method.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlsplit
+
+from lxml import etree
+
+# never content; removed before anything is measured
+_NOISE_TAGS = ("script", "style", "noscript", "template", "svg", "iframe")
+# usually boilerplate; removed with their content unless they hold the article (an article's
+# own header stays)
+_DROP_TAGS = ("form", "button", "select", "nav", "footer", "aside", "header")
+_DROP_ROLES = frozenset(("navigation", "banner", "contentinfo", "complementary", "search"))
+# whole class names or ids only: "sidebar" is boilerplate, "layout with-sidebar" is not
+_BOILERPLATE = re.compile(
+    r"nav|navbar|menu|footer|sidebar|side-bar|comments?|cookie|consent|banner|share|sharing|social|"
+    r"related|advert|ads?|promo|breadcrumbs?|popup|modal|newsletter|subscribe|pagination|skip-link",
+    re.I,
+)
+_BLOCK = frozenset(("p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd", "table", "tr",
+                    "td", "th", "pre", "blockquote", "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr",
+                    "figure", "figcaption"))
+_PARAGRAPHS = ("p", "pre", "td", "blockquote", "dd", "li")
+_HEADINGS = ("h1", "h2", "h3")
+_LINKY = ("ul", "ol", "div", "section", "table", "p", "dl")
+# elements that could be boilerplate by class, id or role
+_NAMED = etree.XPath("//body//*[@class or @id]")
+_ROLES = etree.XPath("//*[@role]")
+_HREFS = etree.XPath("//a/@href")
+_SEMANTIC_MAIN = etree.XPath("//article | //main | //*[@role='main']")
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _text_of(el) -> str:
+    return etree.tostring(el, method="text", encoding="unicode", with_tail=False)
+
+
+def _drop(el) -> None:
+    """Remove ``el`` and its subtree, keeping its tail text in place."""
+    parent = el.getparent()
+    if parent is None:
+        return
+    if el.tail:
+        prev = el.getprevious()
+        if prev is not None:
+            prev.tail = (prev.tail or "") + el.tail
+        else:
+            parent.text = (parent.text or "") + el.tail
+    parent.remove(el)
+
+
+class MainContentExtractor:
+    def __init__(self, snippet_chars: int = 300, max_chars: int = 200_000, min_main_chars: int = 200):
+        self.snippet_chars = snippet_chars
+        self.max_chars = max_chars
+        self.min_main_chars = min_main_chars
+        self._parsers: Dict[Optional[str], etree.HTMLParser] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            snippet_chars=crawler.settings.getint("EXTRACT_SNIPPET_CHARS"),
+            max_chars=crawler.settings.getint("EXTRACT_MAX_CHARS"),
+        )
+
+    def _parser(self, encoding: Optional[str]) -> etree.HTMLParser:
+        parser = self._parsers.get(encoding)
+        if parser is None:
+            parser = self._parsers[encoding] = etree.HTMLParser(
+                encoding=encoding, remove_comments=True, remove_pis=True, no_network=True
+            )
+        return parser
+
+    def extract(self, body: bytes, url: str, encoding: Optional[str] = None) -> Dict[str, object]:
+        """Fields of one page: title, description, headings, text, snippet, links."""
+        try:
+            root = etree.fromstring(body, self._parser(encoding))
+        except (etree.ParserError, ValueError):
+            root = None
+        if root is None:
+            return {"title": None, "description": None, "headings": [], "text": "", "snippet": "", "links": []}
+
+        head_title = root.findtext(".//title")
+        meta = {}
+        for el in root.iter("meta"):
+            key = (el.get("property") or el.get("name") or "").lower()
+            if key in ("og:title", "description", "og:description") and key not in meta:
+                meta[key] = el.get("content")
+        base = root.find(".//base[@href]")
+        base_url = urljoin(url, base.get("href")) if base is not None else url
+        parts = urlsplit(base_url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        # links are taken before boilerplate removal: menus are worth following, not indexing
+        links = []
+        for href in _HREFS(root):
+            href = href.strip()
+            if href.startswith(("http://", "https://")):
+                links.append(href)
+            elif href.startswith("/") and not href.startswith("//") and "/." not in href:
+                links.append(origin + href)  # root-relative: urljoin would only prepend the origin
+            elif href and not href.startswith(("#", "javascript:", "mailto:", "tel:", "data:")):
+                links.append(urljoin(base_url, href))
+
+        self._strip(root)
+        headings = [h for h in (_norm(_text_of(el)) for el in root.iter(*_HEADINGS)) if h][:50]
+        main = self._main(root)
+        text = self._text(main)[: self.max_chars] if main is not None else ""
+
+        title = _norm(meta.get("og:title") or head_title or "") or (headings[0] if headings else None)
+        description = _norm(meta.get("description") or meta.get("og:description") or "") or None
+        return {
+            "title": title,
+            "description": description,
+            "headings": headings,
+            "text": text,
+            "snippet": self._snippet(description or text),
+            "links": links,
+        }
+
+    # ------------------------------------------------------------------
+    def _strip(self, root) -> None:
+        for el in list(root.iter(*_NOISE_TAGS)):
+            _drop(el)
+        doomed = [
+            el for el in root.iter(*_DROP_TAGS)
+            if el.tag != "header" or not any(a.tag in ("article", "main") for a in el.iterancestors())
+        ]
+        doomed += [el for el in _ROLES(root) if el.get("role") in _DROP_ROLES]
+        doomed += [el for el in _NAMED(root) if self._boilerplate_name(el)]
+        if not doomed:
+            return
+        body = root.find("body")
+        body_chars = len(_text_of(body if body is not None else root))
+        for el in doomed:
+            # a misnamed wrapper must not take the article with it
+            if next(el.iter("article", "main"), None) is not None:
+                continue
+            if body_chars and len(_text_of(el)) > body_chars / 2:
+                continue
+            _drop(el)
+
+    @staticmethod
+    def _boilerplate_name(el) -> bool:
+        tokens = el.get("class", "").split()
+        if el.get("id"):
+            tokens.append(el.get("id").strip())
+        return any(_BOILERPLATE.fullmatch(token) for token in tokens)
+
+    def _main(self, root):
+        for candidate in _SEMANTIC_MAIN(root):
+            if len(_text_of(candidate)) >= self.min_main_chars:
+                return candidate
+        scores: Dict[object, float] = {}
+        for el in root.iter(*_PARAGRAPHS):
+            text = _text_of(el)
+            if len(text) < 25:
+                continue
+            score = 1 + text.count(",") + min(len(text) / 100, 3)
+            parent = el.getparent()
+            if parent is None:
+                continue
+            scores[parent] = scores.get(parent, 0) + score
+            grand = parent.getparent()
+            if grand is not None:
+                scores[grand] = scores.get(grand, 0) + score / 2
+        if not scores:
+            return root.find("body") if root.find("body") is not None else root
+        # link density only decides among the strongest candidates; it walks the whole subtree
+        top = sorted(scores, key=scores.get, reverse=True)[:5]
+        return max(top, key=lambda el: scores[el] * (1 - self._link_density(el)))
+
+    @staticmethod
+    def _link_density(el) -> float:
+        total = len(_text_of(el))
+        if not total:
+            return 1.0
+        linked = sum(len(_text_of(a)) for a in el.iter("a"))
+        return linked / total
+
+    @staticmethod
+    def _lengths(main) -> Dict[object, tuple]:
+        """``(text chars, linked text chars)`` of every element under ``main``, in one pass."""
+        lengths: Dict[object, tuple] = {}
+        for _, el in etree.iterwalk(main, events=("end",)):
+            total = len(el.text or "") if isinstance(el.tag, str) else 0
+            linked = 0
+            for child in el:
+                t, l = lengths.get(child, (0, 0))
+                total += t + len(child.tail or "")
+                linked += l
+            lengths[el] = (total, total if el.tag == "a" else linked)
+        return lengths
+
+    def _text(self, main) -> str:
+        # link-heavy blocks go with their subtree, so nothing below them is looked at
+        lengths = self._lengths(main)
+        doomed = []
+        walker = etree.iterwalk(main, events=("start",))
+        for _, el in walker:
+            if el is not main and el.tag in _LINKY:
+                total, linked = lengths[el]
+                if not total or linked / total > 0.5:
+                    doomed.append(el)
+                    walker.skip_subtree()
+        for el in doomed:
+            _drop(el)
+        parts: List[str] = []
+        for event, el in etree.iterwalk(main, events=("start", "end")):
+            if not isinstance(el.tag, str):
+                continue
+            if event == "start":
+                if el.tag in _BLOCK:
+                    parts.append("\n")
+                if el.text:
+                    parts.append(el.text)
+            else:
+                if el.tag in _BLOCK:
+                    parts.append("\n")
+                if el is not main and el.tail:
+                    parts.append(el.tail)
+        lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+    def _snippet(self, text: str) -> str:
+        text = " ".join(text.split())
+        if len(text) <= self.snippet_chars:
+            return text
+        cut = text.rfind(" ", 0, self.snippet_chars)
+        return text[: cut if cut > 0 else self.snippet_chars] + "…"
@@ -0,0 +1,143 @@
+"""Throughput and peak memory of page extraction over an offline HTML corpus.
+
+Run from ``search_crawler/``::
+
+    python -m crawler.extract_bench --make-corpus /tmp/corpus [--pages 2000]
+    python -m crawler.extract_bench /tmp/corpus [--repeat 3]
+
+The corpus is a directory of saved ``.html`` files, searched recursively.
+``--make-corpus`` writes a fixed synthetic one (seeded, so every run
+benchmarks the same bytes). Its pages have navigation, a sidebar, an article
+of varying length, a comment section and a footer. Each mode runs in a fresh
+process, so its peak RSS is measured alone:
+
+* ``extract``: ``crawler.extract.MainContentExtractor``
+* ``p_text``: the previous spider logic, ``title::text`` plus the joined
+  ``p::text`` nodes cut to 2000 characters, through Scrapy's selectors
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import random
+import resource
+import time
+from typing import Dict, List
+
+_WORDS = (
+    "index query shard segment posting ranking crawler frontier latency cache replica merge token analyzer "
+    "document field score filter bloom hash vector snippet title heading paragraph host politeness revisit"
+).split()
+
+
+def _sentence(rnd: random.Random) -> str:
+    words = [rnd.choice(_WORDS) for _ in range(rnd.randint(8, 22))]
+    if rnd.random() < 0.5:
+        words.insert(rnd.randint(2, len(words) - 1), "and,")
+    return " ".join(words).capitalize() + "."
+
+
+def make_corpus(path: str, pages: int, seed: int = 42) -> None:
+    rnd = random.Random(seed)
+    out = pathlib.Path(path)
+    out.mkdir(parents=True, exist_ok=True)
+    for n in range(pages):
+        nav = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(rnd.randint(5, 30)))
+        side = "".join(f'<li><a href="/post/{rnd.randint(0, 10**6)}">{_sentence(rnd)[:40]}</a></li>' for _ in range(rnd.randint(5, 20)))
+        blocks: List[str] = []
+        for s in range(rnd.randint(3, 60)):
+            kind = rnd.random()
+            if kind < 0.1:
+                blocks.append(f"<h2>{_sentence(rnd)[:50]}</h2>")
+            elif kind < 0.2:
+                blocks.append("<ul>" + "".join(f"<li>{_sentence(rnd)}</li>" for _ in range(rnd.randint(2, 6))) + "</ul>")
+            elif kind < 0.3:
+                blocks.append(f"<div>{_sentence(rnd)} <b>{rnd.choice(_WORDS)}</b> {_sentence(rnd)}</div>")
+            else:
+                blocks.append("<p>" + " ".join(_sentence(rnd) for _ in range(rnd.randint(1, 6))) + "</p>")
+        comments = "".join(f'<div class="comment"><p>{_sentence(rnd)}</p></div>' for _ in range(rnd.randint(0, 15)))
+        page = (
+            f"<!doctype html><html><head><meta charset='utf-8'><title>Page {n}: {_sentence(rnd)[:60]}</title>"
+            f"<meta name='description' content='{_sentence(rnd)}'><style>body{{margin:0}}</style>"
+            f"<script>window.analytics = {{id: {n}}};</script></head><body>"
+            f"<header><nav><ul>{nav}</ul></nav></header>"
+            f"<div class='layout'><aside class='sidebar'><ul>{side}</ul></aside>"
+            f"<main><article><h1>{_sentence(rnd)[:70]}</h1>{''.join(blocks)}</article>"
+            f"<section id='comments'>{comments}</section></main></div>"
+            f"<footer><p>Copyright {n}. <a href='/privacy'>Privacy</a></p></footer></body></html>"
+        )
+        (out / f"{n:06d}.html").write_text(page, encoding="utf-8")
+
+
+def _corpus(path: str) -> List[bytes]:
+    files = sorted(pathlib.Path(path).rglob("*.htm*"))
+    return [f.read_bytes() for f in files]
+
+
+def _run(mode: str, path: str, repeat: int, results) -> None:
+    pages = _corpus(path)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if mode == "extract":
+        from .extract import MainContentExtractor
+
+        extractor = MainContentExtractor()
+
+        def one(body: bytes) -> int:
+            return len(extractor.extract(body, "https://example.com/page", "utf-8")["text"])
+    else:
+        from scrapy.http import HtmlResponse
+
+        def one(body: bytes) -> int:
+            response = HtmlResponse("https://example.com/page", body=body, encoding="utf-8")
+            response.css("title::text").get()
+            response.css("a::attr(href)").getall()
+            return len(" ".join(response.css("p::text").getall())[:2000])
+
+    chars, t0 = 0, time.perf_counter()
+    for _ in range(repeat):
+        for body in pages:
+            chars += one(body)
+    elapsed = time.perf_counter() - t0
+    total_bytes = sum(map(len, pages)) * repeat
+    # ru_maxrss is KiB on Linux
+    results[mode] = {
+        "pages_per_s": round(len(pages) * repeat / elapsed, 1),
+        "mb_per_s": round(total_bytes / elapsed / 2**20, 2),
+        "avg_text_chars": round(chars / (len(pages) * repeat)),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_rss_growth_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m crawler.extract_bench")
+    parser.add_argument("corpus", nargs="?", help="directory of .html files")
+    parser.add_argument("--make-corpus", metavar="DIR", help="write the synthetic corpus to DIR and exit")
+    parser.add_argument("--pages", type=int, default=2000, help="pages in the synthetic corpus")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the corpus")
+    parser.add_argument("--modes", nargs="+", default=["extract", "p_text"], choices=["extract", "p_text"])
+    args = parser.parse_args()
+
+    if args.make_corpus:
+        make_corpus(args.make_corpus, args.pages)
+        print(f"wrote {args.pages} pages to {args.make_corpus}")
+        return
+    if not args.corpus or not os.path.isdir(args.corpus):
+        parser.error("corpus directory required (create one with --make-corpus DIR)")
+
+    report: Dict[str, object] = {"pages": len(_corpus(args.corpus)), "repeat": args.repeat}
+    with multiprocessing.Manager() as manager:
+        results = manager.dict()
+        for mode in args.modes:
+            proc = multiprocessing.Process(target=_run, args=(mode, args.corpus, args.repeat, results))
+            proc.start()
+            proc.join()
+        report.update(dict(results))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""URL frontier: seen-set, crawl scope, per-host politeness and priorities.
+
+The frontier holds compact ``(score, url, depth, payload)`` entries, one
+priority heap per host, and decides which host may be fetched next:
+
+* **Seen-set**: a Bloom filter sized from the expected URL count and the
+  accepted false-positive rate. Memory is fixed up front, whatever the crawl
+  size. A false positive only means a URL is skipped.
+* **Politeness**: each host has its own delay, adapted from observed response
+  times (``latency * delay_factor`` within ``[min_delay, max_delay]``). It is
+  doubled on 429/503 responses (or set from ``Retry-After``). Hosts with no
+  pending URLs hold no scheduling state.
+* **Priority**: shallow pages, short paths and URLs without query strings are
+  scored higher. Among hosts that are ready, the one holding the best URL
+  goes next.
+* **Caps**: URLs accepted per registered domain, the maximum depth, and the
+  total number of pending entries are bounded.
+
+This module does not depend on Scrapy; ``crawler.scheduler`` plugs it in.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import re
+import time
+from collections import defaultdict
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# extensions never worth fetching for a text index
+_SKIP_EXT = re.compile(
+    r"\.(?:jpe?g|png|gif|webp|svg|ico|bmp|tiff?|mp[34]|m4[av]|avi|mov|webm|wav|ogg|flac|"
+    r"pdf|zip|gz|tgz|bz2|xz|7z|rar|tar|exe|dmg|msi|apk|iso|woff2?|ttf|otf|eot|css|js)$",
+    re.I,
+)
+# second-level labels under which registered domains have three labels (example.co.uk)
+_SLD = {"co", "com", "net", "org", "gov", "edu", "ac", "ne", "or", "go"}
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over byte strings."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: bytes):
+        digest = blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, key: bytes) -> bool:
+        """Add ``key``; return False if it was (probably) present already."""
+        new = False
+        for pos in self._positions(key):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not self._array[byte] & bit:
+                self._array[byte] |= bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self._array[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._array)
+
+
+def registered_domain(host: str) -> str:
+    """Approximate registrable domain: ``a.b.example.com`` -> ``example.com``, ``x.example.co.uk`` -> ``example.co.uk``."""
+    labels = host.split(".")
+    if len(labels) > 2 and labels[-2] in _SLD and len(labels[-1]) == 2:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def score_url(url: str, depth: int, priority: int = 0) -> float:
+    """Higher is fetched sooner: shallow pages, short paths, no query strings."""
+    parts = urlsplit(url)
+    segments = [s for s in parts.path.split("/") if s]
+    score = priority - 2.0 * depth - 0.5 * len(segments)
+    if parts.query:
+        score -= 1.0 + 0.5 * parts.query.count("&")
+    return score
+
+
+class _Host:
+    __slots__ = ("queue", "delay", "next_at", "in_flight", "latency", "token")
+
+    def __init__(self, delay: float):
+        self.queue: List[Tuple[float, int, str, int, object]] = []
+        self.delay = delay
+        self.next_at = 0.0
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        # sequence number of the host's live entry in the waiting or ready heap;
+        # older entries for the host are stale and skipped when popped
+        self.token: Optional[int] = None
+
+
+class Frontier:
+    def __init__(
+        self,
+        expected_urls: int = 20_000_000,
+        error_rate: float = 0.001,
+        min_delay: float = 1.0,
+        max_delay: float = 60.0,
+        delay_factor: float = 2.0,
+        per_host_concurrency: int = 1,
+        max_per_domain: int = 100_000,
+        max_depth: int = 20,
+        max_pending: int = 5_000_000,
+        clock=time.monotonic,
+    ):
+        self.seen = BloomFilter(expected_urls, error_rate)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay_factor = delay_factor
+        self.per_host_concurrency = per_host_concurrency
+        self.max_per_domain = max_per_domain
+        self.max_depth = max_depth
+        self.max_pending = max_pending
+        self.clock = clock
+        self._hosts: Dict[str, _Host] = {}
+        self._domain_counts: Dict[str, int] = defaultdict(int)
+        # hosts with pending URLs that are still in their politeness delay, by due time
+        self._waiting: List[Tuple[float, int, str]] = []
+        # hosts that may be fetched now, by the score of their best URL
+        self._ready: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self.pending = 0
+        self.stats: Dict[str, int] = defaultdict(int)
+
+    # ------------------------------------------------------------------
+    # admission
+    # ------------------------------------------------------------------
+    def in_scope(self, url: str, depth: int) -> bool:
+        parts = urlsplit(url)
+        return (
+            parts.scheme in ("http", "https")
+            and bool(parts.hostname)
+            and len(url) <= 2048
+            and depth <= self.max_depth
+            and not _SKIP_EXT.search(parts.path)
+        )
+
+    def admit(self, url: str, depth: int = 0, dont_filter: bool = False) -> Optional[str]:
+        """Apply the scope rules, seen-set and domain cap; the URL to queue, or None."""
+        url = url.split("#", 1)[0]
+        if not self.in_scope(url, depth):
+            self.stats["out_of_scope"] += 1
+            return None
+        if not self.seen.add(url.encode()) and not dont_filter:
+            self.stats["duplicate"] += 1
+            return None
+        domain = registered_domain(urlsplit(url).hostname)
+        if self._domain_counts[domain] >= self.max_per_domain:
+            self.stats["domain_cap"] += 1
+            return None
+        self._domain_counts[domain] += 1
+        return url
+
+    def add(
+        self,
+        url: str,
+        depth: int = 0,
+        priority: int = 0,
+        payload: object = None,
+        dont_filter: bool = False,
+    ) -> bool:
+        """Queue ``url``; False if it is out of scope, seen, over a cap or the frontier is full.
+
+        ``payload`` is returned with the URL by ``pop`` (the scheduler keeps the
+        callback name there, or the whole request when it cannot be rebuilt).
+        """
+        if self.pending >= self.max_pending:
+            self.stats["frontier_full"] += 1
+            return False
+        url = self.admit(url, depth, dont_filter)
+        if url is None:
+            return False
+        self.push(url, depth, score_url(url, depth, priority), payload)
+        return True
+
+    def push(self, url: str, depth: int, score: float, payload: object = None) -> None:
+        """Queue an already admitted URL (e.g. one leased from ``FrontierStore``)."""
+        host = urlsplit(url).hostname
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _Host(self.min_delay)
+        entry = (-score, next(self._seq), url, depth, payload)
+        better = not state.queue or entry < state.queue[0]
+        heapq.heappush(state.queue, entry)
+        self.pending += 1
+        self.stats["enqueued"] += 1
+        if state.token is None or better:
+            # re-key the host: it was not scheduled, or its best URL changed
+            self._schedule(host, state, self.clock())
+
+    # ------------------------------------------------------------------
+    # scheduling
+    # ------------------------------------------------------------------
+    def _schedule(self, host: str, state: _Host, now: float) -> None:
+        if not state.queue or state.in_flight >= self.per_host_concurrency:
+            state.token = None
+            return
+        state.token = next(self._seq)
+        if state.next_at <= now:
+            heapq.heappush(self._ready, (state.queue[0][0], state.token, host))
+        else:
+            heapq.heappush(self._waiting, (state.next_at, state.token, host))
+
+    def pop(self) -> Optional[Tuple[str, int, object]]:
+        """Best URL among hosts allowed to be fetched now, or None."""
+        now = self.clock()
+        while self._waiting and self._waiting[0][0] <= now:
+            _, token, host = heapq.heappop(self._waiting)
+            state = self._hosts.get(host)
+            if state is not None and state.token == token:
+                self._schedule(host, state, now)
+        while self._ready:
+            _, token, host = heapq.heappop(self._ready)
+            state = self._hosts.get(host)
+            if state is not None and state.token == token:
+                break
+        else:
+            return None
+        _, _, url, depth, payload = heapq.heappop(state.queue)
+        self.pending -= 1
+        state.in_flight += 1
+        state.next_at = now + state.delay
+        self._schedule(host, state, now)
+        return url, depth, payload
+
+    def next_ready_in(self) -> Optional[float]:
+        """Seconds until some host may be fetched (0 if one can now), None if nothing is queued."""
+        if self._ready:
+            return 0.0
+        if not self._waiting:
+            return None
+        return max(0.0, self._waiting[0][0] - self.clock())
+
+    def release(self, url: str) -> None:
+        """A fetch handed out by ``pop`` has left the downloader."""
+        host = urlsplit(url).hostname
+        state = self._hosts.get(host)
+        if state is None:
+            return
+        state.in_flight = max(0, state.in_flight - 1)
+        if state.queue:
+            self._schedule(host, state, self.clock())
+        elif not state.in_flight and state.delay <= self.min_delay and state.next_at <= self.clock():
+            del self._hosts[host]  # an idle host at the default delay has nothing worth keeping
+
+    def observe(self, url: str, latency: Optional[float] = None, status: Optional[int] = None,
+                retry_after: Optional[float] = None) -> None:
+        """Adapt the host's delay to a response: its latency, or a 429/503 backoff."""
+        host = urlsplit(url).hostname
+        state = self._hosts.get(host)
+        if state is None:
+            return
+        if status in (429, 503):
+            state.delay = min(self.max_delay, max(retry_after or 0.0, state.delay * 2))
+            state.next_at = max(state.next_at, self.clock() + state.delay)
+            self.stats["backoff"] += 1
+            if state.token is not None:
+                self._schedule(host, state, self.clock())
+        elif latency is not None:
+            state.latency = latency if state.latency is None else 0.7 * state.latency + 0.3 * latency
+            target = min(self.max_delay, max(self.min_delay, state.latency * self.delay_factor))
+            # ease back down after a backoff instead of dropping straight to the target
+            state.delay = (state.delay + target) / 2 if state.delay > target else target
+
+    def __len__(self) -> int:
+        return self.pending
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            **self.stats,
+            "pending": self.pending,
+            "hosts": len(self._hosts),
+            "seen": self.seen.count,
+            "seen_bytes": self.seen.size_bytes,
+        }
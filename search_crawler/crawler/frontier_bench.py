@@ -0,0 +1,142 @@
+"""Crawl throughput against the shared frontier store, by number of worker processes.
+
+Each worker is a separate process with its own ``FrontierStore`` connection.
+It leases hosts, "fetches" their URLs (one at a time per host, ``--latency``
+seconds each, many hosts concurrently), queues the links each page yields,
+and acknowledges the batch. The link graph is synthetic and deterministic, so
+every run crawls the same pages. Run from ``search_crawler/``::
+
+    python -m crawler.frontier_bench [--workers 1 2 4 8] [--pages 20000] [--latency 0.2]
+
+For each worker count, a fresh database is seeded and crawled until
+``--pages`` URLs are acknowledged. The report gives pages/s and the speedup
+over one worker. It also checks that no URL was fetched by two workers.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import defaultdict
+from hashlib import blake2b
+from typing import Dict, List
+
+from .frontier import score_url
+from .frontier_store import FrontierStore
+
+
+def _links(url: str, hosts: int, pages: int, fanout: int) -> List[str]:
+    digest = blake2b(url.encode(), digest_size=4 * fanout * 2).digest()
+    out = []
+    for i in range(fanout):
+        h = int.from_bytes(digest[8 * i:8 * i + 4], "little") % hosts
+        p = int.from_bytes(digest[8 * i + 4:8 * i + 8], "little") % pages
+        out.append(f"http://h{h}.test/p{p}")
+    return out
+
+
+def _entry(url: str, depth: int):
+    return (url, url.split("/")[2], depth, score_url(url, depth), "parse")
+
+
+async def _fetch_host(urls, args, found, done):
+    # one request at a time per host: the lease is the politeness boundary
+    for url, depth, _score, _payload in urls:
+        await asyncio.sleep(args.latency)
+        found.extend(_entry(link, depth + 1) for link in _links(url, args.hosts, args.host_pages, args.fanout))
+        done.append((url, True))
+
+
+async def _crawl(db: str, owner: str, args, counts, total) -> None:
+    store = FrontierStore(db, lease_s=60)
+    fetched = 0
+    try:
+        while True:
+            leased = store.lease(owner, max_hosts=args.lease_hosts, per_host=args.per_host)
+            if not leased:
+                if store.pending() == 0 or total.value >= args.pages:
+                    break
+                await asyncio.sleep(0.01)  # other workers hold the remaining hosts
+                continue
+            by_host: Dict[str, list] = defaultdict(list)
+            for row in leased:
+                by_host[row[0].split("/")[2]].append(row)
+            found, done = [], []
+            await asyncio.gather(*(_fetch_host(urls, args, found, done) for urls in by_host.values()))
+            store.add(found)
+            store.ack(done)
+            fetched += len(done)
+            with total.get_lock():
+                total.value += len(done)
+            if total.value >= args.pages:
+                break
+    finally:
+        store.release(owner)
+        store.close()
+        counts[owner] = fetched
+
+
+def _worker(db: str, owner: str, args, counts, total) -> None:
+    asyncio.run(_crawl(db, owner, args, counts, total))
+
+
+def run(workers: int, args) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "frontier.db")
+        store = FrontierStore(db)
+        store.add(_entry(f"http://h{h}.test/p0", 0) for h in range(args.seeds))
+        with multiprocessing.Manager() as manager:
+            counts = manager.dict()
+            total = multiprocessing.Value("q", 0)
+            procs = [
+                multiprocessing.Process(target=_worker, args=(db, f"worker-{i}", args, counts, total))
+                for i in range(workers)
+            ]
+            t0 = time.perf_counter()
+            for proc in procs:
+                proc.start()
+            for proc in procs:
+                proc.join()
+            elapsed = time.perf_counter() - t0
+            per_worker = dict(counts)
+        stats = store.stats()
+        store.close()
+    fetched = sum(per_worker.values())
+    return {
+        "workers": workers,
+        "pages": stats["done"],
+        "seconds": round(elapsed, 2),
+        "pages_per_s": round(stats["done"] / elapsed, 1),
+        "fetched_twice": fetched - stats["done"],
+        "queued_left": stats["queued"],
+        "per_worker": sorted(per_worker.values()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m crawler.frontier_bench")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pages", type=int, default=20000, help="acknowledged pages per run")
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per fetch")
+    parser.add_argument("--hosts", type=int, default=5000)
+    parser.add_argument("--host-pages", type=int, default=200, help="distinct pages per host")
+    parser.add_argument("--fanout", type=int, default=8, help="links per page")
+    parser.add_argument("--seeds", type=int, default=200)
+    parser.add_argument("--lease-hosts", type=int, default=100)
+    parser.add_argument("--per-host", type=int, default=5)
+    args = parser.parse_args()
+
+    report: List[Dict[str, object]] = []
+    for n in args.workers:
+        result = run(n, args)
+        result["speedup"] = round(result["pages_per_s"] / report[0]["pages_per_s"], 2) if report else 1.0
+        report.append(result)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
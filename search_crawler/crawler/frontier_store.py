@@ -0,0 +1,207 @@
+"""Persistent URL frontier shared by crawler processes (SQLite in WAL mode).
+
+Every URL ever queued is a row in ``urls``. The URL is the primary key, so the
+table doubles as the crawl-wide seen-set. A row goes from queued to leased to
+done (or failed):
+
+* Workers **lease hosts**, not single URLs. ``lease`` takes hosts that have
+  queued URLs and no live lease, marks them with the worker's id and a lease
+  deadline, and returns their best-scored URLs. A host is fetched by one
+  process at a time, so the in-process ``Frontier`` politeness delay still
+  holds across processes.
+* ``ack`` marks fetched URLs done. ``renew`` extends a worker's leases while
+  it still has their URLs in flight.
+* ``release`` (clean shutdown) puts a worker's unacknowledged URLs back in the
+  queue. After a crash its leases simply expire. The next ``lease`` of the
+  host re-queues what was left, so a restarted crawl resumes with exactly the
+  URLs that were never acknowledged.
+
+All writes go through short ``BEGIN IMMEDIATE`` transactions, so several
+processes can share one database file on the same machine::
+
+    python -m crawler.frontier_store stats frontier.db
+    python -m crawler.frontier_store release frontier.db   # drop every lease
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+QUEUED, LEASED, DONE, FAILED = 0, 1, 2, 3
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS urls (
+        url TEXT PRIMARY KEY,
+        host TEXT NOT NULL,
+        depth INTEGER NOT NULL DEFAULT 0,
+        score REAL NOT NULL DEFAULT 0,
+        payload TEXT,
+        state INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS urls_queued ON urls(host, score DESC) WHERE state = 0",
+    "CREATE INDEX IF NOT EXISTS urls_leased ON urls(host) WHERE state = 1",
+    # pending: URLs of the host not yet acknowledged (queued or leased)
+    """CREATE TABLE IF NOT EXISTS hosts (
+        host TEXT PRIMARY KEY,
+        pending INTEGER NOT NULL DEFAULT 0,
+        owner TEXT,
+        lease_until REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS hosts_open ON hosts(lease_until) WHERE pending > 0",
+]
+
+# (url, host, depth, score, payload)
+Entry = Tuple[str, str, int, float, Optional[str]]
+
+
+class FrontierStore:
+    def __init__(self, path: str, lease_s: float = 300.0, timeout: float = 30.0):
+        self.path = path
+        self.lease_s = lease_s
+        self.db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self._write():
+            for statement in SCHEMA:
+                self.db.execute(statement)
+
+    @contextmanager
+    def _write(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def close(self) -> None:
+        self.db.close()
+
+    def add(self, entries: Iterable[Entry], requeue: bool = False) -> int:
+        """Queue URLs not seen before by any worker; returns how many were queued.
+
+        With ``requeue``, URLs already done or failed are queued again (revisits).
+        """
+        added: Counter = Counter()
+        sql = "INSERT INTO urls (url, host, depth, score, payload) VALUES (?, ?, ?, ?, ?)"
+        if requeue:
+            sql += f" ON CONFLICT(url) DO UPDATE SET state = {QUEUED}, score = excluded.score WHERE state >= {DONE}"
+        else:
+            sql += " ON CONFLICT(url) DO NOTHING"
+        with self._write():
+            for url, host, depth, score, payload in entries:
+                cur = self.db.execute(sql, (url, host, depth, score, payload))
+                if cur.rowcount:
+                    added[host] += 1
+            self.db.executemany(
+                "INSERT INTO hosts (host, pending) VALUES (?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET pending = pending + excluded.pending",
+                added.items(),
+            )
+        return sum(added.values())
+
+    def lease(self, owner: str, max_hosts: int = 100, per_host: int = 20) -> List[Tuple[str, int, float, Optional[str]]]:
+        """Lease up to ``max_hosts`` hosts (renewing those ``owner`` already holds) and return
+        up to ``per_host`` of their best queued URLs each, as ``(url, depth, score, payload)``."""
+        now = time.time()
+        until = now + self.lease_s
+        out: List[Tuple[str, int, float, Optional[str]]] = []
+        with self._write():
+            # hosts already held by ``owner`` that have queued URLs left, then free or expired ones;
+            # a quarter of the slots always go to new hosts so the worker keeps spreading out
+            held = self.db.execute(
+                "SELECT host, owner FROM hosts WHERE owner = ? AND lease_until >= ? AND EXISTS "
+                f"(SELECT 1 FROM urls WHERE urls.host = hosts.host AND state = {QUEUED}) LIMIT ?",
+                (owner, now, max_hosts - max_hosts // 4),
+            ).fetchall()
+            expired = self.db.execute(
+                "SELECT host, owner FROM hosts WHERE pending > 0 AND lease_until < ? LIMIT ?",
+                (now, max_hosts - len(held)),
+            ).fetchall()
+            for host, previous in expired:
+                if previous is not None:
+                    # the lease expired without a release, even if it was ``owner``'s own:
+                    # its unacknowledged fetches are forfeit and go back to the queue
+                    self.db.execute(f"UPDATE urls SET state = {QUEUED} WHERE host = ? AND state = {LEASED}", (host,))
+            for host, _ in held + expired:
+                rows = self.db.execute(
+                    f"SELECT url, depth, score, payload FROM urls WHERE host = ? AND state = {QUEUED} "
+                    "ORDER BY score DESC LIMIT ?",
+                    (host, per_host),
+                ).fetchall()
+                self.db.executemany(f"UPDATE urls SET state = {LEASED} WHERE url = ?", [(r[0],) for r in rows])
+                self.db.execute("UPDATE hosts SET owner = ?, lease_until = ? WHERE host = ?", (owner, until, host))
+                out.extend(rows)
+        return out
+
+    def ack(self, done: Iterable[Tuple[str, bool]]) -> None:
+        """Mark leased URLs fetched (``ok``) or failed; neither is handed out again."""
+        removed: Counter = Counter()
+        with self._write():
+            for url, ok in done:
+                cur = self.db.execute(
+                    f"UPDATE urls SET state = ? WHERE url = ? AND state = {LEASED} RETURNING host",
+                    (DONE if ok else FAILED, url),
+                )
+                row = cur.fetchone()
+                if row:
+                    removed[row[0]] += 1
+            self.db.executemany(
+                "UPDATE hosts SET pending = pending - ? WHERE host = ?",
+                [(n, host) for host, n in removed.items()],
+            )
+
+    def renew(self, owner: str, hosts: Iterable[str]) -> None:
+        until = time.time() + self.lease_s
+        with self._write():
+            self.db.executemany(
+                "UPDATE hosts SET lease_until = ? WHERE host = ? AND owner = ?",
+                [(until, host, owner) for host in hosts],
+            )
+
+    def release(self, owner: Optional[str] = None) -> int:
+        """Re-queue unacknowledged URLs of ``owner``'s hosts (every host if None) and drop the leases."""
+        where, args = ("owner = ?", (owner,)) if owner is not None else ("owner IS NOT NULL", ())
+        with self._write():
+            cur = self.db.execute(
+                f"UPDATE urls SET state = {QUEUED} WHERE state = {LEASED} AND host IN (SELECT host FROM hosts WHERE {where})",
+                args,
+            )
+            requeued = cur.rowcount
+            self.db.execute(f"UPDATE hosts SET owner = NULL, lease_until = 0 WHERE {where}", args)
+        return requeued
+
+    def pending(self) -> int:
+        """URLs queued or leased by any worker."""
+        return self.db.execute("SELECT COALESCE(SUM(pending), 0) FROM hosts WHERE pending > 0").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        counts = dict(self.db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state").fetchall())
+        names = {QUEUED: "queued", LEASED: "leased", DONE: "done", FAILED: "failed"}
+        out = {name: counts.get(state, 0) for state, name in names.items()}
+        now = time.time()
+        out["hosts"] = self.db.execute("SELECT COUNT(*) FROM hosts").fetchone()[0]
+        out["leased_hosts"] = self.db.execute("SELECT COUNT(*) FROM hosts WHERE lease_until >= ?", (now,)).fetchone()[0]
+        return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m crawler.frontier_store", description="Inspect the crawl frontier database")
+    parser.add_argument("command", choices=["stats", "release"])
+    parser.add_argument("db")
+    args = parser.parse_args()
+    store = FrontierStore(args.db)
+    if args.command == "release":
+        print(f"re-queued {store.release()} leased URLs")
+    print(json.dumps(store.stats(), indent=2))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Item pipelines that store crawled pages in the ``pages`` alias.
+
+``LinkGraphPipeline`` appends each page's outgoing links to the link graph
+(``app.linkgraph``, ranked offline by ``app.pagerank``) and stamps the page
+with its last computed PageRank. ``NearDupPipeline`` drops pages that near-duplicate a page already stored
+under another URL, and adds the SimHash fields to the rest. It keeps only the
+recent pages of the crawl in memory and asks the index about older ones.
+``OpenSearchBulkPipeline`` buffers pages (and the schedule records of
+unchanged pages, see ``crawler.recrawl``) and sends them as async bulk
+requests, so the reactor never waits on an index round trip. Nothing forces a
+refresh. Pages become searchable on the index's own refresh cycle.
+"""
+import asyncio
+import logging
+import pathlib
+import sys
+import time
+
+from opensearchpy import AsyncOpenSearch
+from opensearchpy.helpers import async_bulk
+from scrapy.exceptions import DropItem
+
+# the pages mapping, alias and fingerprints live in the backend package
+sys.path.append((pathlib.Path(__file__).resolve().parents[2] / "backend").as_posix())
+from app import linkgraph, near_dup, pages_index, pagerank  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+class LinkGraphPipeline:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.writer = None
+        self.scores = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(crawler.settings.get("LINKGRAPH_DIR"))
+        pipeline.stats = crawler.stats
+        return pipeline
+
+    def open_spider(self, spider=None):
+        if not self.directory:
+            return
+        self.writer = linkgraph.EdgeWriter(self.directory)
+        # a full re-index replaces the document, so pages carry their score with them
+        self.scores = pagerank.Scores.load(self.directory)
+        logger.info(
+            "link graph segment %s; %d ranked pages", self.writer.path, len(self.scores.keys) if self.scores else 0
+        )
+
+    def process_item(self, item, spider=None):
+        links = item.pop("links", None)
+        if links is None or self.writer is None:
+            return item
+        self.stats.inc_value("linkgraph/edges", self.writer.add(item["url"], links))
+        if self.scores is not None:
+            score = self.scores.get(item["url"])
+            if score is not None:
+                item["pagerank"] = round(score, 6)
+        return item
+
+    def close_spider(self, spider=None):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# stored page within ``d`` bits of ``fp`` (the band terms narrow the candidates first)
+_WITHIN = "doc['simhash'].size() != 0 && Long.bitCount(doc['simhash'].value ^ ((Number) params.fp).longValue()) <= params.d"
+
+
+class NearDupPipeline:
+    def __init__(self, url: str, recent_pages: int):
+        self.url = url
+        self.filter = near_dup.NearDupFilter(max_pages=recent_pages)
+        self._waiting = []
+        self._lookup = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(crawler.settings.get("OPENSEARCH_URL"), crawler.settings.getint("NEAR_DUP_RECENT_PAGES"))
+        pipeline.stats = crawler.stats
+        return pipeline
+
+    async def open_spider(self, spider=None):
+        # nothing is preloaded: stored pages are looked up per item by their band keys
+        self.client = AsyncOpenSearch(self.url, verify_certs=False)
+        await pages_index.ensure_async(self.client)
+
+    async def close_spider(self, spider=None):
+        await self.client.close()
+
+    async def process_item(self, item, spider=None):
+        if "_index" in item:
+            return item  # a schedule-only record (crawler.recrawl), not a page
+        fields = near_dup.index_fields(near_dup.page_text(item))
+        if fields:
+            url, fp = item["url"], near_dup.from_signed(fields["simhash"])
+            dup_of = self.filter.query(url, fp)
+            if dup_of is None:
+                dup_of = await self._stored(url, fields)
+            # pages of this crawl checked meanwhile count too
+            dup_of = dup_of or self.filter.check(url, fp)
+            if dup_of is not None:
+                self.stats.inc_value("pages/near_duplicates")
+                raise DropItem(f"near-duplicate of {dup_of}")
+        item.update(fields)
+        return item
+
+    async def _stored(self, url: str, fields: dict):
+        """A stored page under another URL that ``fields`` near-duplicates, looked up
+        together with the other items in flight."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append((url, fields, future))
+        if self._lookup is None:
+            self._lookup = asyncio.ensure_future(self._lookup_batch())
+        return await asyncio.shield(future)
+
+    async def _lookup_batch(self):
+        await asyncio.sleep(0.005)  # let concurrent items join the batch
+        batch, self._waiting, self._lookup = self._waiting, [], None
+        body = []
+        for url, fields, _ in batch:
+            body.append({"index": pages_index.PAGES_ALIAS})
+            body.append({
+                "size": 1,
+                "_source": False,
+                "query": {"bool": {
+                    "filter": [
+                        {"terms": {"simhash_bands": fields["simhash_bands"]}},
+                        {"script": {"script": {
+                            "source": _WITHIN,
+                            "params": {"fp": fields["simhash"], "d": near_dup.MAX_DISTANCE},
+                        }}},
+                    ],
+                    "must_not": [{"ids": {"values": [url]}}],
+                }},
+            })
+        found = [None] * len(batch)
+        try:
+            res = await self.client.msearch(body=body)
+            # a failed search (e.g. an index without simhash) finds nothing
+            found = [(r.get("hits", {}).get("hits") or [{}])[0].get("_id") for r in res["responses"]]
+        except Exception as exc:
+            logger.warning("near-duplicate lookup of %d pages failed: %s", len(batch), exc)
+        for (_, _, future), dup in zip(batch, found):
+            if not future.done():
+                future.set_result(dup)
+
+
+class OpenSearchBulkPipeline:
+    def __init__(self, url: str, batch_size: int, flush_interval: float, max_inflight: int):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_inflight = max_inflight
+        self._buffer = []
+        self._tasks = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = crawler.settings
+        pipeline = cls(
+            s.get("OPENSEARCH_URL"),
+            s.getint("PAGES_BULK_SIZE", 500),
+            s.getfloat("PAGES_BULK_FLUSH_S", 2.0),
+            s.getint("PAGES_BULK_MAX_INFLIGHT", 4),
+        )
+        pipeline.stats = crawler.stats
+        return pipeline
+
+    async def open_spider(self, spider=None):
+        self.client = AsyncOpenSearch(self.url, verify_certs=False, maxsize=self.max_inflight)
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._started = time.monotonic()
+        self._ticker = asyncio.create_task(self._tick())
+
+    async def process_item(self, item, spider=None):
+        # upsert using URL as id to avoid duplicates; an item's own "_index" overrides the alias
+        # schedule records riding along with an item (crawler.recrawl, after a redirect)
+        for record in item.pop("_schedules", ()):
+            self._buffer.append({"_op_type": "index", "_id": record["url"], **record})
+        action = {"_op_type": "index", "_index": pages_index.PAGES_ALIAS, "_id": item["url"], **item}
+        if "_index" not in item:
+            action["indexed_at"] = pages_index.now_ms()
+        self._buffer.append(action)
+        if len(self._buffer) >= self.batch_size:
+            await self._flush()
+        return item
+
+    async def close_spider(self, spider=None):
+        # a flush the ticker already started gets its slot and batch out before we go on
+        self._ticker.cancel()
+        try:
+            await self._ticker
+        except asyncio.CancelledError:
+            pass
+        await self._flush()
+        await asyncio.gather(*self._tasks)
+        await self.client.close()
+        logger.info(
+            "indexed %d pages (%.1f pages/s)",
+            self.stats.get_value("pages/indexed", 0),
+            self.stats.get_value("pages/per_sec", 0.0),
+        )
+
+    async def _tick(self):
+        # send partial batches on slow crawls too
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+
+    async def _flush(self):
+        if not self._buffer:
+            return
+        # backpressure: wait while max_inflight bulk requests are outstanding. The slot is
+        # taken before the buffer is swapped, so a flush cancelled while waiting loses nothing.
+        await self._slots.acquire()
+        if not self._buffer:
+            self._slots.release()
+            return
+        batch, self._buffer = self._buffer, []
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        # schedule records (crawler.recrawl) name their own index; they are not pages
+        pages = sum(1 for action in batch if action["_index"] == pages_index.PAGES_ALIAS)
+        other = {action["_index"] for action in batch} - {pages_index.PAGES_ALIAS}
+        try:
+            indexed, errors = await async_bulk(self.client, batch, raise_on_error=False, max_retries=3)
+            failed = sum(1 for e in errors if next(iter(e.values())).get("_index") not in other)
+            self.stats.inc_value("pages/indexed", pages - failed)
+            self.stats.inc_value("pages/schedules_indexed", indexed - (pages - failed))
+            if errors:
+                self.stats.inc_value("pages/index_errors", len(errors))
+                logger.warning("%d pages failed to index", len(errors))
+        except Exception as exc:
+            self.stats.inc_value("pages/index_errors", len(batch))
+            logger.error("bulk request of %d pages failed: %s", len(batch), exc)
+        finally:
+            self._slots.release()
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            self.stats.set_value("pages/per_sec", round(self.stats.get_value("pages/indexed", 0) / elapsed, 2))
@@ -0,0 +1,383 @@
+"""Incremental recrawl: conditional GETs, content hashes and adaptive revisit intervals.
+
+Every stored page carries its ``ETag`` and ``Last-Modified`` validators, a hash
+of its extracted content, a revisit interval and the time it is next due. On a
+later crawl:
+
+* ``RecrawlSpiderMiddleware`` drops links to known pages that are not due yet.
+  It uses a Bloom filter sized like the frontier's, so memory stays bounded.
+  It also streams the due pages from the indexes (``next_crawl_at`` ascending,
+  in batches) into the start requests, so they are revisited even when no
+  fetched page links to them.
+* ``ConditionalGetMiddleware`` fetches the schedule of each requested URL
+  (batched ``mget``) and sends ``If-None-Match`` / ``If-Modified-Since``.
+  A 304 reply carries no body.
+* ``RecrawlPipeline`` compares the content hash. A changed page halves its
+  interval and is written to ``pages`` as usual. An unchanged page (304, or
+  the same hash) grows its interval by half. Only its small schedule record is
+  written, to the ``pages_recrawl`` index. The page itself is not re-indexed.
+  Schedules are keyed on the requested URL, which is what the middleware looks
+  up. After a redirect, the final URL gets a copy of the same schedule.
+
+Intervals stay within ``RECRAWL_MIN_S`` and ``RECRAWL_MAX_S``, so pages that
+change often are checked often and static pages rarely.
+"""
+import asyncio
+import logging
+import pathlib
+import sys
+import time
+import weakref
+from collections import OrderedDict
+from hashlib import blake2b
+
+from opensearchpy import AsyncOpenSearch
+from opensearchpy.helpers import async_scan
+from scrapy import Request
+from scrapy.spidermiddlewares.base import BaseSpiderMiddleware
+
+sys.path.append((pathlib.Path(__file__).resolve().parents[2] / "backend").as_posix())
+from app import pages_index  # noqa: E402
+
+from .frontier import BloomFilter  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+RECRAWL_INDEX = "pages_recrawl"
+# schedule fields kept per URL, in both pages and pages_recrawl
+FIELDS = ("etag", "last_modified", "content_hash", "revisit_s", "next_crawl_at", "checked_at")
+
+RECRAWL_BODY = {
+    "settings": {"index": {"number_of_shards": 1, "refresh_interval": "30s"}},
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            "url": {"type": "keyword"},
+            "etag": {"type": "keyword", "index": False, "doc_values": False},
+            "last_modified": {"type": "keyword", "index": False, "doc_values": False},
+            "content_hash": {"type": "keyword", "index": False, "doc_values": False},
+            "revisit_s": {"type": "float", "index": False},
+            "next_crawl_at": {"type": "date"},
+            "checked_at": {"type": "date"},
+        },
+    },
+}
+
+
+def content_hash(title, body) -> str:
+    """Hash of the extracted text, insensitive to whitespace changes in the markup."""
+    text = " ".join(f"{title or ''} {body or ''}".split())
+    return blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def next_interval(interval: float, changed: bool, min_s: float, max_s: float) -> float:
+    return min(max_s, max(min_s, interval / 2 if changed else interval * 1.5))
+
+
+class RecrawlState:
+    """Recrawl schedule of known URLs, shared by the recrawl components of one crawl.
+
+    Nothing holds the whole schedule in memory. URLs that are not due yet go
+    into a Bloom filter, which drops links to them. Due URLs are streamed from
+    the indexes in ``next_crawl_at`` order. The full entry of a URL (validators,
+    hash, interval) is fetched with batched ``mget`` calls when the URL is
+    requested, and kept until its item is processed.
+    """
+
+    _by_crawler = weakref.WeakKeyDictionary()
+
+    def __init__(
+        self,
+        url: str,
+        initial_s: float,
+        min_s: float,
+        max_s: float,
+        expected_urls: int = 20_000_000,
+        error_rate: float = 0.001,
+        batch: int = 1000,
+        max_fetched: int = 100_000,
+    ):
+        self.url = url
+        self.initial_s = initial_s
+        self.min_s = min_s
+        self.max_s = max_s
+        self.batch = batch
+        self.max_fetched = max_fetched
+        self.not_due = BloomFilter(expected_urls, error_rate)
+        # url -> (etag, last_modified, content_hash, revisit_s, next_crawl_at ms, checked_at ms),
+        # or None for unknown URLs; only for URLs requested and not yet processed
+        self.fetched = OrderedDict()
+        self.client = None
+        self._waiting = {}
+        self._lookup = None
+        self._loaded = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        state = cls._by_crawler.get(crawler)
+        if state is None:
+            s = crawler.settings
+            state = cls._by_crawler[crawler] = cls(
+                s.get("OPENSEARCH_URL"),
+                s.getfloat("RECRAWL_INITIAL_S"),
+                s.getfloat("RECRAWL_MIN_S"),
+                s.getfloat("RECRAWL_MAX_S"),
+                s.getint("FRONTIER_EXPECTED_URLS"),
+                s.getfloat("FRONTIER_ERROR_RATE"),
+            )
+        return state
+
+    async def load(self) -> None:
+        """Fill the not-due filter from ``pages`` and ``pages_recrawl``; later calls wait for the first."""
+        if self._loaded is None:
+            self._loaded = asyncio.ensure_future(self._load())
+        await self._loaded
+
+    async def _load(self) -> None:
+        self.client = AsyncOpenSearch(self.url, verify_certs=False)
+        await pages_index.ensure_async(self.client)
+        if not await self.client.indices.exists(index=RECRAWL_INDEX):
+            await self.client.indices.create(index=RECRAWL_INDEX, body=RECRAWL_BODY, ignore=[400])
+        now_ms = int(time.time() * 1000)
+        count = 0
+        for index in (pages_index.PAGES_ALIAS, RECRAWL_INDEX):
+            hits = async_scan(
+                self.client,
+                index=index,
+                query={"_source": False, "query": {"range": {"next_crawl_at": {"gt": now_ms}}}},
+                size=self.batch,
+            )
+            async for hit in hits:
+                self.not_due.add(hit["_id"].encode())
+                count += 1
+        logger.info("recrawl: %d URLs not due yet (%.1f MiB filter)", count, self.not_due.size_bytes / 2**20)
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    def is_due(self, url: str) -> bool:
+        # a page that is due again after all (stale entry) is still seeded by due()
+        return url.encode() not in self.not_due
+
+    async def due(self, now_ms: int):
+        """Known URLs due for a visit, in batches, each index in most-overdue-first order.
+
+        A URL has a schedule in ``pages`` (last change) and maybe in
+        ``pages_recrawl`` (later unchanged checks); only the newer one counts.
+        """
+        for index, other in ((pages_index.PAGES_ALIAS, RECRAWL_INDEX), (RECRAWL_INDEX, pages_index.PAGES_ALIAS)):
+            async for hits in self._due_in(index, now_ms):
+                checked = await self._checked_at(other, [h["_id"] for h in hits])
+                urls = []
+                for hit in hits:
+                    mine, theirs = hit["_source"].get("checked_at") or 0, checked.get(hit["_id"])
+                    # ties go to pages
+                    if theirs is None or mine > theirs or (mine == theirs and index != RECRAWL_INDEX):
+                        urls.append(hit["_id"])
+                if urls:
+                    yield urls
+
+    async def _due_in(self, index: str, now_ms: int):
+        """``next_crawl_at <= now`` ascending, paged on the sort value.
+
+        Without a sortable unique field, each page restarts at the last
+        timestamp and excludes the ids already returned with it.
+        """
+        last, at_last = None, []
+        while True:
+            bounds = {"lte": now_ms} if last is None else {"gte": last, "lte": now_ms}
+            query = {"bool": {"filter": [{"range": {"next_crawl_at": bounds}}]}}
+            if at_last:
+                query["bool"]["must_not"] = [{"ids": {"values": at_last}}]
+            res = await self.client.search(
+                index=index,
+                body={
+                    "query": query,
+                    # pages indexes older than mapping v3 (and an empty pages_recrawl) may not map it yet
+                    "sort": [{"next_crawl_at": {"order": "asc", "unmapped_type": "date"}}],
+                    "_source": ["checked_at"],
+                    "size": self.batch,
+                },
+            )
+            hits = res["hits"]["hits"]
+            if not hits:
+                return
+            for hit in hits:
+                if hit["sort"][0] != last:
+                    last, at_last = hit["sort"][0], []
+                at_last.append(hit["_id"])
+            yield hits
+
+    async def _checked_at(self, index: str, ids) -> dict:
+        res = await self.client.mget(index=index, body={"ids": ids}, _source=["checked_at"])
+        return {d["_id"]: (d["_source"].get("checked_at") or 0) for d in res["docs"] if d.get("found")}
+
+    async def entry(self, url: str):
+        """Schedule of ``url`` (None if unknown), looked up together with other pending URLs."""
+        if url in self.fetched:
+            return self.fetched[url]
+        future = self._waiting.get(url)
+        if future is None:
+            future = self._waiting[url] = asyncio.get_running_loop().create_future()
+            if self._lookup is None:
+                self._lookup = asyncio.ensure_future(self._lookup_batch())
+        return await asyncio.shield(future)
+
+    async def _lookup_batch(self) -> None:
+        await asyncio.sleep(0.005)  # let concurrent requests join the batch
+        batch, self._waiting, self._lookup = self._waiting, {}, None
+        found = {}
+        try:
+            ids = list(batch)
+            for index in (pages_index.PAGES_ALIAS, RECRAWL_INDEX):
+                for start in range(0, len(ids), self.batch):
+                    res = await self.client.mget(
+                        index=index, body={"ids": ids[start:start + self.batch]}, _source=list(FIELDS)
+                    )
+                    for doc in res["docs"]:
+                        if not doc.get("found"):
+                            continue
+                        entry = tuple(doc["_source"].get(f) for f in FIELDS)
+                        known = found.get(doc["_id"])
+                        if known is None or (entry[5] or 0) >= (known[5] or 0):
+                            found[doc["_id"]] = entry
+        except Exception as exc:
+            logger.warning("recrawl lookup of %d URLs failed: %s", len(batch), exc)
+        for url, future in batch.items():
+            self._remember(url, found.get(url))
+            if not future.done():
+                future.set_result(found.get(url))
+
+    def _remember(self, url: str, entry) -> None:
+        self.fetched[url] = entry
+        self.fetched.move_to_end(url)
+        while len(self.fetched) > self.max_fetched:
+            self.fetched.popitem(last=False)  # requests that never produced an item
+
+    def known(self, url: str):
+        return self.fetched.get(url)
+
+    def record(self, url: str, changed: bool, digest, etag, last_modified) -> dict:
+        """Update ``url``'s schedule after a visit; returns the fields to store."""
+        now_ms = int(time.time() * 1000)
+        entry = self.fetched.pop(url, None)
+        interval = entry[3] if entry and entry[3] else self.initial_s
+        if entry is not None:
+            interval = next_interval(interval, changed, self.min_s, self.max_s)
+        self.not_due.add(url.encode())
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": digest,
+            "revisit_s": interval,
+            "next_crawl_at": now_ms + int(interval * 1000),
+            "checked_at": now_ms,
+        }
+
+    def record_alias(self, url: str) -> None:
+        """``url`` was reached by a redirect and shares the schedule just recorded."""
+        self.fetched.pop(url, None)
+        self.not_due.add(url.encode())
+
+
+class RecrawlSpiderMiddleware(BaseSpiderMiddleware):
+    def __init__(self, crawler):
+        super().__init__(crawler)
+        self.state = RecrawlState.from_crawler(crawler)
+        self.stats = crawler.stats
+
+    async def process_start(self, start):
+        await self.state.load()
+        started = set()
+        async for request in start:
+            if isinstance(request, Request):
+                if not self.state.is_due(request.url):
+                    self.stats.inc_value("recrawl/not_due")
+                    continue
+                started.add(request.url)
+                # the shared frontier store re-queues it even if an earlier crawl marked it done
+                request.meta["recrawl"] = True
+            yield request
+        async for urls in self.state.due(int(time.time() * 1000)):
+            for url in urls:
+                if url not in started:
+                    self.stats.inc_value("recrawl/due")
+                    yield Request(url, meta={"recrawl": True})
+
+    def get_processed_request(self, request, response):
+        if request.meta.get("recrawl") or self.state.is_due(request.url):
+            return request
+        self.stats.inc_value("recrawl/not_due")
+        return None
+
+
+class ConditionalGetMiddleware:
+    def __init__(self, state):
+        self.state = state
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(RecrawlState.from_crawler(crawler))
+
+    async def process_request(self, request, spider=None):
+        entry = await self.state.entry(request.url)
+        if entry is None:
+            return None
+        etag, last_modified = entry[0], entry[1]
+        if etag:
+            request.headers.setdefault("If-None-Match", etag)
+        if last_modified:
+            request.headers.setdefault("If-Modified-Since", last_modified)
+        return None
+
+
+class RecrawlPipeline:
+    def __init__(self, state):
+        self.state = state
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(RecrawlState.from_crawler(crawler))
+        pipeline.stats = crawler.stats
+        return pipeline
+
+    async def open_spider(self, spider=None):
+        await self.state.load()
+
+    async def close_spider(self, spider=None):
+        await self.state.close()
+
+    def process_item(self, item, spider=None):
+        url = item["url"]
+        # ConditionalGetMiddleware looks schedules up by request URL; after a redirect the
+        # page is stored under the final URL, and both get the same schedule
+        requested = item.pop("requested_url", None) or url
+        known = self.state.known(requested) or self.state.known(url)
+        if item.pop("not_modified", False):
+            digest = known[2] if known else None
+            changed = False
+        else:
+            digest = content_hash(item.get("title"), item.get("body"))
+            changed = known is None or digest != known[2]
+        etag, last_modified = item.pop("etag", None), item.pop("last_modified", None)
+        if not changed and known:
+            # a 304 need not repeat the validators
+            etag, last_modified = etag or known[0], last_modified or known[1]
+        fields = self.state.record(requested, changed, digest, etag, last_modified)
+        if requested != url:
+            self.state.record_alias(url)
+        if changed:
+            self.stats.inc_value("recrawl/changed")
+            item.update(fields)
+            item["fetched_at"] = fields["checked_at"]
+            if requested != url:
+                item["_schedules"] = [{"_index": RECRAWL_INDEX, "url": requested, **fields}]
+            return item
+        # unchanged: only the schedule is written, to the small pages_recrawl index
+        self.stats.inc_value("recrawl/unchanged")
+        record = {"_index": RECRAWL_INDEX, "url": url, **fields}
+        if requested != url:
+            record["_schedules"] = [{"_index": RECRAWL_INDEX, "url": requested, **fields}]
+        return record
@@ -0,0 +1,267 @@
+"""Scrapy scheduler backed by ``crawler.frontier.Frontier``.
+
+Replaces Scrapy's default scheduler and dupefilter: requests are checked
+against the frontier's Bloom filter and scope rules, queued per host, and
+handed back only when their host's politeness delay has passed. Plain GET
+requests to a spider callback are stored as ``(url, depth, callback name)``
+and rebuilt when popped (without their Referer header). Anything else
+(retries, redirects, requests with a body, other headers or an errback) is
+kept as the Request itself.
+
+Per-host delays come from the frontier, so Scrapy's own ``DOWNLOAD_DELAY``
+and AutoThrottle should stay off.
+
+With ``FRONTIER_DB`` set, rebuildable requests go to the shared
+``FrontierStore`` instead. The in-memory frontier is refilled from host
+leases, and fetched URLs are acknowledged in batches. Several ``scrapy crawl``
+processes can then share one crawl, and a restarted crawl carries on from the
+URLs that were never acknowledged.
+"""
+import logging
+import os
+import secrets
+import socket
+import time
+from urllib.parse import urlsplit
+
+from scrapy import Request, signals
+from scrapy.core.scheduler import BaseScheduler
+from twisted.internet import reactor
+
+from .frontier import Frontier, score_url
+from .frontier_store import FrontierStore
+
+logger = logging.getLogger(__name__)
+
+# meta keys marking requests handed out by the frontier, and those leased from the store
+FRONTIER_META = "frontier"
+STORE_META = "frontier_store"
+# meta a rebuilt request can do without (depth is stored with the URL)
+_REBUILT_META = {"depth", "is_start_request", "recrawl"}
+# seconds between store round trips while nothing is due: lease retries, ack flushes, renewals
+STORE_SYNC_S = 1.0
+
+
+class FrontierScheduler(BaseScheduler):
+    def __init__(self, crawler, frontier: Frontier, store: FrontierStore = None):
+        self.crawler = crawler
+        self.frontier = frontier
+        self.store = store
+        self.stats = crawler.stats
+        self.spider = None
+        self._wakeup = None
+        # the nonce keeps a restarted process that reuses a pid from inheriting its leases
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        settings = crawler.settings
+        self.lease_hosts = settings.getint("FRONTIER_LEASE_HOSTS")
+        self.lease_per_host = settings.getint("FRONTIER_LEASE_PER_HOST")
+        self.store_batch = settings.getint("FRONTIER_STORE_BATCH")
+        self._to_add = []
+        self._to_requeue = []
+        self._to_ack = []
+        self._leased = {}  # host -> leased URLs not yet acknowledged
+        self._store_pending = 0
+        self._synced_at = 0.0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = crawler.settings
+        frontier = Frontier(
+            expected_urls=s.getint("FRONTIER_EXPECTED_URLS"),
+            error_rate=s.getfloat("FRONTIER_ERROR_RATE"),
+            min_delay=s.getfloat("FRONTIER_MIN_DELAY"),
+            max_delay=s.getfloat("FRONTIER_MAX_DELAY"),
+            delay_factor=s.getfloat("FRONTIER_DELAY_FACTOR"),
+            per_host_concurrency=s.getint("FRONTIER_HOST_CONCURRENCY"),
+            max_per_domain=s.getint("FRONTIER_MAX_PER_DOMAIN"),
+            max_depth=s.getint("FRONTIER_MAX_DEPTH"),
+            max_pending=s.getint("FRONTIER_MAX_PENDING"),
+        )
+        store = None
+        if s.get("FRONTIER_DB"):
+            store = FrontierStore(s.get("FRONTIER_DB"), lease_s=s.getfloat("FRONTIER_LEASE_S"))
+        scheduler = cls(crawler, frontier, store)
+        crawler.signals.connect(scheduler._response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(scheduler._request_left, signal=signals.request_left_downloader)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        logger.info(
+            "frontier seen-set: %d bits, %d hashes (%.1f MiB)",
+            self.frontier.seen.bits, self.frontier.seen.hashes, self.frontier.seen.size_bytes / 2**20,
+        )
+
+    def close(self, reason):
+        if self._wakeup is not None and self._wakeup.active():
+            self._wakeup.cancel()
+        if self.store is not None:
+            self._flush()
+            requeued = self.store.release(self.owner)
+            for key, value in self.store.stats().items():
+                self.stats.set_value(f"frontier_store/db_{key}", value)
+            self.store.close()
+            logger.info("frontier store: %d leased URLs returned to the queue", requeued)
+        for key, value in self.frontier.snapshot().items():
+            self.stats.set_value(f"frontier/{key}", value)
+
+    def has_pending_requests(self) -> bool:
+        if len(self.frontier) > 0:
+            return True
+        if self.store is None:
+            return False
+        # other workers' leased URLs may still add to the crawl, so wait for them as well
+        self._sync()
+        return bool(self._to_add or self._to_requeue or self._to_ack or self._store_pending)
+
+    def __len__(self) -> int:
+        return len(self.frontier)
+
+    def enqueue_request(self, request: Request) -> bool:
+        payload = self._compact(request)
+        if self.store is not None and not isinstance(payload, Request):
+            depth = request.meta.get("depth", 0)
+            url = self.frontier.admit(request.url, depth, request.dont_filter)
+            if url is None:
+                return False
+            host = urlsplit(url).hostname
+            entry = (url, host, depth, score_url(url, depth, request.priority), payload)
+            # revisits of pages due again (crawler.recrawl) re-queue URLs the store has done
+            (self._to_requeue if request.meta.get("recrawl") else self._to_add).append(entry)
+            if len(self._to_add) + len(self._to_requeue) >= self.store_batch:
+                self._flush()
+            return True
+        return self.frontier.add(
+            request.url,
+            depth=request.meta.get("depth", 0),
+            priority=request.priority,
+            payload=payload,
+            dont_filter=request.dont_filter,
+        )
+
+    def next_request(self):
+        if self.store is not None and len(self.frontier) < self.lease_per_host:
+            self._sync()
+        popped = self.frontier.pop()
+        if popped is None:
+            self._schedule_wakeup()
+            return None
+        url, depth, payload = popped
+        if isinstance(payload, Request):
+            request = payload
+            # retries and redirects copy the meta of a leased request; only the original is acknowledged
+            request.meta.pop(STORE_META, None)
+        else:
+            leased = isinstance(payload, tuple)
+            name = payload[0] if leased else payload
+            callback = getattr(self.spider, name) if name else None
+            request = Request(url, callback=callback, meta={"depth": depth})
+            if leased:
+                request.meta[STORE_META] = True
+        request.meta[FRONTIER_META] = True
+        self.stats.inc_value("frontier/dequeued")
+        return request
+
+    def _compact(self, request: Request):
+        """Callback name for requests that can be rebuilt from their URL, else the request."""
+        callback = request.callback
+        plain = (
+            request.method == "GET"
+            and not request.body
+            and set(request.headers) <= {b"Referer"}
+            and not request.cookies
+            and request.errback is None
+            and set(request.meta) <= _REBUILT_META
+        )
+        if plain and callback is None:
+            return None
+        if plain and getattr(callback, "__self__", None) is self.spider:
+            return callback.__name__
+        return request
+
+    # ------------------------------------------------------------------
+    # shared store
+    # ------------------------------------------------------------------
+    def _flush(self):
+        if self._to_add:
+            new = self.store.add(self._to_add)
+            self.stats.inc_value("frontier_store/added", new)
+            self._to_add = []
+        if self._to_requeue:
+            self.stats.inc_value("frontier_store/requeued", self.store.add(self._to_requeue, requeue=True))
+            self._to_requeue = []
+        if self._to_ack:
+            self.store.ack(self._to_ack)
+            self._to_ack = []
+
+    def _sync(self, force=False):
+        """Flush buffered writes, renew held leases and lease more hosts; rate-limited."""
+        now = time.monotonic()
+        if not force and now - self._synced_at < STORE_SYNC_S:
+            return
+        self._synced_at = now
+        self._flush()
+        if self._leased:
+            self.store.renew(self.owner, list(self._leased))
+        for url, depth, score, payload in self.store.lease(self.owner, self.lease_hosts, self.lease_per_host):
+            host = urlsplit(url).hostname
+            self._leased[host] = self._leased.get(host, 0) + 1
+            # the tuple marks the entry as leased, so its fetch is acknowledged to the store
+            self.frontier.push(url, depth, score, (payload,))
+            self.stats.inc_value("frontier_store/leased_urls")
+        self._store_pending = self.store.pending()
+
+    def _ack(self, request, ok):
+        self._to_ack.append((request.url, ok))
+        host = urlsplit(request.url).hostname
+        left = self._leased.get(host, 0) - 1
+        if left > 0:
+            self._leased[host] = left
+        else:
+            self._leased.pop(host, None)
+        if len(self._to_ack) >= self.store_batch:
+            self._flush()
+
+    def _schedule_wakeup(self):
+        # the engine polls the scheduler every few seconds when idle; hosts whose
+        # delay ends sooner wake it directly so throughput does not follow the heartbeat
+        wait = self.frontier.next_ready_in()
+        if wait is None and self.store is not None:
+            wait = STORE_SYNC_S
+        if wait is None:
+            return
+        if self._wakeup is not None and self._wakeup.active():
+            if self._wakeup.getTime() - reactor.seconds() <= wait:
+                return
+            self._wakeup.cancel()
+        self._wakeup = reactor.callLater(wait, self._wake)
+
+    def _wake(self):
+        self._wakeup = None
+        slot = getattr(self.crawler.engine, "_slot", None)
+        if slot is not None:
+            slot.nextcall.schedule()
+
+    def _response_downloaded(self, response, request, spider=None):
+        if not request.meta.get(FRONTIER_META):
+            return
+        retry_after = response.headers.get("Retry-After")
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None  # HTTP-date form; the doubled delay applies
+        request.meta["frontier_status"] = response.status
+        self.frontier.observe(
+            request.url,
+            latency=request.meta.get("download_latency"),
+            status=response.status,
+            retry_after=retry_after,
+        )
+
+    def _request_left(self, request, spider=None):
+        if request.meta.get(FRONTIER_META):
+            self.frontier.release(request.url)
+        if request.meta.get(STORE_META):
+            # a retry of a failed fetch is kept in memory; the URL itself is settled here
+            status = request.meta.get("frontier_status")
+            self._ack(request, status is not None and status < 400)
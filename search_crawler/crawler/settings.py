@@ -0,0 +1,72 @@
+"""Scrapy settings for the Compass crawler (run from ``search_crawler/``: ``scrapy crawl site``)."""
+import os
+
+BOT_NAME = "compass"
+SPIDER_MODULES = ["crawler.spiders"]
+NEWSPIDER_MODULE = "crawler.spiders"
+
+# async pipelines create their tasks on the asyncio loop
+TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
+
+OPENSEARCH_URL = os.getenv("OPENSEARCH_URL", "http://localhost:9200")
+
+ITEM_PIPELINES = {
+    "crawler.pipelines.LinkGraphPipeline": 50,
+    "crawler.recrawl.RecrawlPipeline": 100,
+    "crawler.pipelines.NearDupPipeline": 200,
+    "crawler.pipelines.OpenSearchBulkPipeline": 300,
+}
+
+# near-duplicate check (crawler.pipelines): fingerprints of the most recent pages kept
+# in memory; older pages are looked up in the index
+NEAR_DUP_RECENT_PAGES = int(os.getenv("COMPASS_NEAR_DUP_RECENT_PAGES", "100000"))
+
+# page extraction stage (crawler.extract): any class with the same extract() method;
+# snippet length, and the cap on stored body text per page
+EXTRACTOR = "crawler.extract.MainContentExtractor"
+EXTRACT_SNIPPET_CHARS = int(os.getenv("COMPASS_EXTRACT_SNIPPET_CHARS", "300"))
+EXTRACT_MAX_CHARS = int(os.getenv("COMPASS_EXTRACT_MAX_CHARS", "200000"))
+
+# link graph (app.linkgraph): directory of the edge segments and of the scores written
+# by `python -m app.pagerank DIR` (run from backend/); empty disables link capture
+LINKGRAPH_DIR = os.getenv("COMPASS_LINKGRAPH_DIR", "linkgraph")
+
+# incremental recrawl (crawler.recrawl): conditional GETs, and revisit intervals that
+# halve when a page changed and grow by half when it did not, within [MIN_S, MAX_S]
+SPIDER_MIDDLEWARES = {"crawler.recrawl.RecrawlSpiderMiddleware": 100}
+DOWNLOADER_MIDDLEWARES = {"crawler.recrawl.ConditionalGetMiddleware": 560}
+RECRAWL_INITIAL_S = float(os.getenv("COMPASS_RECRAWL_INITIAL_S", "86400"))
+RECRAWL_MIN_S = float(os.getenv("COMPASS_RECRAWL_MIN_S", "3600"))
+RECRAWL_MAX_S = float(os.getenv("COMPASS_RECRAWL_MAX_S", "2592000"))
+
+# pages per bulk request, seconds before a partial batch is sent anyway,
+# and bulk requests in flight before process_item waits for one to finish
+PAGES_BULK_SIZE = int(os.getenv("COMPASS_CRAWL_BULK_SIZE", "500"))
+PAGES_BULK_FLUSH_S = float(os.getenv("COMPASS_CRAWL_BULK_FLUSH_S", "2"))
+PAGES_BULK_MAX_INFLIGHT = int(os.getenv("COMPASS_CRAWL_BULK_INFLIGHT", "4"))
+
+# URL frontier (crawler.scheduler): Bloom seen-set sized for FRONTIER_EXPECTED_URLS
+# at FRONTIER_ERROR_RATE, per-host delay adapted from latency within
+# [MIN_DELAY, MAX_DELAY], and caps on depth, URLs per domain and queued URLs
+SCHEDULER = "crawler.scheduler.FrontierScheduler"
+DOWNLOAD_DELAY = 0
+AUTOTHROTTLE_ENABLED = False
+CONCURRENT_REQUESTS = int(os.getenv("COMPASS_CRAWL_CONCURRENCY", "64"))
+FRONTIER_EXPECTED_URLS = int(os.getenv("COMPASS_FRONTIER_EXPECTED_URLS", "20000000"))
+FRONTIER_ERROR_RATE = float(os.getenv("COMPASS_FRONTIER_ERROR_RATE", "0.001"))
+FRONTIER_MIN_DELAY = float(os.getenv("COMPASS_FRONTIER_MIN_DELAY", "1"))
+FRONTIER_MAX_DELAY = float(os.getenv("COMPASS_FRONTIER_MAX_DELAY", "60"))
+FRONTIER_DELAY_FACTOR = float(os.getenv("COMPASS_FRONTIER_DELAY_FACTOR", "2"))
+FRONTIER_HOST_CONCURRENCY = int(os.getenv("COMPASS_FRONTIER_HOST_CONCURRENCY", "1"))
+FRONTIER_MAX_PER_DOMAIN = int(os.getenv("COMPASS_FRONTIER_MAX_PER_DOMAIN", "100000"))
+FRONTIER_MAX_DEPTH = int(os.getenv("COMPASS_FRONTIER_MAX_DEPTH", "20"))
+FRONTIER_MAX_PENDING = int(os.getenv("COMPASS_FRONTIER_MAX_PENDING", "5000000"))
+
+# shared on-disk frontier (crawler.frontier_store) for resumable, multi-process crawls;
+# empty keeps the whole queue in this process. Hosts leased per round trip, URLs per
+# leased host, lease lifetime (s) and the batch size of buffered adds/acks.
+FRONTIER_DB = os.getenv("COMPASS_FRONTIER_DB", "")
+FRONTIER_LEASE_HOSTS = int(os.getenv("COMPASS_FRONTIER_LEASE_HOSTS", "100"))
+FRONTIER_LEASE_PER_HOST = int(os.getenv("COMPASS_FRONTIER_LEASE_PER_HOST", "20"))
+FRONTIER_LEASE_S = float(os.getenv("COMPASS_FRONTIER_LEASE_S", "300"))
+FRONTIER_STORE_BATCH = int(os.getenv("COMPASS_FRONTIER_STORE_BATCH", "500"))